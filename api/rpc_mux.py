@@ -0,0 +1,92 @@
+import redis.asyncio as aredis
+import asyncio
+import json
+import uuid
+
+CMD_CH = "controller:commands"
+
+
+class RpcMux:
+    """One long-lived reply listener per API process.
+
+    Every request publishes with this process's reply channel and a fresh
+    `corr_id`; the controller echoes the id back and the listener resolves the
+    matching future. Calls wait for the subscription before they publish, so a
+    fast reply can't be missed; `start` does not, so the API comes up (and
+    answers 504) while Redis is unreachable, and the listener keeps retrying."""
+
+    def __init__(self, host: str = "localhost", port: int = 6379):
+        self.host = host
+        self.port = port
+        self.reply_ch = f"controller:replies:{uuid.uuid4().hex}"
+        self._pending: dict[str, asyncio.Future] = {}
+        self._client = None
+        self._ps = None
+        self._task = None
+        self._ready = None
+
+    @property
+    def client(self):
+        return self._client
+
+    async def start(self):
+        self._client = aredis.Redis(host=self.host, port=self.port, decode_responses=True)
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._listen(), name="rpc-replies")
+
+    async def _listen(self):
+        delay = 1
+        while True:
+            try:
+                self._ps = self._client.pubsub(ignore_subscribe_messages=True)
+                await self._ps.subscribe(self.reply_ch)
+                self._ready.set()
+                delay = 1
+                async for msg in self._ps.listen():
+                    if msg.get("type") != "message":
+                        continue
+                    data = json.loads(msg["data"])
+                    fut = self._pending.pop(data.pop("corr_id", None), None)
+                    if fut is not None and not fut.done():
+                        fut.set_result(data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[API] reply listener error: {e}, retrying in {delay}s")
+                self._ready.clear()
+                if self._ps is not None:
+                    try:
+                        await self._ps.aclose()
+                    except Exception:
+                        pass
+                    self._ps = None
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    async def call(self, cmd: dict, timeout: float = 2.0) -> dict:
+        corr_id = uuid.uuid4().hex
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[corr_id] = fut
+        try:
+            loop = asyncio.get_running_loop()
+            t0 = loop.time()
+            await asyncio.wait_for(self._ready.wait(), timeout)
+            timeout -= loop.time() - t0
+            await self._client.publish(CMD_CH, json.dumps({**cmd, "reply_to": self.reply_ch, "corr_id": corr_id}))
+            return await asyncio.wait_for(fut, max(timeout, 0.01))
+        except asyncio.TimeoutError:
+            raise TimeoutError("no reply")
+        finally:
+            self._pending.pop(corr_id, None)
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._ps:
+            await self._ps.aclose()
+        if self._client:
+            await self._client.aclose()
@@ -1,10 +1,16 @@
-from fastapi import FastAPI, HTTPException, APIRouter, BackgroundTasks, Response
+from fastapi import FastAPI, HTTPException, APIRouter, BackgroundTasks, Response, Request
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, field_validator
 from typing import Optional
-from data.redis_bus import get_client, publish_json
+from contextlib import asynccontextmanager
+from data.redis_bus import get_client, publish_json, status_key
+from api.rpc_mux import RpcMux
+from api.stream_hub import StreamHub, status_view
+from storage.trade_journal import journal_dir, read_from, valid_tid
 from utils.notifier import Notifier
+from utils.metrics import metrics_key, render_prometheus
 import uuid
 import json
 import os
@@ -15,11 +21,23 @@ import hashlib
 import hmac
 import secrets
 
-app = FastAPI()
-api = APIRouter(prefix="/api")
-
 CMD_CH = "controller:commands"
 notifier = Notifier()
+mux = RpcMux()
+hub = StreamHub()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await mux.start()
+    await hub.start()
+    yield
+    await hub.close()
+    await mux.close()
+
+
+app = FastAPI(lifespan=lifespan)
+api = APIRouter(prefix="/api")
 
 app.add_middleware(
     CORSMiddleware,
@@ -65,6 +83,13 @@ class AddCoinReq(BaseModel):
     coin: str
 
 
+class TradesReq(BaseModel):
+    owner: str
+    symbol: str
+    cursor: Optional[str] = None
+    limit: int = 500
+
+
 class SymbolsResp(BaseModel):
     symbols: list[str]
 
@@ -85,25 +110,14 @@ def safe_eq(a: str, b: str) -> bool:
     return hmac.compare_digest(a, b)
 
 
-def rpc(cmd: dict, timeout=2.0):  # remote procedure call
-    r = get_client()
-    reply_to = f"controller:replies:{uuid.uuid4().hex}"
-    cmd["reply_to"] = reply_to
-    publish_json(r, CMD_CH, cmd)
-    sub = r.pubsub()
-    sub.subscribe(reply_to)
-    deadline = time.time() + timeout
-    while time.time() < deadline:
-        msg = sub.get_message(timeout=timeout)
-        if msg and msg.get("type") == "message":
-            return json.loads(msg["data"])
-    raise TimeoutError("no reply")
+async def rpc(cmd: dict, timeout=2.0):  # remote procedure call, replies matched by corr_id
+    return await mux.call(cmd, timeout)
 
 
 @api.post("/traders/start")
-def start(req: StartReq):
+async def start(req: StartReq):
     try:
-        response = rpc({"cmd": "start", **req.model_dump()})
+        response = await rpc({"cmd": "start", **req.model_dump()})
         if not response.get("ok"):
             raise HTTPException(400, response)
         return response
@@ -112,9 +126,9 @@ def start(req: StartReq):
 
 
 @api.post("/traders/stop")
-def stop(req: GenReq):
+async def stop(req: GenReq):
     try:
-        response = rpc({"cmd": "stop", **req.model_dump()})
+        response = await rpc({"cmd": "stop", **req.model_dump()})
         if not response.get("ok"):
             raise HTTPException(400, response)
         return response
@@ -123,9 +137,9 @@ def stop(req: GenReq):
 
 
 @api.post("/traders/list")
-def list(req: ListReq):
+async def list(req: ListReq):
     try:
-        response = rpc({"cmd": "list", **req.model_dump()})
+        response = await rpc({"cmd": "list", **req.model_dump()})
         if not response.get("ok"):
             raise HTTPException(400, response)
         return response
@@ -133,10 +147,53 @@ def list(req: ListReq):
         raise HTTPException(504, "controller did not reply")
 
 
+async def status_snapshot(owner: str, symbol: str) -> dict | None:
+    snap = await mux.client.hgetall(status_key(f"{symbol}|{owner}"))
+    if not snap.get("status"):
+        return None
+    return status_view(snap["status"], snap.get("version"))
+
+
 @api.post("/traders/status")
-def status(req: GenReq):
+async def status(req: GenReq):
+    # served from the snapshot the controller publishes, so readers never touch the trading loop
+    d = await status_snapshot(req.owner, req.symbol)
+    if d is not None:
+        return {"ok": True, "status": d, "version": d["version"]}
+    try:
+        response = await rpc({"cmd": "status", **req.model_dump()})
+        if not response.get("ok"):
+            raise HTTPException(400, response)
+        return response
+    except TimeoutError:
+        raise HTTPException(504, "controller did not reply")
+
+
+@api.get("/stream")
+async def stream(request: Request, owner: str, symbol: str):
+    initial = await status_snapshot(owner, symbol)
+    return StreamingResponse(
+        hub.events(request, symbol, owner, initial),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@api.post("/traders/trades")
+def trades(req: TradesReq):
+    if not valid_tid(req.owner, req.symbol):
+        raise HTTPException(400, "invalid owner or symbol")
     try:
-        response = rpc({"cmd": "status", **req.model_dump()})
+        entries, cursor = read_from(journal_dir(req.owner, req.symbol), req.cursor, min(req.limit, 5000))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return {"ok": True, "trades": entries, "cursor": cursor}
+
+
+@api.get("/latency")
+async def latency(symbol: Optional[str] = None):
+    try:
+        response = await rpc({"cmd": "latency", "symbol": symbol})
         if not response.get("ok"):
             raise HTTPException(400, response)
         return response
@@ -145,9 +202,9 @@ def status(req: GenReq):
 
 
 @api.post("/traders/add_coin")
-def add_coin(req: AddCoinReq):
+async def add_coin(req: AddCoinReq):
     try:
-        response = rpc({"cmd": "add_coin", **req.model_dump()})
+        response = await rpc({"cmd": "add_coin", **req.model_dump()})
         if not response:
             raise HTTPException(400, response)
         return response
@@ -228,6 +285,15 @@ def login_check(req: VerifyReq, response: Response):
     return {"ok": True}
 
 
+@app.get("/metrics")
+async def metrics():
+    # every controller, worker and feed process publishes its own snapshot under metrics:{name}
+    keys = [k async for k in mux.client.scan_iter(match=metrics_key("*"))]
+    blobs = await mux.client.mget(keys) if keys else []
+    snapshots = {k.split(":", 1)[1]: json.loads(b) for k, b in zip(keys, blobs) if b}
+    return Response(render_prometheus(snapshots), media_type="text/plain; version=0.0.4")
+
+
 app.include_router(api)
 
 app.mount("/", StaticFiles(directory="var/www/tradeui", html=True), name="ui")
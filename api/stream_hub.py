@@ -0,0 +1,140 @@
+from data.redis_bus import tick_channel, status_channel, status_key
+import redis.asyncio as aredis
+import asyncio
+import json
+import time
+
+MIN_SEND_INTERVAL = 0.1
+KEEPALIVE = 15
+STALE_AFTER = 60
+
+
+def status_view(blob: str, version) -> dict:
+    """Shape a published status blob the way every reader sees it, snapshot or stream"""
+    d = json.loads(blob)
+    last = d.get("last_tick")
+    age = (time.time() - last) if last is not None else None
+    d["tick_age"] = age
+    d["stale"] = (age is not None and age >= STALE_AFTER)
+    d["version"] = int(version or 0)
+    return d
+
+
+class StreamClient:
+    """One browser connection. Only the latest tick and status are kept, so a
+    slow client skips stale updates instead of building a backlog."""
+
+    def __init__(self, symbol: str, tid: str):
+        self.symbol = symbol
+        self.tid = tid
+        self.latest: dict[str, str] = {}
+        self.event = asyncio.Event()
+
+    def offer(self, kind: str, data: str):
+        self.latest[kind] = data
+        self.event.set()
+
+    def drain(self) -> list[tuple[str, str]]:
+        items = list(self.latest.items())
+        self.latest.clear()
+        self.event.clear()
+        return items
+
+
+class StreamHub:
+    """Shares one Redis subscription per channel across every SSE client in
+    this API process; channels are dropped when their last client leaves."""
+
+    def __init__(self, host: str = "localhost", port: int = 6379):
+        self.host = host
+        self.port = port
+        self._clients: dict[str, set[StreamClient]] = {}
+        self._client = None
+        self._task = None
+
+    async def start(self):
+        self._client = aredis.Redis(host=self.host, port=self.port, decode_responses=True)
+        self._task = asyncio.create_task(self._run(), name="stream-hub")
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._client:
+            await self._client.aclose()
+
+    def attach(self, symbol: str, owner: str) -> StreamClient:
+        client = StreamClient(symbol, f"{symbol}|{owner}")
+        for ch in (tick_channel(symbol), status_channel(client.tid)):
+            self._clients.setdefault(ch, set()).add(client)
+        return client
+
+    def detach(self, client: StreamClient):
+        for ch in (tick_channel(client.symbol), status_channel(client.tid)):
+            clients = self._clients.get(ch)
+            if clients is not None:
+                clients.discard(client)
+                if not clients:
+                    self._clients.pop(ch, None)
+
+    async def _run(self):
+        ps = self._client.pubsub(ignore_subscribe_messages=True)
+        subscribed = set()
+        while True:
+            try:
+                # subscription changes are applied here so only this task touches the pubsub
+                wanted = set(self._clients.keys())
+                if subscribed - wanted:
+                    await ps.unsubscribe(*(subscribed - wanted))
+                if wanted - subscribed:
+                    await ps.subscribe(*(wanted - subscribed))
+                subscribed = wanted
+                if not subscribed:
+                    await asyncio.sleep(0.2)
+                    continue
+                msg = await ps.get_message(ignore_subscribe_messages=True, timeout=0.2)
+                if not msg or msg.get("type") != "message":
+                    continue
+                ch = msg["channel"]
+                if ch.startswith("ticks:"):
+                    kind, data = "tick", msg["data"]
+                else:
+                    # same shape as the initial snapshot; looked up once per change, not per client
+                    tid = ch.split(":", 1)[1]
+                    version = await self._client.hget(status_key(tid), "version")
+                    kind, data = "status", json.dumps(status_view(msg["data"], version))
+                for client in list(self._clients.get(ch, ())):
+                    client.offer(kind, data)
+            except asyncio.CancelledError:
+                await ps.aclose()
+                raise
+            except Exception as e:
+                print(f"[API] stream hub error: {e}")
+                try:
+                    await ps.aclose()
+                except Exception:
+                    pass
+                await asyncio.sleep(1)
+                ps = self._client.pubsub(ignore_subscribe_messages=True)
+                subscribed = set()
+
+    async def events(self, request, symbol: str, owner: str, initial: dict | None = None):
+        client = self.attach(symbol, owner)
+        try:
+            if initial is not None:
+                yield f"event: status\ndata: {json.dumps(initial)}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    await asyncio.wait_for(client.event.wait(), KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                for kind, data in client.drain():
+                    yield f"event: {kind}\ndata: {data}\n\n"
+                # caps the per-connection send rate; anything newer is conflated meanwhile
+                await asyncio.sleep(MIN_SEND_INTERVAL)
+        finally:
+            self.detach(client)
@@ -0,0 +1,162 @@
+from backtest.sim import BacktestRules, SimStrategy, PREDICTION_TTL
+from controllers.trade_controller import on_message
+from data.tick_archive import TickArchive
+from storage.trade_logger import make_entry
+import numpy as np
+import contextlib
+import json
+import io
+
+FIRST_WINDOW = 256
+MAX_WINDOW = 1 << 20
+
+
+def load_ticks(symbol: str | None = None, csv: str | None = None, start_ms: int | None = None, end_ms: int | None = None, archive: TickArchive | None = None):
+    """(ts in seconds, price) arrays from the tick archive or a `ts,price[,...]` CSV"""
+    if csv is not None:
+        raw = np.loadtxt(csv, delimiter=",", usecols=(0, 1), ndmin=2, comments="#", skiprows=_header_rows(csv))
+        ts, price = raw[:, 0], raw[:, 1]
+        if len(ts) and ts[0] > 1e11:
+            ts = ts / 1000.0
+        if start_ms is not None or end_ms is not None:
+            keep = np.ones(len(ts), dtype=bool)
+            if start_ms is not None:
+                keep &= ts * 1000 >= start_ms
+            if end_ms is not None:
+                keep &= ts * 1000 < end_ms
+            ts, price = ts[keep], price[keep]
+        return np.ascontiguousarray(ts), np.ascontiguousarray(price)
+    records = (archive or TickArchive()).range(symbol, start_ms, end_ms)
+    return records["ts"] / 1000.0, records["price"]
+
+
+def _header_rows(path: str) -> int:
+    with open(path) as f:
+        first = f.readline().split(",")[0].strip()
+    try:
+        float(first)
+        return 0
+    except ValueError:
+        return 1
+
+
+def run_reference(symbol: str, ts, price, rules: BacktestRules = BacktestRules(), funds: float | None = None) -> list[dict]:
+    """Event-by-event replay through trade_controller.on_message"""
+    strat = SimStrategy(symbol, rules, funds)
+    out = []
+
+    def log(sym, px, event, owner, amount=None, note=None):
+        out.append(make_entry(sym, px, event, amount, note, rawtimestamp=strat.pm.now))
+
+    if len(price):
+        strat.high_24h = strat.low_24h = float(price[0])
+    # on_message prints every tick; that is noise at replay speed
+    with contextlib.redirect_stdout(io.StringIO()):
+        for t, p in zip(ts.tolist(), price.tolist()):
+            strat.pm.now = t
+            on_message(strat, p, log=log)
+    return out
+
+
+def _first_at_or_below(price, lo: int, hi: int, level: float) -> int:
+    """First index in [lo, hi) with price <= level, else hi. Windows grow
+    geometrically so the cost tracks how far away the hit is."""
+    w = FIRST_WINDOW
+    while lo < hi:
+        end = min(lo + w, hi)
+        hit = price[lo:end] <= level
+        if hit.any():
+            return lo + int(hit.argmax())
+        lo = end
+        w = min(w * 2, MAX_WINDOW)
+    return hi
+
+
+def _first_stop_hit(price, lo: int, n: int, basis: float, c: float):
+    """First index t >= lo where price[t] <= c * max(basis, price[lo-1 .. t-1]).
+    Returns (t, stop) or (n, None)."""
+    w = FIRST_WINDOW
+    while lo < n:
+        end = min(lo + w, n)
+        seg = price[lo:end]
+        peak = np.empty(len(seg))
+        peak[0] = basis
+        if len(seg) > 1:
+            np.maximum(np.maximum.accumulate(seg[:-1]), basis, out=peak[1:])
+        stops = peak * c
+        hit = seg <= stops
+        if hit.any():
+            k = int(hit.argmax())
+            return lo + k, float(stops[k])
+        basis = max(basis, float(seg.max()))
+        lo = end
+        w = min(w * 2, MAX_WINDOW)
+    return n, None
+
+
+def _stale_index(ts, lo: int, n: int, t0: float) -> int:
+    """First index >= lo whose age against t0 is over PREDICTION_TTL, matching the
+    `now - ts > 86400` check exactly"""
+    r = int(np.searchsorted(ts, t0 + PREDICTION_TTL, side="left"))
+    r = max(r, lo)
+    while r < n and not (ts[r] - t0 > PREDICTION_TTL):
+        r += 1
+    while r > lo and ts[r - 1] - t0 > PREDICTION_TTL:
+        r -= 1
+    return r
+
+
+def run_vectorized(symbol: str, ts, price, rules: BacktestRules = BacktestRules(), funds: float | None = None) -> list[dict]:
+    """Same fills and log entries as run_reference, but each phase (waiting for
+    the buy limit, riding the trailing stop) is a NumPy scan instead of a
+    Python step per tick."""
+    n = len(price)
+    out = []
+    buy_k = 1 - rules.buy_offset / 100
+    sell_k = 1 + rules.take_profit / 100
+    c = 1 - (rules.stop_loss / 100)
+    balance = funds
+    log_balance = None
+
+    def log(t, px, event, amount=None):
+        out.append(make_entry(symbol, px, event, amount, rawtimestamp=float(ts[t])))
+
+    i = 1
+    while i < n:
+        entry = float(price[i - 1]) * buy_k
+        t0 = float(ts[i])
+        log(i, entry, "buy_prediction")
+        r = _stale_index(ts, i, n, t0)
+        j = _first_at_or_below(price, i, min(r + 1, n), entry)
+        if j >= n or j > r:
+            if r >= n:
+                break
+            log(r, None, "prediction reset")
+            i = r + 1
+            continue
+
+        qty = None
+        if funds is not None:
+            qty = balance / entry
+            log_balance = None
+        log(j, entry, "buy_executed", qty)
+        if j + 1 >= n:
+            break
+        sell_price = entry * sell_k
+        log(j + 1, sell_price, "sell_prediction")
+        t, stop = _first_stop_hit(price, j + 1, n, max(entry, float(price[j])), c)
+        if stop is None:
+            break
+        if funds is not None:
+            balance = qty * sell_price
+            log_balance = balance
+        log(t, stop, "trailing stop sale", log_balance)
+        if ts[t] - t0 > PREDICTION_TTL:
+            log(t, None, "prediction reset")
+        i = t + 1
+    return out
+
+
+def write_trade_calls(entries: list[dict], path: str):
+    with open(path, "w") as f:
+        json.dump(entries, f, indent=2)
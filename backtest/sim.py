@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+from storage.position_manager import Position_manager
+import time
+
+PREDICTION_TTL = 86400
+
+
+@dataclass(frozen=True)
+class BacktestRules:
+    """Strategy parameters, all in percent.
+
+    buy_offset: buy limit below the last price
+    take_profit: sell limit above the entry
+    stop_loss: trailing stop distance below the highest price since entry"""
+    buy_offset: float = 1.0
+    take_profit: float = 2.0
+    stop_loss: float = 1.0
+
+
+class SimPositionManager(Position_manager):
+    """Position_manager on a replay clock that never touches the disk.
+    Falls back to the wall clock while `now` is unset."""
+
+    journaled = False
+
+    def __init__(self, symbol, owner="backtest"):
+        super().__init__(symbol, owner)
+        self.initialize_symbol()
+        self.now = None
+
+    def clock(self):
+        return time.time() if self.now is None else self.now
+
+    def set_buy_limit(self, entry_price):
+        super().set_buy_limit(entry_price)
+        self.positions.buy_prediction_timestamp = self.clock()
+
+    def prediction_age(self):
+        ts = self.positions.buy_prediction_timestamp
+        if ts:
+            return self.clock() - ts
+        return None
+
+    def save_to_file(self):
+        pass
+
+    def flush(self):
+        pass
+
+
+class SimStrategy:
+    """Stand-in for TradingStrategy with the limits defined by BacktestRules,
+    so the vectorized engine can reproduce them exactly."""
+
+    def __init__(self, symbol: str, rules: BacktestRules, funds: float | None = None, owner: str = "backtest"):
+        self.symbol = symbol
+        self.owner = owner
+        self.rules = rules
+        self.pm = SimPositionManager(symbol, owner)
+        if funds is not None:
+            self.pm.positions.funds_config = funds
+            self.pm.positions.balance = funds
+        self.stop_loss_threshold = rules.stop_loss
+        self.last_price = None
+        self.trend_state = None
+        self.local_high = None
+        self.local_low = None
+        self.high_24h = None
+        self.low_24h = None
+        self.entry_price = None
+        self.sell_price = None
+        self.last_sale_price = None
+        self.trailing_stop = None
+        self.balance = None
+
+    def generate_buy_price(self):
+        return self.last_price * (1 - self.rules.buy_offset / 100)
+
+    def generate_sell_price(self):
+        return self.entry_price * (1 + self.rules.take_profit / 100)
+
+    def should_buy(self, price):
+        return price <= self.entry_price
+
+    def should_sell(self, price):
+        return price <= self.trailing_stop
+
+    def update_trend_extremes(self, price):
+        pass
+
+    def update_trailing_stop(self, price):
+        stop = price * (1 - (self.stop_loss_threshold / 100))
+        if stop > self.trailing_stop:
+            self.trailing_stop = stop
+            self.pm.positions.trailing_stop = stop
+
+    def save_position(self):
+        pass
@@ -0,0 +1,165 @@
+from backtest.engine import load_ticks, run_vectorized
+from backtest.sim import BacktestRules
+from data.tick_archive import TickArchive, day_of, segment_paths
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, fields
+from utils.analyzer import closed_trades, compute_metrics
+import numpy as np
+import itertools
+import hashlib
+import random
+import json
+import os
+
+CACHE_DIR = os.path.join("tick_data", ".sweep")
+BATCH = 8
+RANK_BY = ("total_pnl", "win_rate", "max_drawdown")
+
+_loaded: dict[str, np.ndarray] = {}
+
+
+def grid(**axes) -> list[BacktestRules]:
+    """Every combination of the given BacktestRules values, e.g. grid(stop_loss=[0.5, 1, 2])"""
+    names = list(axes)
+    for k in names:
+        if isinstance(axes[k], tuple):
+            raise ValueError(f"{k}: lo:hi ranges are for random sampling, give a list of values for a grid")
+    return [BacktestRules(**dict(zip(names, combo))) for combo in itertools.product(*(axes[k] for k in names))]
+
+
+def sample(n: int, seed: int = 0, **ranges) -> list[BacktestRules]:
+    """n random rule sets, each field drawn uniformly from a (lo, hi) range or picked from a list"""
+    rng = random.Random(seed)
+    return [BacktestRules(**{k: round(rng.uniform(*v), 4) if isinstance(v, tuple) else rng.choice(v) for k, v in ranges.items()}) for _ in range(n)]
+
+
+def job_key(symbol: str, start: str | None, end: str | None, rules: BacktestRules, csv: str | None = None, source: str | None = None) -> str:
+    """Identifies a result; `source` is the input's hash, so rows computed from older ticks never match"""
+    return json.dumps([symbol, start, end, [getattr(rules, f.name) for f in fields(rules)], csv, source])
+
+
+def _source_stamp(symbol: str, start_ms: int | None, end_ms: int | None, csv: str | None) -> list:
+    """Changes whenever the input does: the CSV's size/mtime, or the size of every
+    archive day in range (segments only ever grow, and new days add entries)"""
+    if csv is not None:
+        st = os.stat(csv)
+        return [st.st_size, st.st_mtime_ns]
+    archive = TickArchive()
+    stamp = []
+    for day in archive.days(symbol):
+        if (start_ms is not None and day < day_of(start_ms)) or (end_ms is not None and day > day_of(end_ms)):
+            continue
+        data_path, _ = segment_paths(symbol, day, archive.root)
+        stamp.append([day, os.path.getsize(data_path)])
+    return stamp
+
+
+def _source_hash(symbol: str, start_ms: int | None, end_ms: int | None, csv: str | None = None) -> str:
+    return hashlib.blake2b(json.dumps(_source_stamp(symbol, start_ms, end_ms, csv)).encode(), digest_size=8).hexdigest()
+
+
+def prepare(symbol: str, start_ms: int | None, end_ms: int | None, csv: str | None = None, cache_dir: str = CACHE_DIR, source: str | None = None) -> str:
+    """Write the (ts, price) series once as a .npy that every worker maps read-only,
+    so the ticks live in the page cache once instead of being pickled per task"""
+    os.makedirs(cache_dir, exist_ok=True)
+    tag = hashlib.blake2b(json.dumps([symbol, start_ms, end_ms, csv]).encode(), digest_size=8).hexdigest()
+    source = source or _source_hash(symbol, start_ms, end_ms, csv)
+    prefix = f"{symbol.replace('/', '_')}-{tag}-"
+    path = os.path.join(cache_dir, f"{prefix}{source}.npy")
+    if not os.path.exists(path):
+        for old in os.listdir(cache_dir):
+            if old.startswith(prefix):
+                os.remove(os.path.join(cache_dir, old))  # same dataset, older input
+        ts, price = load_ticks(symbol, csv, start_ms, end_ms)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, np.vstack([ts, price]))
+        os.replace(tmp, path)
+    return path
+
+
+def _series(path: str) -> np.ndarray:
+    arr = _loaded.get(path)
+    if arr is None:
+        arr = _loaded[path] = np.load(path, mmap_mode="r")
+    return arr
+
+
+def _evaluate(path: str, symbol: str, start: str | None, end: str | None, csv: str | None, source: str, batch: list[BacktestRules]) -> list[dict]:
+    series = _series(path)
+    ts, price = series[0], series[1]
+    rows = []
+    for rules in batch:
+        m = compute_metrics(closed_trades(run_vectorized(symbol, ts, price, rules))) or {"trades": 0}
+        rows.append({"key": job_key(symbol, start, end, rules, csv, source), "symbol": symbol, "start": start, "end": end, **asdict(rules), **m})
+    return rows
+
+
+def _dataset_key(symbol: str, start: str | None, end: str | None, csv: str | None) -> str:
+    return json.dumps([symbol, start, end, csv])
+
+
+def _stale(key: str, current: dict[str, str]) -> bool:
+    """A row for one of the swept datasets that was computed from other ticks (an open end,
+    a rewritten CSV, a grown archive day) or written before keys carried the source"""
+    k = json.loads(key)
+    dataset = _dataset_key(k[0], k[1], k[2], k[4] if len(k) > 4 else None)
+    return dataset in current and (len(k) < 6 or k[5] != current[dataset])
+
+
+def load_results(path: str) -> list[dict]:
+    rows = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # torn last line from an interrupted sweep
+                    break
+    except FileNotFoundError:
+        pass
+    return rows
+
+
+def sweep(datasets, rule_sets: list[BacktestRules], results_path: str, workers: int | None = None) -> list[dict]:
+    """datasets: [(symbol, start, end, start_ms, end_ms, csv)]. Finished jobs already in
+    results_path are skipped unless their input has changed since; new rows are appended
+    as they complete."""
+    sources = [_source_hash(symbol, start_ms, end_ms, csv) for symbol, _, _, start_ms, end_ms, csv in datasets]
+    current = {_dataset_key(symbol, start, end, csv): source for (symbol, start, end, _, _, csv), source in zip(datasets, sources)}
+    rows = [r for r in load_results(results_path) if not _stale(r["key"], current)]
+    done = {r["key"] for r in rows}
+    # rewrite the file without stale rows or a possibly torn tail before appending to it
+    with open(results_path, "w") as f:
+        for r in rows:
+            f.write(json.dumps(r) + "\n")
+
+    work = []
+    for (symbol, start, end, start_ms, end_ms, csv), source in zip(datasets, sources):
+        todo = [r for r in rule_sets if job_key(symbol, start, end, r, csv, source) not in done]
+        if todo:
+            path = prepare(symbol, start_ms, end_ms, csv, source=source)
+            work += [(path, symbol, start, end, csv, source, todo[i:i + BATCH]) for i in range(0, len(todo), BATCH)]
+    total = sum(len(w[-1]) for w in work)
+    print(f"[INFO] {len(done)} results already on disk, {total} to run")
+    if not work:
+        return rows
+
+    finished = 0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool, open(results_path, "a") as out:
+        futures = [pool.submit(_evaluate, *w) for w in work]
+        for fut in as_completed(futures):
+            batch_rows = fut.result()
+            for r in batch_rows:
+                out.write(json.dumps(r) + "\n")
+            out.flush()
+            rows += batch_rows
+            finished += len(batch_rows)
+            print(f"[INFO] {finished}/{total}")
+    return rows
+
+
+def rank(rows: list[dict], by=RANK_BY) -> list[dict]:
+    """Best first: higher PnL, then higher win rate, then shallower drawdown"""
+    return sorted((r for r in rows if r.get("trades")), key=lambda r: tuple(r[k] for k in by), reverse=True)
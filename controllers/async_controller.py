@@ -0,0 +1,278 @@
+from controllers.controller import Controller, CTRL_LIVE_KEY
+from controllers.tick_dispatcher import QUEUE_SIZE, STALE_AFTER
+from data.redis_bus import tick_channel, feed_wires_key
+from data.tick_codec import wire_hint
+from utils.metrics import REGISTRY
+from concurrent.futures import ThreadPoolExecutor
+import redis.asyncio as aredis
+import threading
+import asyncio
+import time
+import json
+import os
+
+CMD_CH = "controller:commands"
+TRADER_THREADS = int(os.getenv("ASYNC_TRADER_THREADS", "8"))
+
+
+class AsyncController(Controller):
+    """Opt-in asyncio runtime for the controller.
+
+    Traders are tasks fed from a single tick reader, commands are handled by
+    a coroutine on the same loop. Command payloads and replies go through the
+    inherited `_handle_command`, so the `controller:commands` protocol is the
+    same as the threaded engine.
+
+    Nothing that can block runs on the loop: each trader hands its queued ticks
+    to a small thread pool in one call (on_message, trade log and position
+    fsyncs), and command handling runs in the default executor. Trader task
+    bookkeeping always happens on the loop thread."""
+
+    def __init__(self, host: str = "localhost", port: int = 6379, queue_size: int = QUEUE_SIZE, stale_after: float = STALE_AFTER):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.stale_after = stale_after
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread = None
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._tick_queues: dict[str, dict[str, asyncio.Queue]] = {}
+        self.aclient = None
+        self._wire_warned = False
+        self._trader_pool = ThreadPoolExecutor(max_workers=TRADER_THREADS, thread_name_prefix="trader")
+
+    # --- trader lifecycle (always runs on the loop) ---
+
+    def _off_loop(self) -> bool:
+        return self.loop is not None and threading.get_ident() != self._loop_thread
+
+    def _on_loop(self, fn, *args):
+        """Run fn on the loop thread and wait for it; called from restore and command threads"""
+        async def call():
+            return fn(*args)
+        return asyncio.run_coroutine_threadsafe(call(), self.loop).result()
+
+    def _spawn_traders(self, traders) -> list[str]:
+        if self._off_loop():
+            return self._on_loop(self._spawn_traders, traders)
+        started = []
+        for symbol, owner, fund_amnt in traders:
+            tid = f"{symbol}|{owner}"
+            task = self._tasks.get(tid)
+            if task and not task.done():
+                continue
+            self._tasks[tid] = self.loop.create_task(self._run_trader(symbol, owner, fund_amnt), name=f"trader-{tid}")
+            started.append(tid)
+        return started
+
+    def stop_trader(self, owner, symbol):
+        if self._off_loop():
+            return self._on_loop(self.stop_trader, owner, symbol)
+        tid = f"{symbol}|{owner}"
+        task = self._tasks.pop(tid, None)
+        if not task:
+            if self._cancel_restore(tid):
+                print(f"[CTRL] {symbol} will not be restored")
+                return True
+            print(f"[CTRL] no task for {symbol}")
+            return False
+        task.cancel()
+        with self._cache_lock:
+            self._strats.pop(tid, None)
+        self._forget_restore(tid)
+        print(f"[CTRL] Trader stopped for {symbol}")
+        return True
+
+    def _stop_all(self):
+        if self._off_loop():
+            return self._on_loop(self._stop_all)
+        with self._cache_lock:
+            self._restore_cancelled.update(self._restore_pending)
+            self._restore_pending.clear()
+            self._restore_failed.clear()
+        stopped = list(self._tasks.keys())
+        for tid in stopped:
+            self._tasks.pop(tid).cancel()
+            with self._cache_lock:
+                self._strats.pop(tid, None)
+        return {"ok": True, "stopped": stopped, "still_running": []}
+
+    async def _run_trader(self, symbol, owner, fund_amnt):
+        tid = f"{symbol}|{owner}"
+        ticks = asyncio.Queue(maxsize=self.queue_size)
+        self._tick_queues.setdefault(symbol, {})[tid] = ticks
+        strategy = None
+        loop = asyncio.get_running_loop()
+        busy = threading.Lock()  # a cancelled batch keeps running in the pool; the close waits for it
+        try:
+            strategy = await loop.run_in_executor(self._trader_pool, self.get_or_create_strat, symbol, owner, fund_amnt)
+            print(f"[INFO] Strategy started for {tid}")
+            while True:
+                batch = [await ticks.get()]
+                while not ticks.empty():
+                    batch.append(ticks.get_nowait())
+                await loop.run_in_executor(self._trader_pool, self._on_ticks, strategy, batch, busy)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"[ERROR] Strategy for {tid} encountered an error: {e}")
+        finally:
+            self.trader_latency.pop(tid, None)
+            traders = self._tick_queues.get(symbol, {})
+            traders.pop(tid, None)
+            if not traders:
+                self._tick_queues.pop(symbol, None)
+                self._release_market(symbol, tid)
+            if strategy is not None:
+                await loop.run_in_executor(self._trader_pool, self._close_strategy, strategy, busy)
+            print(f"[INFO] Strategy stopped for {symbol}")
+
+    def _on_ticks(self, strategy, batch, busy):
+        with busy:
+            for tick in batch:
+                self._on_tick(strategy, tick)
+
+    def _close_strategy(self, strategy, busy):
+        with busy:
+            strategy.save_position()
+            strategy.pm.flush()
+            strategy.pm.close()
+
+    # --- tick fan-out ---
+
+    def _fan_out(self, symbol: str, msg: dict):
+        traders = self._tick_queues.get(symbol)
+        if not traders:
+            return
+        self.last_tick[symbol] = time.time()
+        self.dispatcher.count_tick(symbol)
+        item = self._prepare_tick(symbol, msg)
+        for q in list(traders.values()):
+            if q.full():
+                q.get_nowait()
+                self.dispatcher.dropped += 1
+                REGISTRY.inc("ticks_dropped_total", (symbol,))
+            q.put_nowait(item)
+
+    async def _tick_reader(self):
+        wire, decode = self.dispatcher.wire, self.dispatcher.decode
+        client = self.aclient
+        if wire == "binary":
+            client = aredis.Redis(host=self.host, port=self.port, decode_responses=False)
+        ps = client.pubsub(ignore_subscribe_messages=True)
+        subscribed = set()
+        while not self.controller_stop.is_set():
+            try:
+                now = time.time()
+                wanted = set(self._tick_queues.keys())
+                if subscribed - wanted:
+                    await ps.unsubscribe(*[tick_channel(s, wire) for s in subscribed - wanted])
+                if wanted - subscribed:
+                    await ps.subscribe(*[tick_channel(s, wire) for s in wanted - subscribed])
+                    for s in wanted - subscribed:
+                        self.last_tick[s] = now
+                for s in wanted & subscribed:
+                    if now - self.last_tick.get(s, now) > self.stale_after:
+                        print(f"[CTRL] no ticks for {s} in {self.stale_after}s, resubscribing")
+                        await ps.unsubscribe(tick_channel(s, wire))
+                        await ps.subscribe(tick_channel(s, wire))
+                        self.last_tick[s] = now
+                        self.dispatcher.resubscribes += 1
+                        REGISTRY.inc("resubscribes_total", (s,))
+                        if not self._wire_warned:
+                            hint = wire_hint(await self.aclient.get(feed_wires_key()), wire)
+                            if hint:
+                                self._wire_warned = True
+                                print(f"[CTRL] {hint}")
+                subscribed = wanted
+                if not subscribed:
+                    await asyncio.sleep(0.5)
+                    continue
+                msg = await ps.get_message(ignore_subscribe_messages=True, timeout=0.5)
+                if not msg or msg.get("type") != "message":
+                    continue
+                tick = decode(msg["data"])
+                self._fan_out(tick.get("symbol"), tick)
+            except Exception as e:
+                print(f"[CTRL] tick reader error: {e}")
+                try:
+                    await ps.aclose()
+                except Exception:
+                    pass
+                await asyncio.sleep(1)
+                ps = client.pubsub(ignore_subscribe_messages=True)
+                subscribed = set()
+        await ps.aclose()
+        if client is not self.aclient:
+            await client.aclose()
+
+    # --- control plane ---
+
+    async def handle_command(self, p: dict) -> dict:
+        # commands may hit the network or disk (position files, REST seeds, symbol_list.json);
+        # anything that touches trader tasks hops back onto the loop by itself
+        return await asyncio.to_thread(self._handle_command, p)
+
+    async def _control_loop(self):
+        ps = None
+        while not self.controller_stop.is_set():
+            try:
+                if ps is None:
+                    ps = self.aclient.pubsub(ignore_subscribe_messages=True)
+                    await ps.subscribe(CMD_CH)
+                msg = await ps.get_message(ignore_subscribe_messages=True, timeout=0.5)
+            except Exception as e:
+                print(f"[CTRL] command subscription error: {e}, reconnecting")
+                if ps is not None:
+                    try:
+                        await ps.aclose()
+                    except Exception:
+                        pass
+                    ps = None  # resubscribe on the next pass
+                await asyncio.sleep(1)
+                continue
+            if not msg or msg.get("type") != "message":
+                continue
+            try:
+                payload = json.loads(msg["data"])
+                result = await self.handle_command(payload)
+                reply_to = payload.get("reply_to")
+                if reply_to and result is not None:
+                    await self.aclient.publish(reply_to, json.dumps(self._reply_body(payload, result)))
+            except Exception as e:
+                print(f"[CRTL] controller error: {e}")
+                try:
+                    await self.aclient.set(CTRL_LIVE_KEY, "false")
+                except Exception:
+                    pass
+        if ps is not None:
+            await ps.aclose()
+
+    async def _main(self):
+        self.loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        loop = self.loop
+        REGISTRY.gauge("asyncio_tasks", "Tasks on the controller loop", lambda: len(asyncio.all_tasks(loop)))
+        REGISTRY.gauge("trader_queue_depth", "Ticks waiting in each trader queue",
+                       lambda: {(tid,): q.qsize() for traders in list(self._tick_queues.values()) for tid, q in list(traders.items())}, ("tid",))
+        self.aclient = aredis.Redis(host=self.host, port=self.port, decode_responses=True)
+        print(f"[CTRL] Controller starting (asyncio engine)")
+        reader = asyncio.create_task(self._tick_reader(), name="tick-reader")
+        control = asyncio.create_task(self._control_loop(), name="control-loop")
+        self.startup()
+        self.start_status_publisher()
+        await self.aclient.set(CTRL_LIVE_KEY, "true")
+        while not self.controller_stop.is_set():
+            await asyncio.sleep(0.5)
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(reader, control, *self._tasks.values(), return_exceptions=True)
+        self._trader_pool.shutdown(wait=True)
+        await self.aclient.aclose()
+
+    def run_control_loop(self):
+        asyncio.run(self._main())
+
+    def _active_tids(self) -> list[str]:
+        return list(self._tasks.keys())
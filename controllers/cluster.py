@@ -0,0 +1,297 @@
+from controllers.controller import Controller
+from redis.exceptions import WatchError
+import threading
+import hashlib
+import json
+import os
+import time
+
+CONTROLLER_ID = os.getenv("CONTROLLER_ID", "alpha")
+MEMBERS_KEY = "controller:members"
+TRADERS_KEY = "controller:traders"
+LEASE_MS = 10000
+REBALANCE_EVERY = 5
+CLAIM_MARGIN = 1.0  # seconds a claim is treated as lost before its key can actually expire
+
+
+def lease_key(controller_id: str) -> str:
+    return f"controller:lease:{controller_id}"
+
+
+def claim_key(tid: str) -> str:
+    return f"owner:{tid}"
+
+
+def owner_of(tid: str, members) -> str | None:
+    """Rendezvous hash: every instance computes the same owner from the same member list"""
+    best, best_score = None, -1
+    for member in members:
+        score = int.from_bytes(hashlib.blake2b(f"{member}|{tid}".encode(), digest_size=8).digest(), "big")
+        if score > best_score:
+            best, best_score = member, score
+    return best
+
+
+class ClusterController(Controller):
+    """One of several controller@{id} instances sharing the trader key space.
+
+    Each instance holds a lease in Redis and renews it; the trader registry
+    (controller:traders) is shared. Ownership of a trader is a rendezvous hash
+    over the instances with a live lease, so when a lease lapses the survivors
+    pick up its traders on their next rebalance without any coordination.
+    Every instance sees every command on controller:commands; trader commands
+    are answered by the owner, fleet-wide ones by the leader (lowest live id).
+
+    Member lists can disagree for a moment, so the hash only says who should
+    run a trader. Running it takes a claim, owner:{tid} set NX with the lease
+    TTL and renewed with the lease; a trader whose claim is not held skips its
+    ticks and its position writes until the rebalance stops it."""
+
+    def __init__(self, controller_id: str = CONTROLLER_ID, lease_ms: int = LEASE_MS):
+        super().__init__()
+        self.id = controller_id
+        self.lease_ms = lease_ms
+        self.members: list[str] = [controller_id]
+        self.metrics_name = f"controller@{controller_id}"
+        self._rebalance_now = threading.Event()
+        self._claims: dict[str, float] = {}  # tid -> local time the claim is good until
+
+    # --- membership ---
+
+    def _renew(self) -> list[str]:
+        self.rclient.set(lease_key(self.id), str(time.time()), px=self.lease_ms)
+        self.rclient.sadd(MEMBERS_KEY, self.id)
+        candidates = sorted(self.rclient.smembers(MEMBERS_KEY))
+        pipe = self.rclient.pipeline()
+        for member in candidates:
+            pipe.exists(lease_key(member))
+        live = [m for m, alive in zip(candidates, pipe.execute()) if alive]
+        dead = set(candidates) - set(live)
+        if dead:
+            self.rclient.srem(MEMBERS_KEY, *dead)
+        return live
+
+    def _lease_loop(self):
+        while not self.controller_stop.is_set():
+            try:
+                live = self._renew()
+                if live != self.members:
+                    print(f"[CTRL] cluster members: {live}")
+                    self.members = live
+                    self._rebalance_now.set()
+                if self._renew_claims():
+                    self._rebalance_now.set()
+            except Exception as e:
+                print(f"[CTRL] lease renew failed: {e}")
+            self.controller_stop.wait(self.lease_ms / 3000)
+
+    def is_leader(self) -> bool:
+        return bool(self.members) and self.members[0] == self.id
+
+    def owns(self, tid: str) -> bool:
+        return owner_of(tid, self.members) == self.id
+
+    # --- trader claims ---
+
+    def holds(self, tid: str) -> bool:
+        return self._claims.get(tid, 0) > time.time()
+
+    def _fence(self, tid: str):
+        return lambda: self.holds(tid)
+
+    def _claim(self, tid: str) -> bool:
+        t0 = time.time()
+        key = claim_key(tid)
+        if not self.rclient.set(key, self.id, nx=True, px=self.lease_ms):
+            pipe = self.rclient.pipeline()
+            pipe.get(key)
+            pipe.pttl(key)
+            holder, ttl = pipe.execute()
+            if holder != self.id or ttl < CLAIM_MARGIN * 1000:
+                return False  # another instance runs it; our rebalance retries once it hands off
+            self._claims[tid] = t0 + ttl / 1000 - CLAIM_MARGIN
+            return True
+        self._claims[tid] = t0 + self.lease_ms / 1000 - CLAIM_MARGIN
+        return True
+
+    def _renew_claims(self) -> list[str]:
+        """Extend every claim still ours; returns the tids whose claim was lost"""
+        tids = list(self._claims)
+        if not tids:
+            return []
+        t0 = time.time()
+        pipe = self.rclient.pipeline(transaction=False)
+        for tid in tids:
+            pipe.get(claim_key(tid))
+            pipe.pttl(claim_key(tid))
+        replies = pipe.execute()
+        pipe = self.rclient.pipeline(transaction=False)
+        kept, lost = [], []
+        for i, tid in enumerate(tids):
+            holder, ttl = replies[2 * i], replies[2 * i + 1]
+            # only extend a key with time to spare, so it cannot have expired and been retaken in between
+            if holder == self.id and ttl > CLAIM_MARGIN * 1000:
+                pipe.pexpire(claim_key(tid), self.lease_ms)
+                kept.append(tid)
+            else:
+                lost.append(tid)
+        if kept:
+            pipe.execute()
+        for tid in kept:
+            if tid in self._claims:
+                self._claims[tid] = t0 + self.lease_ms / 1000 - CLAIM_MARGIN
+        for tid in lost:
+            print(f"[CTRL] lost claim on {tid}")
+            self._claims.pop(tid, None)
+        return lost
+
+    def _release(self, tid: str):
+        self._claims.pop(tid, None)
+        key = claim_key(tid)
+        try:
+            with self.rclient.pipeline() as pipe:
+                pipe.watch(key)
+                if pipe.get(key) != self.id:
+                    pipe.unwatch()
+                    return
+                pipe.multi()
+                pipe.delete(key)
+                pipe.execute()
+        except WatchError:
+            pass  # retaken by another instance meanwhile, which is what releasing allows
+
+    # --- rebalancing ---
+
+    def _fund(self, blob) -> float | None:
+        try:
+            return json.loads(blob).get("fund_amnt")
+        except (TypeError, ValueError, AttributeError):
+            return None
+
+    def rebalance(self):
+        registry = self.rclient.hgetall(TRADERS_KEY)
+        mine = {tid for tid in registry if self.owns(tid)}
+        for tid in self._active_tids():
+            if tid in mine and self.holds(tid):
+                continue
+            symbol, owner = tid.split("|", 1)
+            print(f"[CTRL] handing off {tid}")
+            if self.stop_trader(owner, symbol):
+                self._release(tid)
+        for tid in set(self._claims) - mine:
+            self._release(tid)  # claimed for a restore that has not started it, no longer ours
+        running = set(self._active_tids())
+        to_start = [tid for tid in sorted(mine - running) if self._claim(tid)]
+        if to_start:
+            print(f"[CTRL] claiming {len(to_start)} traders")
+            self._restore(to_start, {tid: self._fund(registry.get(tid)) for tid in to_start})
+
+    def _rebalance_loop(self):
+        while not self.controller_stop.is_set():
+            self._rebalance_now.wait(REBALANCE_EVERY)
+            self._rebalance_now.clear()
+            if self.controller_stop.is_set():
+                break
+            try:
+                self.rebalance()
+            except Exception as e:
+                print(f"[CTRL] rebalance failed: {e}")
+
+    def startup(self):
+        self.members = self._renew()
+        if self.is_leader() and not self.rclient.exists(TRADERS_KEY):
+            # first boot of a cluster: seed the shared registry from the local fleet file
+            try:
+                with open(os.path.join("data/active_traders.json"), 'r') as f:
+                    traders = json.load(f)
+                if traders:
+                    self.rclient.hset(TRADERS_KEY, mapping={tid: json.dumps({"fund_amnt": None}) for tid in traders})
+            except FileNotFoundError:
+                pass
+        threading.Thread(target=self._lease_loop, name="cluster-lease", daemon=True).start()
+        threading.Thread(target=self._rebalance_loop, name="cluster-rebalance", daemon=True).start()
+        self._rebalance_now.set()
+
+    # --- commands ---
+
+    def _handle_command(self, p: dict) -> dict | None:
+        cmd = p.get("cmd")
+        sym = p.get("symbol")
+        tid = f"{sym}|{p.get('owner')}"
+
+        if cmd in ("start", "stop", "status", "get_balance"):
+            if not sym:
+                return super()._handle_command(p) if self.is_leader() else None
+            if not self.owns(tid):
+                return None
+            if cmd == "start":
+                self.rclient.hset(TRADERS_KEY, tid, json.dumps({"fund_amnt": p.get("fund_amnt")}))
+                if not self._claim(tid):
+                    # another instance still runs it; it hands off and this one starts it on a rebalance
+                    return {"ok": False, "error": f"{tid} is still claimed by another controller, retrying"}
+            if cmd == "stop":
+                self.rclient.hdel(TRADERS_KEY, tid)
+                result = super()._handle_command(p)
+                if result.get("ok"):
+                    self._release(tid)
+                return result
+            return super()._handle_command(p)
+
+        if cmd == "list":
+            if not self.is_leader():
+                return None
+            owner = p.get("owner")
+            traders = [t.split("|", 1)[0] for t in self.rclient.hkeys(TRADERS_KEY) if t.split("|", 1)[1] == owner]
+            return {"ok": True, "traders": traders}
+
+        if cmd == "list all":
+            if not self.is_leader():
+                return None
+            return {"ok": True, "traders": self.rclient.hkeys(TRADERS_KEY)}
+
+        if cmd == "stop_all":
+            # every instance stops its own; the leader also clears the whole registry so nothing
+            # is restarted, and answers for the fleet from it
+            fleet = self.rclient.hkeys(TRADERS_KEY) if self.is_leader() else []
+            result = self._stop_all()
+            for tid in result["stopped"]:
+                self._release(tid)
+            gone = set(fleet) | set(result["stopped"])
+            if gone:
+                self.rclient.hdel(TRADERS_KEY, *gone)
+            if not self.is_leader():
+                return None
+            return {"ok": True, "stopped": sorted(gone - set(result["still_running"])), "still_running": result["still_running"]}
+
+        if cmd == "cluster":
+            if not self.is_leader():
+                return None
+            registry = self.rclient.hkeys(TRADERS_KEY)
+            counts = {m: 0 for m in self.members}
+            for t in registry:
+                counts[owner_of(t, self.members)] += 1
+            return {"ok": True, "members": self.members, "traders": counts}
+
+        if cmd in ("shutdown", "restore_status", "latency", "metrics"):
+            target = p.get("controller")
+            if target is None and not self.is_leader() and cmd != "shutdown":
+                return None
+            if target not in (None, self.id):
+                return None
+            result = super()._handle_command(p)
+            return result if (target == self.id or self.is_leader()) else None
+
+        return super()._handle_command(p) if self.is_leader() else None
+
+    def shutdown(self):
+        super().shutdown()
+        # stop (and save) before giving up the claims, so the next owner starts from our last write
+        self._stop_all()
+        try:
+            for tid in list(self._claims):
+                self._release(tid)
+            # drop the lease right away so survivors rebalance without waiting for expiry
+            self.rclient.delete(lease_key(self.id))
+            self.rclient.srem(MEMBERS_KEY, self.id)
+        except Exception as e:
+            print(f"[CTRL] could not release lease: {e}")
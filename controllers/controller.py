@@ -1,16 +1,34 @@
-from data.redis_bus import get_json, get_client, subscribe, tick_channel, hb_channel
-from strategies.base_strategy import TradingStrategy
+from data.redis_bus import get_json, get_client, subscribe, tick_channel, hb_channel, status_key, status_channel, feed_control_channel
 from controllers.trade_controller import on_message
+from controllers.tick_dispatcher import TickDispatcher
+from controllers.market_state import SymbolMarketState
+from storage.trade_logger import log_trade
+from utils.latency import HopLatency, LatencyHistogram
+from utils.metrics import REGISTRY, Counter, start_publisher, with_rates
 from utils.utility import Utility
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
+import queue
 import time
 import json
 from dataclasses import asdict
+from typing import TYPE_CHECKING
 import os
-import subprocess
+
+if TYPE_CHECKING:
+    from strategies.base_strategy import TradingStrategy
 
 HB_EVERY = 60
 CTRL_LIVE_KEY = "controller:alive"
+RESTORE_KEY = "controller:restore"
+RESTORE_WORKERS = 16
+STATUS_EVERY = float(os.getenv("STATUS_PUBLISH_EVERY", "1.0"))
+STATUS_TTL = 300
+
+REGISTRY.describe("trader_ticks_total", "counter", "Ticks each trader ran on_message for", ("tid",))
+REGISTRY.describe("trade_events_total", "counter", "Trade log events per trader", ("tid", "event"))
+REGISTRY.describe("trader_starts_total", "counter", "Traders started, including restores")
+REGISTRY.describe("tick_latency_seconds", "histogram", "Tick latency per hop", ("symbol", "hop"))
     
 class Controller:
     def __init__(self):
@@ -18,40 +36,134 @@ class Controller:
         self.stop_flags = {}
         self.rclient = get_client()
         self._cache_lock = threading.Lock()
-        self._strats: dict[str, TradingStrategy] = {}
+        self._strats: dict[str, "TradingStrategy"] = {}
         self.last_hb = 0
         self.controller_stop = threading.Event()
-        self.last_tick: dict[str, float] = {}
+        self._markets: dict[str, SymbolMarketState] = {}
+        self.dispatcher = self._make_dispatcher()
+        self.last_tick = self.dispatcher.last_tick if self.dispatcher else {}  # keyed by symbol
+        self.restore_state: dict = {}
+        self._restore_pending: set[str] = set()    # restored tids not running yet (still loading)
+        self._restore_cancelled: set[str] = set()  # of those, stopped before the restore got to start them
+        self._restore_failed: set[str] = set()     # restored tids that failed to load; kept in the file until stopped
+        self.symbol_latency: dict[str, HopLatency] = {}  # feed/bus hops, written by the tick reader
+        self.trader_latency: dict[str, HopLatency] = {}  # the rest, each written by its trader
+        self._tick_counters: dict[str, Counter] = {}
+        self.metrics_name = "controller"
+        self._metrics_prev = None
+        REGISTRY.gauge("traders_running", "Traders currently running", lambda: len(self._active_tids()))
+        if self.dispatcher is not None:
+            REGISTRY.gauge("trader_queue_depth", "Ticks waiting in each trader queue", self.dispatcher.depths, ("tid",))
+
+    def _make_dispatcher(self) -> TickDispatcher | None:
+        return TickDispatcher(prepare=self._prepare_tick)
 
-    def get_or_create_strat(self, symbol: str, owner, fund_amnt: float) -> TradingStrategy:
-        high_24h, low_24h = Utility().get_24h_high_low(symbol)
+    def seed_markets(self, symbols) -> dict[str, SymbolMarketState]:
+        """Create market state for any symbol we have not seen, or whose seed failed or
+        went stale, with a single batched REST call"""
+        now = time.time()
+        with self._cache_lock:
+            missing = [s for s in dict.fromkeys(symbols) if s not in self._markets or self._markets[s].needs_seed(now)]
+        seeds = Utility().get_24h_high_low_many(missing) if missing else {}
+        with self._cache_lock:
+            for symbol in missing:
+                market = self._markets.get(symbol)
+                if market is not None and not market.needs_seed(now):
+                    continue  # reseeded by another thread meanwhile
+                if market is None:
+                    self._markets[symbol] = SymbolMarketState(symbol, *seeds.get(symbol, (None, None)))
+                elif symbol in seeds:
+                    # seeded in place: running traders hold this object, and a fresh one's
+                    # last_price of None would read as a first tick and clear their stops
+                    market.seed(*seeds[symbol], now)
+                else:
+                    market.seed_tried = now  # keep the ticks it has, try the seed again later
+            return {s: self._markets[s] for s in symbols}
+
+    def get_or_create_strat(self, symbol: str, owner, fund_amnt: float) -> "TradingStrategy":
+        # imported here so the controller machinery (dispatch, market state, restore) loads without a strategy package
+        from strategies.base_strategy import TradingStrategy
         tid = f"{symbol}|{owner}"
+        market = self.seed_markets([symbol])[symbol]
+        market.expire()
+        high_24h, low_24h = market.high_24h, market.low_24h
         with self._cache_lock:
             strat = self._strats.get(tid)
-            if strat is None:
-                strat = TradingStrategy(symbol, high_24h, low_24h, owner, fund_amnt)
-                if hasattr(strat, "initialize_symbol"):
-                    strat.initialize_symbol()
-                self._strats[tid] = strat
+        if strat is not None:
             return strat
+        # position file I/O happens outside the lock so restores can load in parallel
+        strat = TradingStrategy(symbol, high_24h, low_24h, owner, fund_amnt)
+        strat.pm.fence = self._fence(tid)
+        if hasattr(strat, "initialize_symbol"):
+            strat.initialize_symbol()
+        if strat.pm.recover():
+            # the write-ahead log is newer than position_info.json; carry its levels onto the strategy.
+            # recover() reports it even when initialize_symbol/load_from_file already replayed the log
+            for attr in ("entry_price", "sell_price", "trailing_stop", "last_sale_price"):
+                setattr(strat, attr, getattr(strat.pm.positions, attr))
+        with self._cache_lock:
+            cached = self._strats.setdefault(tid, strat)
+        if cached is not strat:
+            strat.pm.close()  # lost a race with another loader
+        return cached
     
+    def _fence(self, tid: str):
+        """Ownership check for a trader's writes; None when this process always owns its traders"""
+        return None
+
+    def _prepare_tick(self, symbol: str, msg: dict):
+        # runs once per tick message on the dispatcher thread; traders get every trade in it,
+        # each paired with the market snapshot from just before that trade
+        now = time.time()
+        recv, pub = msg.get("recv_ts"), msg.get("pub_ts")
+        if pub is not None:
+            lat = self.symbol_latency.get(symbol)
+            if lat is None:
+                lat = self.symbol_latency[symbol] = HopLatency(("feed", "bus"))
+            if recv is not None:
+                lat.record("feed", pub - recv)
+            lat.record("bus", now - pub)
+        prices = msg.get("prices") or (msg["price"],)
+        market = self._markets.get(symbol)
+        if market is None:
+            return [(float(p), None) for p in prices], (recv, now)
+        ts = msg["ts"] / 1000 if "ts" in msg else None
+        steps = []
+        for p in prices:
+            p = float(p)
+            steps.append((p, market.snapshot()))
+            market.update(p, ts)
+        return steps, (recv, now)
+
     def start_trader(self,owner, symbol: str, strategy_name: str, fund_amnt) -> bool:
         tid = f"{symbol}|{owner}"
         with self._cache_lock:
             t = self.threads.get(tid)
             if t and t.is_alive():
                 print(f"[CTRL] {symbol} already running"); return False
+        self._forget_restore(tid)
         self.get_or_create_strat(symbol, owner, fund_amnt)
-
-        stop_evt = threading.Event()
-        with self._cache_lock:
-            self.stop_flags[tid] = stop_evt
-        th = threading.Thread(target=self.run_strategy, args=(symbol, owner, stop_evt, fund_amnt), name=f"trader-{tid}", daemon=True)
-        th.start()
-        with self._cache_lock:
-            self.threads[tid] = th
+        if not self._spawn_traders([(symbol, owner, fund_amnt)]):
+            print(f"[CTRL] {symbol} already running"); return False
         print(f"[CTRL] started trader for {symbol}")
         return True
+
+    def _spawn_traders(self, traders) -> list[str]:
+        started = []
+        with self._cache_lock:
+            for symbol, owner, fund_amnt in traders:
+                tid = f"{symbol}|{owner}"
+                t = self.threads.get(tid)
+                if t and t.is_alive():
+                    continue
+                stop_evt = threading.Event()
+                th = threading.Thread(target=self.run_strategy, args=(symbol, owner, stop_evt, fund_amnt), name=f"trader-{tid}", daemon=True)
+                self.stop_flags[tid] = stop_evt
+                self.threads[tid] = th
+                th.start()
+                started.append(tid)
+        REGISTRY.inc("trader_starts_total", (), len(started))
+        return started
     
     def stop_trader(self, owner, symbol):
         tid = f"{symbol}|{owner}"
@@ -61,6 +173,9 @@ class Controller:
             strat = self._strats.get(tid)
         
         if not th:
+            if self._cancel_restore(tid):
+                print(f"[CTRL] {symbol} will not be restored")
+                return True
             print(f"[CTRL] no thread for {symbol}")
             return False
         if stop_evt:
@@ -75,12 +190,36 @@ class Controller:
             self.threads.pop(tid, None)
             self.stop_flags.pop(tid, None)
             self._strats.pop(tid, None)
+        self._forget_restore(tid)
         print(f"[CTRL] Trader stopped for {symbol}")
         return True
     
+    def _cancel_restore(self, tid: str) -> bool:
+        """Keep a restore in progress from starting `tid`, or forget one that failed to
+        load; False when it was neither"""
+        with self._cache_lock:
+            if tid in self._restore_failed:
+                self._restore_failed.discard(tid)
+                return True
+            if tid not in self._restore_pending:
+                return False
+            self._restore_pending.discard(tid)
+            self._restore_cancelled.add(tid)
+            return True
+
+    def _forget_restore(self, tid: str):
+        """`tid` was started or stopped by hand, so no restore starts it or writes it back"""
+        with self._cache_lock:
+            self._restore_pending.discard(tid)
+            self._restore_cancelled.discard(tid)
+            self._restore_failed.discard(tid)
+
     def _stop_all(self):
         with self._cache_lock:
             threads = list(self.threads.keys())
+            self._restore_cancelled.update(self._restore_pending)
+            self._restore_pending.clear()
+            self._restore_failed.clear()
 
         stopped, still = [], []
         for thread in threads:
@@ -98,52 +237,105 @@ class Controller:
                     with self._cache_lock:
                         self.threads.pop(thread, None)
                         self.stop_flags.pop(thread, None)
-                        self.last_tick.pop(thread, None)
                         self._strats.pop(thread, None)
         return {"ok": True, "stopped": stopped, "still_running": still}
 
 
     def run_strategy(self, symbol, owner, stop_evt, fund_amnt):
         tid = f"{symbol}|{owner}"
-        self.last_tick[tid] = time.time()
-        wkr_client = get_client()
-        ps = wkr_client.pubsub()
-        ps.subscribe(tick_channel(symbol))
+        ticks = self.dispatcher.register(symbol, tid)
+        strategy = None
         try:
             strategy = self.get_or_create_strat(symbol, owner, fund_amnt)
-
-            def on_tick(msg: dict):
-                if msg.get("symbol") != symbol:
-                    return
-                price = float(msg["price"])
-                self.last_tick[tid] = time.time()
-                on_message(strategy, price)
-
-
             print(f"[INFO] Strategy started for {tid}")
 
             while not stop_evt.is_set():
-                now = time.time()
-                if now - self.last_tick[tid] < 30:
-                    msg = ps.get_message(timeout=5)
-                    if not msg or msg.get("type") != "message":
-                        continue
-                    on_tick(json.loads(msg['data']))
-                elif now - self.last_tick[tid] > 30:
-                    try:
-                        ps.close()
-                    except Exception:
-                        pass
-                    ps = wkr_client.pubsub()
-                    ps.subscribe(tick_channel(symbol))
-                    self.last_tick[tid] = time.time()
+                try:
+                    tick = ticks.get(timeout=1)
+                except queue.Empty:
+                    continue
+                self._on_tick(strategy, tick)
             strategy.save_position()
-            ps.unsubscribe(tick_channel(symbol))
-            ps.close()
+            strategy.pm.flush()
             print(f"[INFO] Strategy stopped for {symbol}")
         except Exception as e:
             print(f"[ERROR] Strategy for {tid} encountered an error: {e}")
-    
+        finally:
+            self.dispatcher.unregister(symbol, tid)
+            self.trader_latency.pop(tid, None)
+            self._release_market(symbol, tid)
+            if strategy is not None:
+                strategy.pm.close()
+
+    def _release_market(self, symbol: str, tid: str):
+        """Forget a symbol's market state once its last trader is gone"""
+        prefix = f"{symbol}|"
+        with self._cache_lock:
+            if any(t.startswith(prefix) and t != tid for t in (*self.threads, *self._strats)):
+                return
+            self._markets.pop(symbol, None)
+        self.symbol_latency.pop(symbol, None)
+
+    def _trader_hops(self, strategy) -> HopLatency:
+        tid = f"{strategy.symbol}|{strategy.owner}"
+        lat = self.trader_latency.get(tid)
+        if lat is None:
+            lat = self.trader_latency[tid] = HopLatency(("queue", "decide", "log", "total"))
+        return lat
+
+    def _record_hops(self, lat: HopLatency, recv, dispatched, start: float, done: float):
+        lat.record("queue", start - dispatched)
+        lat.record("decide", done - start)
+        if recv is not None:
+            lat.record("total", done - recv)
+
+    def _on_tick(self, strategy, tick):
+        fence = strategy.pm.fence
+        if fence is not None and not fence():
+            return  # another controller may own this trader now; the rebalance stops it
+        steps, (recv, dispatched) = tick
+        tid = f"{strategy.symbol}|{strategy.owner}"
+        lat = self._trader_hops(strategy)
+        start = time.time()
+        ticks = self._tick_counters.get(tid)
+        if ticks is None:
+            ticks = self._tick_counters[tid] = REGISTRY.counter("trader_ticks_total", (tid,))
+        ticks.add(len(steps))
+
+        def log(symbol, price, event, *args, **kw):
+            log_trade(symbol, price, event, *args, **kw)
+            REGISTRY.inc("trade_events_total", (tid, event))
+            if recv is not None:
+                lat.record("log", time.time() - recv)
+
+        for price, market in steps:
+            on_message(strategy, price, market, log=log)
+        self._record_hops(lat, recv, dispatched, start, time.time())
+
+    def latency(self, symbol: str | None = None) -> dict:
+        """Hop latency summaries per trader, and per symbol with its traders merged in"""
+        symbols, traders = {}, {}
+        for sym, lat in list(self.symbol_latency.items()):
+            if symbol in (None, sym):
+                merged = symbols[sym] = HopLatency(())
+                merged.merge(lat)
+        for tid, lat in list(self.trader_latency.items()):
+            sym = tid.split("|", 1)[0]
+            if symbol in (None, sym):
+                traders[tid] = lat.summary()
+                symbols.setdefault(sym, HopLatency(())).merge(lat)
+        return {"symbols": {s: h.summary() for s, h in symbols.items()}, "traders": traders}
+
+    def metrics_snapshot(self) -> dict:
+        hists: dict = {}
+        sources = [(sym, lat) for sym, lat in list(self.symbol_latency.items())]
+        sources += [(tid.split("|", 1)[0], lat) for tid, lat in list(self.trader_latency.items())]
+        for sym, lat in sources:
+            for hop, h in lat.hops.items():
+                if h.count:
+                    hists.setdefault(("tick_latency_seconds", (sym, hop)), LatencyHistogram()).merge(h)
+        return REGISTRY.snapshot(hists)
+
     # def run_forever(self, timeout): # Heartbeat for updates on trader statuses, publishes to redis so you can subscribe and check on those statuses
     #     print(f"[HB] Heartbeat for all threads")
     #     next_hb = 0
@@ -183,6 +375,56 @@ class Controller:
     #                 print(f"[INFO] Trader for {symbol} has gone stale")
     #         time.sleep(1)
 
+    def trader_status(self, tid: str) -> dict | None:
+        with self._cache_lock:
+            strat = self._strats.get(tid)
+        if not strat:
+            return None
+        sym = tid.split("|", 1)[0]
+        d = asdict(strat.status())
+        market = self._markets.get(sym)
+        if market is not None:
+            # the strategy only sees the snapshot from before its last tick
+            for k, v in asdict(market.snapshot()).items():
+                if k in d:
+                    d[k] = v
+        d["last_tick"] = self.last_tick.get(sym)
+        lat = self.trader_latency.get(tid)
+        if lat is not None:
+            d["latency"] = lat.summary()
+        return d
+
+    def _publish_statuses(self):
+        published: dict[str, str] = {}
+        while not self.controller_stop.wait(STATUS_EVERY):
+            try:
+                with self._cache_lock:
+                    tids = list(self._strats.keys())
+                now = time.time()
+                pipe = self.rclient.pipeline(transaction=False)
+                for tid in tids:
+                    d = self.trader_status(tid)
+                    if d is None:
+                        continue
+                    blob = json.dumps(d)
+                    key = status_key(tid)
+                    if published.get(tid) != blob:
+                        pipe.hset(key, mapping={"status": blob, "updated": now})
+                        pipe.hincrby(key, "version", 1)
+                        pipe.publish(status_channel(tid), blob)
+                        published[tid] = blob
+                    pipe.expire(key, STATUS_TTL)
+                for tid in set(published) - set(tids):
+                    pipe.delete(status_key(tid))
+                    published.pop(tid, None)
+                pipe.execute()
+            except Exception as e:
+                print(f"[CTRL] status publish failed: {e}")
+
+    def start_status_publisher(self):
+        threading.Thread(target=self._publish_statuses, name="status-publisher", daemon=True).start()
+        start_publisher(self.rclient, self.metrics_name, self.controller_stop, self.metrics_snapshot)
+
     def _handle_command(self, p: dict) -> dict:
         cmd = p.get("cmd")
         owner = p.get("owner")
@@ -214,19 +456,29 @@ class Controller:
             sym = p.get("symbol")
             tid = f"{sym}|{owner}"
             if not sym: return {"ok": False, "error": "missing symbol"}
-            with self._cache_lock:
-                strat = self._strats.get(tid)
-            if not strat:
+            d = self.trader_status(tid)
+            if d is None:
                 return {"ok": False, "error": "not running"}
-            d = asdict(strat.status())
-            last = self.last_tick.get(tid)
+            last = d["last_tick"]
             now = time.time()
             age = (now - last) if last is not None else None
-            d["last_tick"] = last
             d["tick_age"] = age
             d["stale"] = (age is not None and age >= 60)
             return {"ok": True, "status": d}
         
+        if cmd == "restore_status":
+            return {"ok": True, "restore": dict(self.restore_state)}
+
+        if cmd == "metrics":
+            self._metrics_prev = with_rates(self.metrics_snapshot(), self._metrics_prev)
+            return {"ok": True, "metrics": self._metrics_prev}
+
+        if cmd == "latency":
+            if p.get("reset"):
+                self.symbol_latency.clear()
+                self.trader_latency.clear()
+            return {"ok": True, **self.latency(p.get("symbol"))}
+
         if cmd == "stop_all":
             return self._stop_all()
         
@@ -248,17 +500,26 @@ class Controller:
                     coin_list.append(coin)
                     with open(symbol_file, 'w') as f:
                         json.dump(coin_list, f, indent=2)
-                    subprocess.run(["/usr/bin/sudo", "-n", "/usr/bin/systemctl", "restart", "kraken_feed.service"], check=True)
             except FileNotFoundError:
                 return {"ok":False, "error":"File Not Found"}
-            return {"ok": True, "kraken_list": coin_list}
+            # the running feed subscribes the new pair on its live socket; the file keeps it across restarts.
+            # sent even when the pair was already listed, since adding is a no-op for the feed
+            try:
+                listeners = self.rclient.publish(feed_control_channel(), json.dumps({"cmd": "add", "symbols": [coin]}))
+            except Exception as e:
+                print(f"[ERROR] add_coin: could not reach the feed: {e}")
+                listeners = 0
+            if not listeners:
+                return {"ok": True, "kraken_list": coin_list, "feed_notified": False,
+                        "warning": f"no feed is listening; {coin} is saved and will stream once the feed (re)starts"}
+            return {"ok": True, "kraken_list": coin_list, "feed_notified": True}
         
         if cmd == "get_balance":
             symbol = p.get("symbol")
             tid = f"{symbol}|{owner}"
             with self._cache_lock:
                 strat = self._strats.get(tid)
-            balance = strat.pm.positions["balance"]
+            balance = strat.pm.positions.balance
             return {"ok": True, "balance": balance}
         
         if cmd == "shutdown":
@@ -268,12 +529,19 @@ class Controller:
         
         return {"ok": False, "error": f"unknown command: {cmd}"}
 
+    def _reply_body(self, payload: dict, result: dict) -> dict:
+        # API callers multiplex replies on one channel and match them by corr_id
+        if "corr_id" in payload:
+            return {**result, "corr_id": payload["corr_id"]}
+        return result
+
     def run_control_loop(self):
         print(f"[CTRL] Controller starting")
         ctrl_client = get_client()
         ps = ctrl_client.pubsub()
         ps.subscribe("controller:commands")
         self.startup()
+        self.start_status_publisher()
         self.rclient.set(CTRL_LIVE_KEY, "true")
         while not self.controller_stop.is_set():
             msg = ps.get_message(timeout=0.5)
@@ -283,21 +551,29 @@ class Controller:
                 payload = json.loads(msg["data"])
                 result = self._handle_command(payload)
                 reply_to = payload.get("reply_to")
-                if reply_to:
-                    self.rclient.publish(reply_to, json.dumps(result))
+                if reply_to and result is not None:
+                    self.rclient.publish(reply_to, json.dumps(self._reply_body(payload, result)))
             except Exception as e:
                 self.rclient.set(CTRL_LIVE_KEY, "false")
                 print(f"[CRTL] controller error: {e}")
     
+    def _active_tids(self) -> list[str]:
+        with self._cache_lock:
+            return list(self.threads.keys())
+
     def shutdown(self):
+        active = self._active_tids()
         with self._cache_lock:
-            active = list(self.threads.keys())
+            # a restore still loading (or one that failed to load) has not started these; keep them in the file
+            active += sorted((self._restore_pending | self._restore_failed).difference(active))
         active_traders = os.path.join("data/active_traders.json")
         try:
             with open(active_traders, 'w') as f:
                 json.dump(active, f, indent=2)
         except FileNotFoundError:
             print(f"{active_traders} not found...")
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
 
     def active_update(self, tid):
         active_traders = os.path.join('data/active_traders.json')
@@ -316,10 +592,81 @@ class Controller:
         try:
             with open(trader_load_file, 'r') as f:
                 traders = json.load(f)
-            for symown in traders:
-                symbol , owner = symown.split("|", 1)
-                strategy = "base"
-                self.start_trader(owner, symbol, strategy, fund_amnt=None)
         except FileNotFoundError:
             print(f"File: {trader_load_file} not found...")
+            return
+        # restore in the background so the control loop serves commands right away
+        threading.Thread(target=self._restore, args=(traders,), name="restore", daemon=True).start()
 
+    def _restore_progress(self, **kw):
+        self.restore_state.update(kw)
+        try:
+            self.rclient.set(RESTORE_KEY, json.dumps(self.restore_state))
+        except Exception as e:
+            print(f"[CTRL] could not publish restore progress: {e}")
+
+    def _restore(self, traders, funds: dict | None = None):
+        """Start `traders` (tids) in stages; `funds` maps a tid to its fund_amnt"""
+        with self._cache_lock:
+            self._restore_pending.update(traders)
+            self._restore_cancelled.difference_update(traders)
+        try:
+            self._restore_stages(traders, funds or {})
+        except Exception as e:
+            print(f"[CTRL] restore failed: {e}")
+            self._restore_progress(stage="failed", error=str(e))
+
+    def _restore_stages(self, traders, funds: dict):
+        t0 = time.time()
+        pairs = [tuple(symown.split("|", 1)) for symown in traders]
+        self.restore_state = {}
+        self._restore_progress(stage="seed", total=len(pairs), loaded=0, started=0, failed=[], started_at=t0, elapsed=None)
+
+        try:
+            self.seed_markets(sorted({symbol for symbol, _ in pairs}))
+        except Exception as e:
+            # each trader retries its own seed as it loads
+            print(f"[CTRL] restore seed failed: {e}")
+            self._restore_progress(seed_error=str(e))
+        self._restore_progress(stage="load", seed_s=round(time.time() - t0, 3))
+
+        loaded, failed = [], []
+        with ThreadPoolExecutor(max_workers=RESTORE_WORKERS, thread_name_prefix="restore") as pool:
+            futures = {pool.submit(self.get_or_create_strat, symbol, owner, funds.get(f"{symbol}|{owner}")): (symbol, owner) for symbol, owner in pairs}
+            for fut in as_completed(futures):
+                symbol, owner = futures[fut]
+                try:
+                    fut.result()
+                    loaded.append((symbol, owner, funds.get(f"{symbol}|{owner}")))
+                except Exception as e:
+                    print(f"[CTRL] restore failed for {symbol}|{owner}: {e}")
+                    failed.append(f"{symbol}|{owner}")
+                if len(loaded) % 25 == 0:
+                    self._restore_progress(loaded=len(loaded), failed=failed)
+        self._restore_progress(stage="register", loaded=len(loaded), failed=failed, load_s=round(time.time() - t0, 3))
+
+        with self._cache_lock:
+            todo = [t for t in loaded if f"{t[0]}|{t[1]}" in self._restore_pending]
+            dropped = []
+            for symbol, owner, _ in loaded:
+                tid = f"{symbol}|{owner}"
+                if tid in self._restore_cancelled and tid not in self.threads:
+                    dropped.append(self._strats.pop(tid, None))
+        for strat in dropped:
+            if strat is not None:
+                strat.pm.close()
+        started = self._spawn_traders(todo)
+        with self._cache_lock:
+            late = [tid for tid in started if tid in self._restore_cancelled]
+            self._restore_cancelled.difference_update(traders)
+            # this restore is done with every tid it was given: started here or by hand, cancelled,
+            # or failed. Failures stay listed for shutdown until stopped or started
+            self._restore_failed.update(t for t in failed if t in self._restore_pending)
+            self._restore_pending.difference_update(traders)
+        for tid in late:
+            # stopped between the check above and the spawn
+            symbol, owner = tid.split("|", 1)
+            self.stop_trader(owner, symbol)
+        elapsed = time.time() - t0
+        self._restore_progress(stage="done", started=len(started) - len(late), elapsed=round(elapsed, 3))
+        print(f"[CTRL] restored {len(started) - len(late)}/{len(pairs)} traders in {elapsed:.2f}s ({len(failed)} failed)")
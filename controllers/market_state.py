@@ -0,0 +1,111 @@
+from dataclasses import dataclass
+from utils.rolling_window import RollingHighLow
+import threading
+import time
+
+SEED_RETRY = 60  # seconds between REST seed attempts for a symbol whose seed failed
+
+
+@dataclass(frozen=True, slots=True)
+class MarketSnapshot:
+    last_price: float | None
+    trend_state: str | None
+    local_high: float | None
+    local_low: float | None
+    high_24h: float | None
+    low_24h: float | None
+
+    def apply(self, strat):
+        """Point a strategy's market fields at this snapshot before it makes decisions"""
+        strat.last_price = self.last_price
+        strat.trend_state = self.trend_state
+        strat.local_high = self.local_high
+        strat.local_low = self.local_low
+        strat.high_24h = self.high_24h
+        strat.low_24h = self.low_24h
+
+
+class SymbolMarketState:
+    """Trend and extremes for one symbol, shared by every owner trading it.
+
+    The controller calls `update` once per tick. Traders get the `snapshot`
+    taken just before that update, which is exactly what a per-owner
+    strategy used to see when it ran this logic itself."""
+
+    def __init__(self, symbol: str, high_24h: float | None = None, low_24h: float | None = None):
+        self.symbol = symbol
+        self.window = RollingHighLow()
+        self.window.seed(high_24h, low_24h)
+        self.seeded = high_24h is not None or low_24h is not None
+        self.seed_tried = time.time()
+        self._lock = threading.Lock()  # update (dispatcher thread) vs expire (trader start)
+        self.high_24h = self.window.high
+        self.low_24h = self.window.low
+        self.last_price = None
+        self.trend_state = None
+        self.local_high = None
+        self.local_low = None
+        self._snapshot = None
+
+    def snapshot(self) -> MarketSnapshot:
+        if self._snapshot is None:
+            self._snapshot = MarketSnapshot(self.last_price, self.trend_state, self.local_high,
+                                            self.local_low, self.high_24h, self.low_24h)
+        return self._snapshot
+
+    def needs_seed(self, now: float | None = None) -> bool:
+        """True when the REST seed failed, or every sample has aged out of the window
+        (no ticks while nobody traded the symbol); retried at most every SEED_RETRY"""
+        now = time.time() if now is None else now
+        if now - self.seed_tried < SEED_RETRY:
+            return False
+        newest = self.window.newest
+        return not self.seeded or newest is None or now - newest >= self.window.window
+
+    def seed(self, high_24h: float | None, low_24h: float | None, now: float | None = None):
+        """Fold a REST seed into this live state; ticks already seen and the trend are kept"""
+        with self._lock:
+            self._snapshot = None
+            self.window.seed(high_24h, low_24h)
+            self.high_24h = self.window.high
+            self.low_24h = self.window.low
+            self.seeded = self.seeded or high_24h is not None or low_24h is not None
+            self.seed_tried = time.time() if now is None else now
+
+    def expire(self, now: float | None = None):
+        """Age the 24h extremes to `now` so a reader after a quiet spell does not see old ones"""
+        with self._lock:
+            self._snapshot = None
+            self.window.expire(now)
+            self.high_24h = self.window.high
+            self.low_24h = self.window.low
+
+    def update(self, price: float, ts: float | None = None):
+        with self._lock:
+            self._snapshot = None
+            self.window.update(price, ts)
+            self.high_24h = self.window.high
+            self.low_24h = self.window.low
+        if self.last_price is None:
+            self.last_price = price
+            self.local_high = self.high_24h
+            self.local_low = self.low_24h
+            self.trend_state = None
+            return
+
+        if self.trend_state == "up" or self.trend_state is None:
+            if price > self.last_price:
+                self.trend_state = "up"
+            if price > self.local_high:
+                self.local_high = price
+            if price < self.last_price:
+                self.trend_state = "down"
+
+        if self.trend_state == "down":
+            if price < self.local_low:
+                self.local_low = price
+            if price > self.last_price:
+                self.trend_state = "up"
+
+        self.last_price = price
+        print(f"{self.symbol} | price: ${price:.4f} | Trend: {self.trend_state}")
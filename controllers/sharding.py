@@ -0,0 +1,314 @@
+from controllers.controller import Controller
+from storage.position_persister import PERSISTER
+from utils.metrics import REGISTRY
+import multiprocessing as mp
+import threading
+import json
+import os
+import hashlib
+import bisect
+import queue
+import math
+import time
+import uuid
+
+VNODES = 64
+LOAD_FACTOR = 1.25
+WORKER_TIMEOUT = 5.0
+# a worker's start seeds from REST (up to 5 tries of a 10s request and a 2s sleep), and its stop
+# joins the trader for up to 5s; past these the reply is late and the trader is reconciled instead
+WORKER_START_TIMEOUT = float(os.getenv("WORKER_START_TIMEOUT", "75"))
+WORKER_STOP_TIMEOUT = float(os.getenv("WORKER_STOP_TIMEOUT", "10"))
+RECONCILE_EVERY = 5.0
+RESTORE_POLL = 0.5
+
+REGISTRY.describe("worker_restarts_total", "counter", "Worker processes restarted after exiting", ("worker",))
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes"""
+
+    def __init__(self, nodes, vnodes: int = VNODES):
+        self._ring = sorted((_hash(f"{node}#{i}"), node) for node in nodes for i in range(vnodes))
+        self._keys = [h for h, _ in self._ring]
+
+    def walk(self, key: str):
+        """Distinct nodes in ring order starting at `key`"""
+        if not self._ring:
+            return
+        start = bisect.bisect(self._keys, _hash(key))
+        seen = set()
+        for i in range(len(self._ring)):
+            node = self._ring[(start + i) % len(self._ring)][1]
+            if node not in seen:
+                seen.add(node)
+                yield node
+
+    def lookup(self, key: str):
+        return next(self.walk(key), None)
+
+
+def _worker_main(idx: int, cmd_q, reply_q):
+    controller = Controller()
+    controller.metrics_name = f"controller-w{idx}"
+    controller.start_status_publisher()
+    print(f"[CTRL] worker {idx} up")
+    while True:
+        item = cmd_q.get()
+        if item is None:
+            break
+        req_id, p = item
+        try:
+            if p.get("cmd") == "_restore":
+                # staged restore in the background so this worker keeps serving commands;
+                # the parent polls restore_status until it reports done
+                controller.restore_state = {"stage": "queued", "total": len(p["traders"])}
+                threading.Thread(target=controller._restore, args=(p["traders"], p.get("funds")), name="restore", daemon=True).start()
+                result = {"ok": True}
+            elif p.get("cmd") == "_tids":
+                with controller._cache_lock:
+                    restoring = list(controller._restore_pending)
+                result = {"ok": True, "traders": controller._active_tids() + restoring}
+            else:
+                result = controller._handle_command(p)
+        except Exception as e:
+            result = {"ok": False, "error": str(e)}
+        reply_q.put((req_id, result))
+    controller.controller_stop.set()
+    controller._stop_all()
+    PERSISTER.close()  # multiprocessing skips atexit in the child
+    print(f"[CTRL] worker {idx} stopped")
+
+
+class ShardedController(Controller):
+    """Runs traders in N worker processes, each a full Controller with its own
+    tick dispatcher.
+
+    Traders are placed by consistent hashing on the symbol with bounded load,
+    so a symbol's traders share a worker (one subscription, one market state)
+    until that worker is over its fair share. start/stop/status/get_balance
+    are routed to the owning worker; a worker that dies is restarted and its
+    traders rehydrated from their position files."""
+
+    def __init__(self, workers: int):
+        super().__init__()  # the parent only routes; workers own the dispatchers and market state
+        self.n_workers = workers
+        self.ring = HashRing(range(workers))
+        self._ctx = mp.get_context("spawn")
+        self._procs: list = [None] * workers
+        self._cmd_qs: list = [None] * workers
+        self._reply_qs: list = [None] * workers
+        self._call_locks = [threading.Lock() for _ in range(workers)]
+        self.assign: dict[str, tuple[int, float | None]] = {}
+        self._unsure: set[str] = set()  # assigned tids whose start/stop reply never came
+        self.restarts = [0] * workers
+        for idx in range(workers):
+            self._spawn_worker(idx)
+        threading.Thread(target=self._monitor, name="shard-monitor", daemon=True).start()
+
+    def _make_dispatcher(self):
+        return None
+
+    def _spawn_worker(self, idx: int):
+        self._cmd_qs[idx] = self._ctx.Queue()
+        self._reply_qs[idx] = self._ctx.Queue()
+        proc = self._ctx.Process(target=_worker_main, args=(idx, self._cmd_qs[idx], self._reply_qs[idx]), name=f"controller-worker-{idx}", daemon=True)
+        proc.start()
+        self._procs[idx] = proc
+
+    def _call(self, idx: int, p: dict, timeout: float = WORKER_TIMEOUT) -> dict:
+        req_id = uuid.uuid4().hex
+        with self._call_locks[idx]:
+            self._cmd_qs[idx].put((req_id, p))
+            deadline = time.time() + timeout
+            while time.time() < deadline:
+                try:
+                    rid, result = self._reply_qs[idx].get(timeout=max(0.0, deadline - time.time()))
+                except queue.Empty:
+                    break
+                if rid == req_id:
+                    return result
+        return {"ok": False, "error": f"worker {idx} did not reply", "late": True}
+
+    def _loads(self) -> list[int]:
+        loads = [0] * self.n_workers
+        with self._cache_lock:
+            for idx, _ in self.assign.values():
+                loads[idx] += 1
+        return loads
+
+    def place(self, symbol: str) -> int:
+        loads = self._loads()
+        cap = math.ceil((sum(loads) + 1) / self.n_workers * LOAD_FACTOR)
+        for idx in self.ring.walk(symbol):
+            if loads[idx] < cap:
+                return idx
+        return self.ring.lookup(symbol)
+
+    def _reconcile(self, idx: int):
+        """Settle tids on worker `idx` whose start/stop timed out. The worker runs commands in
+        order, so once it answers the late one has finished and its trader list is current."""
+        with self._cache_lock:
+            unsure = [tid for tid in self._unsure if self.assign.get(tid, (None,))[0] == idx]
+        if not unsure:
+            return
+        result = self._call(idx, {"cmd": "_tids"})
+        if not result.get("ok"):
+            return
+        running = set(result.get("traders", []))
+        with self._cache_lock:
+            for tid in unsure:
+                self._unsure.discard(tid)
+                if tid not in running and self.assign.get(tid, (None,))[0] == idx:
+                    self.assign.pop(tid, None)
+        print(f"[CTRL] worker {idx} reconciled {len(unsure)} traders ({len(running.intersection(unsure))} running)")
+
+    def _monitor(self):
+        last_reconcile = time.time()
+        while not self.controller_stop.wait(1):
+            for idx, proc in enumerate(self._procs):
+                if proc is None or proc.is_alive():
+                    continue
+                self.restarts[idx] += 1
+                REGISTRY.inc("worker_restarts_total", (str(idx),))
+                print(f"[CTRL] worker {idx} exited ({proc.exitcode}), restarting")
+                self._spawn_worker(idx)
+                with self._cache_lock:
+                    tids = [tid for tid, (w, _) in self.assign.items() if w == idx]
+                if tids:
+                    self._restore_on(idx, tids)
+                    print(f"[CTRL] worker {idx} rehydrating {len(tids)} traders")
+            if time.time() - last_reconcile >= RECONCILE_EVERY:
+                last_reconcile = time.time()
+                for idx in range(self.n_workers):
+                    self._reconcile(idx)
+
+    def _handle_command(self, p: dict) -> dict:
+        cmd = p.get("cmd")
+        owner = p.get("owner")
+        sym = p.get("symbol")
+        tid = f"{sym}|{owner}"
+
+        if cmd == "start":
+            if not sym: return {"ok": False, "error": "missing symbol"}
+            with self._cache_lock:
+                current = self.assign.get(tid)
+            idx = current[0] if current else self.place(sym)
+            result = self._call(idx, p, WORKER_START_TIMEOUT)
+            if result.get("ok") or result.get("late"):
+                # a late start may still be running the trader; keep it routable until reconciled
+                with self._cache_lock:
+                    self.assign[tid] = (idx, p.get("fund_amnt"))
+                    if result.get("ok"):
+                        self._unsure.discard(tid)
+                    else:
+                        self._unsure.add(tid)
+            return result
+
+        if cmd in ("stop", "status", "get_balance"):
+            if not sym: return {"ok": False, "error": "missing symbol"}
+            with self._cache_lock:
+                current = self.assign.get(tid)
+            if current is None:
+                return {"ok": False, "error": "not running"}
+            result = self._call(current[0], p, WORKER_STOP_TIMEOUT if cmd == "stop" else WORKER_TIMEOUT)
+            if cmd == "stop" and result.get("ok"):
+                with self._cache_lock:
+                    self.assign.pop(tid, None)
+                    self._unsure.discard(tid)
+            elif cmd == "stop" and result.get("late"):
+                with self._cache_lock:
+                    self._unsure.add(tid)
+            return result
+
+        if cmd == "list":
+            with self._cache_lock:
+                traders = list(self.assign.keys())
+            return {"ok": True, "traders": [t.split("|", 1)[0] for t in traders if t.split("|", 1)[1] == owner]}
+
+        if cmd == "list all":
+            with self._cache_lock:
+                traders = list(self.assign.keys())
+            return {"ok": True, "traders": traders}
+
+        if cmd == "stop_all":
+            stopped, still = [], []
+            for idx in range(self.n_workers):
+                result = self._call(idx, p)
+                stopped += result.get("stopped", [])
+                still += result.get("still_running", [])
+            with self._cache_lock:
+                for t in stopped:
+                    self.assign.pop(t, None)
+                    self._unsure.discard(t)
+            return {"ok": True, "stopped": stopped, "still_running": still}
+
+        if cmd in ("latency", "metrics"):
+            return {"ok": True, "workers": [self._call(idx, p) for idx in range(self.n_workers)]}
+
+        if cmd == "workers":
+            loads = self._loads()
+            return {"ok": True, "workers": [{"worker": i, "pid": proc.pid, "alive": proc.is_alive(), "traders": loads[i], "restarts": self.restarts[i]}
+                                           for i, proc in enumerate(self._procs)]}
+
+        return super()._handle_command(p)
+
+    def startup(self):
+        trader_load_file = os.path.join("data/active_traders.json")
+        try:
+            with open(trader_load_file, 'r') as f:
+                traders = json.load(f)
+        except FileNotFoundError:
+            print(f"File: {trader_load_file} not found...")
+            return
+        threading.Thread(target=self._restore, args=(traders,), name="restore", daemon=True).start()
+
+    def _restore_on(self, idx: int, tids: list[str]) -> dict:
+        with self._cache_lock:
+            funds = {tid: self.assign[tid][1] for tid in tids if tid in self.assign}
+        return self._call(idx, {"cmd": "_restore", "traders": tids, "funds": funds})
+
+    def _restore(self, traders, funds: dict | None = None):
+        t0 = time.time()
+        funds = funds or {}
+        by_worker: dict[int, list[str]] = {}
+        for symown in traders:
+            symbol = symown.split("|", 1)[0]
+            idx = self.place(symbol)
+            with self._cache_lock:
+                prev = self.assign.get(symown)
+                self.assign[symown] = (idx, funds.get(symown, prev[1] if prev else None))
+            by_worker.setdefault(idx, []).append(symown)
+        self.restore_state = {"stage": "load", "total": len(traders), "started_at": t0}
+        # every worker runs its own staged restore in parallel, in the background
+        for idx, tids in by_worker.items():
+            result = self._restore_on(idx, tids)
+            if not result.get("ok"):
+                print(f"[CTRL] worker {idx} did not take its restore: {result.get('error')}")
+        waiting, workers = set(by_worker), {}
+        while waiting and not self.controller_stop.wait(RESTORE_POLL):
+            for idx in list(waiting):
+                state = self._call(idx, {"cmd": "restore_status"}).get("restore") or {}
+                workers[idx] = state
+                if state.get("stage") in ("done", "failed"):
+                    waiting.discard(idx)
+            self.restore_state.update(workers={str(i): st.get("stage") for i, st in workers.items()})
+        elapsed = time.time() - t0
+        failed = [t for st in workers.values() for t in st.get("failed", [])]
+        self.restore_state.update(stage="done", elapsed=round(elapsed, 3), failed=failed)
+        print(f"[CTRL] restored {len(traders)} traders across {len(by_worker)} workers in {elapsed:.2f}s ({len(failed)} failed)")
+
+    def _active_tids(self) -> list[str]:
+        with self._cache_lock:
+            return list(self.assign.keys())
+
+    def shutdown(self):
+        super().shutdown()
+        for idx, q in enumerate(self._cmd_qs):
+            q.put(None)
+        for proc in self._procs:
+            proc.join(timeout=10)
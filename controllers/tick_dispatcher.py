@@ -0,0 +1,171 @@
+from data.redis_bus import get_client, tick_channel, feed_wires_key
+from data.tick_codec import TICK_WIRE, decoder, wire_hint
+from utils.metrics import REGISTRY, Counter
+import threading
+import queue
+import time
+
+STALE_AFTER = 30
+QUEUE_SIZE = 256
+
+REGISTRY.describe("ticks_in_total", "counter", "Ticks received for symbols with running traders", ("symbol",))
+REGISTRY.describe("ticks_dropped_total", "counter", "Ticks dropped because a trader queue was full", ("symbol",))
+REGISTRY.describe("resubscribes_total", "counter", "Tick subscriptions renewed after going stale", ("symbol",))
+
+
+class TickDispatcher:
+    """One pubsub connection for the whole controller.
+
+    Subscribes once per symbol that has at least one trader, decodes each tick
+    once and fans it out to a bounded queue per trader. When a trader's queue
+    is full the oldest tick is dropped, so a slow trader only ever sees the
+    freshest prices and never holds up the others."""
+
+    def __init__(self, client=None, queue_size: int = QUEUE_SIZE, stale_after: float = STALE_AFTER, prepare=None, wire: str = TICK_WIRE):
+        self.wire = wire  # which tick channel to read, ticks: (json) or ticksb: (binary)
+        self.decode = decoder(wire)
+        self.client = client or get_client(decode_responses=wire != "binary")
+        self.prepare = prepare  # called once per tick, its return value is what traders receive
+        self.queue_size = queue_size
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self._queues: dict[str, dict[str, queue.Queue]] = {}
+        self.last_tick: dict[str, float] = {}
+        self.dropped = 0
+        self.resubscribes = 0
+        self._wire_warned = False
+        self._tick_counters: dict[str, Counter] = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, symbol: str, tid: str) -> queue.Queue:
+        q = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            # copy-on-write so the reader thread can iterate without the lock
+            traders = dict(self._queues.get(symbol, {}))
+            traders[tid] = q
+            self._queues[symbol] = traders
+        self.start()
+        return q
+
+    def unregister(self, symbol: str, tid: str):
+        with self._lock:
+            traders = dict(self._queues.get(symbol, {}))
+            traders.pop(tid, None)
+            if traders:
+                self._queues[symbol] = traders
+            else:
+                self._queues.pop(symbol, None)
+
+    def depths(self) -> dict[tuple, int]:
+        return {(tid,): q.qsize() for traders in list(self._queues.values()) for tid, q in traders.items()}
+
+    def symbols(self) -> list[str]:
+        with self._lock:
+            return list(self._queues.keys())
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="tick-dispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def count_tick(self, symbol: str):
+        ticks = self._tick_counters.get(symbol)
+        if ticks is None:
+            ticks = self._tick_counters[symbol] = REGISTRY.counter("ticks_in_total", (symbol,))
+        ticks.inc()
+
+    def dispatch(self, tick: dict):
+        symbol = tick.get("symbol")
+        traders = self._queues.get(symbol)
+        if not traders:
+            return
+        self.last_tick[symbol] = time.time()
+        self.count_tick(symbol)
+        if self.prepare is not None:
+            tick = self.prepare(symbol, tick)
+        for q in traders.values():
+            try:
+                q.put_nowait(tick)
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+                self.dropped += 1
+                REGISTRY.inc("ticks_dropped_total", (symbol,))
+                try:
+                    q.put_nowait(tick)
+                except queue.Full:
+                    pass
+
+    def _sync_subscriptions(self, ps, subscribed: set) -> set:
+        now = time.time()
+        wanted = set(self.symbols())
+        add = wanted - subscribed
+        remove = subscribed - wanted
+        if remove:
+            ps.unsubscribe(*[tick_channel(s, self.wire) for s in remove])
+            for s in remove:
+                self.last_tick.pop(s, None)
+        if add:
+            ps.subscribe(*[tick_channel(s, self.wire) for s in add])
+            for s in add:
+                self.last_tick[s] = now
+        for s in wanted - add:
+            if now - self.last_tick.get(s, now) > self.stale_after:
+                print(f"[CTRL] no ticks for {s} in {self.stale_after}s, resubscribing")
+                ps.unsubscribe(tick_channel(s, self.wire))
+                ps.subscribe(tick_channel(s, self.wire))
+                self.last_tick[s] = now
+                self.resubscribes += 1
+                REGISTRY.inc("resubscribes_total", (s,))
+                self._check_wire()
+        return wanted
+
+    def _check_wire(self):
+        """On a stale symbol, say (once) if the feed is not publishing our wire at all"""
+        if self._wire_warned:
+            return
+        try:
+            hint = wire_hint(self.client.get(feed_wires_key()), self.wire)
+        except Exception:
+            return
+        if hint:
+            self._wire_warned = True
+            print(f"[CTRL] {hint}")
+
+    def _run(self):
+        ps = self.client.pubsub(ignore_subscribe_messages=True)
+        subscribed = set()
+        while not self._stop.is_set():
+            try:
+                subscribed = self._sync_subscriptions(ps, subscribed)
+                if not subscribed:
+                    self._stop.wait(0.5)
+                    continue
+                msg = ps.get_message(timeout=0.5)
+                if not msg or msg.get("type") != "message":
+                    continue
+                self.dispatch(self.decode(msg["data"]))
+            except Exception as e:
+                print(f"[CTRL] tick dispatcher error: {e}")
+                try:
+                    ps.close()
+                except Exception:
+                    pass
+                self._stop.wait(1)
+                ps = self.client.pubsub(ignore_subscribe_messages=True)
+                subscribed = set()
+        try:
+            ps.close()
+        except Exception:
+            pass
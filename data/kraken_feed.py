@@ -4,8 +4,22 @@ import json
 import threading
 import os
 import time
+import zlib
 from datetime import datetime as dt
-from data.redis_bus import get_client, publish_json, set_json
+from data.redis_bus import get_client, tick_channel, feed_control_channel, feed_wires_key, subscribe, BatchPublisher
+from data.tick_archive import TickRecorder
+from data import tick_codec
+from utils.metrics import REGISTRY, start_publisher
+
+KRAKEN_WS_URL = os.getenv("KRAKEN_WS_URL", "wss://ws.kraken.com")
+TICK_WIRES = os.getenv("TICK_WIRES", "json").split(",")  # formats to publish, see data/tick_codec.py
+FEED_SHARDS = int(os.getenv("FEED_SHARDS", "1"))             # websockets the pairs are spread over
+FEED_REDUNDANT = os.getenv("FEED_REDUNDANT", "0") == "1"     # second connection per shard, deduplicated
+
+REGISTRY.describe("feed_messages_total", "counter", "Trade messages received from the websocket", ("symbol",))
+REGISTRY.describe("feed_trades_total", "counter", "Individual trades in those messages", ("symbol",))
+REGISTRY.describe("feed_reconnects_total", "counter", "Websocket reconnects")
+REGISTRY.describe("feed_duplicates_total", "counter", "Trades dropped as already delivered by the shard's redundant connection", ("symbol",))
 
 _r = None
 def _rds():
@@ -15,11 +29,114 @@ def _rds():
     return _r
 
 
+def batch_tick(symbol: str, trades: list) -> dict:
+    """Tick message for a frame of Kraken trade rows [price, volume, time, side, ...]"""
+    prices = [float(t[0]) for t in trades]
+    volumes = [float(t[1]) for t in trades]
+    volume = sum(volumes)
+    msg = {
+        "ts": int(time.time()*1000),
+        "symbol": symbol,
+        "price": prices[-1],
+        "high": max(prices),
+        "low": min(prices),
+        "vwap": sum(p * v for p, v in zip(prices, volumes)) / volume if volume else prices[-1],
+        "volume": volume,
+        "count": len(prices),
+        "trade_ts": float(trades[-1][2]),
+    }
+    if len(trades[-1]) > 3:
+        msg["side"] = trades[-1][3]
+    if len(prices) > 1:
+        msg["prices"] = prices
+        msg["first_ts"] = float(trades[0][2])
+    return msg
+
+
+class _Connection:
+    """One websocket carrying one shard's pairs, on its own receive thread"""
+
+    def __init__(self, feed: "KrakenPriceFeed", shard: int, replica: int):
+        self.feed = feed
+        self.shard = shard
+        self.replica = replica
+        self.ws = None
+        self.name = f"kraken-ws-{shard}" + (f"r{replica}" if replica else "")
+
+    def send_subscription(self, event: str, symbols: list[str]):
+        ws = self.ws
+        if ws is None or not symbols:
+            return  # on_open subscribes the shard's full list when the socket comes (back) up
+        ws.send(json.dumps({
+            "event": event,
+            "pair": symbols,
+            "subscription": {"name": "trade"}
+        }))
+
+    def start(self):
+        def on_open(ws):
+            self.ws = ws
+            self.send_subscription("subscribe", self.feed.shard_symbols(self.shard))
+
+        def on_message(ws, message):
+            self.feed._on_message(self, message, time.time())
+
+        def on_error(ws, error):
+            print(f"Websocket error on {self.name}:", error)
+            # self.log(f"Websocket error: {error}")
+
+        def on_close(ws, code, msg):
+            self.ws = None
+            print(f"Websocket {self.name} Closed")
+            # self.log("Websocket closed")
+
+        def run_ws():
+            while True:
+                ws = websocket.WebSocketApp(
+                    self.feed.url,
+                    on_open=on_open,
+                    on_message=on_message,
+                    on_error=on_error,
+                    on_close=on_close
+                )
+                ws.run_forever(ping_interval=40, ping_timeout=20)
+                self.ws = None
+                print(f"[INFO] Websocket {self.name} disconnected, reconnecting...")
+                REGISTRY.inc("feed_reconnects_total")
+                # self.log("[INFO] Websocket disconnecter, reconnecting...")
+                time.sleep(5)
+        threading.Thread(target=run_ws, name=self.name, daemon=True).start()
+
+
+def shard_of(symbol: str, shards: int) -> int:
+    return zlib.crc32(symbol.encode()) % shards
+
+
 class KrakenPriceFeed:
-    def __init__(self, symbols: list[str]):
+    """Kraken trade stream split across `shards` websockets by pair, so a slow
+    frame or a reconnect only holds up that shard. With `redundant`, every
+    shard has a second connection on the same pairs and each trade is passed
+    on once, from whichever connection delivered it first."""
+
+    def __init__(self, symbols: list[str], url: str = KRAKEN_WS_URL, wires: list[str] = TICK_WIRES,
+                 shards: int = FEED_SHARDS, redundant: bool = FEED_REDUNDANT, symbol_file: str | None = None):
         self.symbols = symbols
+        self.symbol_file = symbol_file  # where add/remove control messages are persisted, if anywhere
+        self.url = url
+        self.wires = wires
         self.subscribers = []
+        self.trade_subscribers = []
         self.latest_prices = {}
+        self.bus = BatchPublisher(_rds())
+        self._lock = threading.Lock()
+        self.shards = max(1, shards)
+        self.redundant = redundant
+        self.connections = [[_Connection(self, i, r) for r in range(2 if redundant else 1)] for i in range(self.shards)]
+        # pair -> (newest exchange time, {trade key: times delivered}, {replica: {trade key: times it saw it}}) at that time
+        self._seen: dict[str, tuple[float, dict, dict]] = {}
+        self._seen_locks = [threading.Lock() for _ in range(self.shards)]
+        REGISTRY.gauge("feed_connections_up", "Feed websockets currently connected",
+                       lambda: sum(c.ws is not None for conns in self.connections for c in conns))
 
     def subscribe(self, callback: Callable[[str, float], None]):
         """Register a callback that receives price updates"""
@@ -27,16 +144,127 @@ class KrakenPriceFeed:
 
     def unsubscribe(self, callback):
         self.subscribers.remove(callback)
+
+    def subscribe_trades(self, callback: Callable[[str, list], None]):
+        """Register a callback that receives every raw trade row of a message"""
+        self.trade_subscribers.append(callback)
     
     def _notify_subscribers(self, symbol: str, price: float):
         for callback in self.subscribers:
             callback(symbol, price)
     
-    def publish_tick(self, symbol: str, price: float):
-        msg = {"ts": int(time.time()*1000), "symbol": symbol, "price": float(price)}
-        r = _rds()
-        publish_json(r, f"ticks:{symbol}", msg)
-        set_json(r, f"lvc:{symbol}", msg)
+    def publish_batch(self, symbol: str, trades: list, recv_ts: float | None = None) -> dict:
+        """One tick message per websocket frame: `price` is the last trade, `prices`
+        every trade in order when there was more than one, plus the frame's
+        high/low/VWAP/volume. Queued on the batch publisher, so the websocket
+        thread never waits on Redis and bursts across pairs share a pipeline."""
+        msg = batch_tick(symbol, trades)
+        if recv_ts is not None:
+            msg["recv_ts"] = recv_ts
+        msg["pub_ts"] = time.time()
+        blob = json.dumps(msg)
+        if "json" in self.wires:
+            self.bus.publish(tick_channel(symbol), blob)
+        if "binary" in self.wires:
+            try:
+                self.bus.publish(tick_channel(symbol, "binary"), tick_codec.encode(msg))
+            except ValueError as e:
+                print(f"[ERROR] {symbol}: frame not published in binary: {e}")
+        self.bus.set(f"lvc:{symbol}", blob)
+        return msg
+
+    def shard_symbols(self, shard: int) -> list[str]:
+        with self._lock:
+            return [s for s in self.symbols if shard_of(s, self.shards) == shard]
+
+    def _send_subscription(self, event: str, symbols: list[str]):
+        for shard, conns in enumerate(self.connections):
+            mine = [s for s in symbols if shard_of(s, self.shards) == shard]
+            for conn in conns:
+                conn.send_subscription(event, mine)
+
+    def _dedup(self, conn: _Connection, symbol: str, trades: list) -> list:
+        """Trades not already delivered by the shard's other connection. v1 trade
+        rows carry no trade id, so a trade is known by its exchange time plus
+        price, volume and side; both connections see each pair's trades in
+        exchange order, so anything older than the newest seen is a repeat.
+        That key is not unique (two identical fills can share a timestamp), so
+        each connection counts how often it has seen a key and a row goes out
+        only once some connection has seen it more often than was delivered."""
+        with self._seen_locks[conn.shard]:
+            last_ts, delivered, seen_by = self._seen.get(symbol, (0.0, {}, {}))
+            fresh = []
+            for t in trades:
+                ts = float(t[2])
+                if ts < last_ts:
+                    continue
+                if ts > last_ts:
+                    last_ts, delivered, seen_by = ts, {}, {}
+                key = tuple(t[:4])
+                mine = seen_by.setdefault(conn.replica, {})
+                n = mine[key] = mine.get(key, 0) + 1
+                if n <= delivered.get(key, 0):
+                    continue
+                delivered[key] = n
+                fresh.append(t)
+            self._seen[symbol] = (last_ts, delivered, seen_by)
+        if len(fresh) < len(trades):
+            REGISTRY.inc("feed_duplicates_total", (symbol,), len(trades) - len(fresh))
+        return fresh
+
+    def add_symbols(self, symbols: list[str]) -> list[str]:
+        """Subscribe more pairs on the live socket; existing streams are untouched"""
+        with self._lock:
+            new = [s for s in dict.fromkeys(symbols) if s not in self.symbols]
+            self.symbols = self.symbols + new
+        self._send_subscription("subscribe", new)
+        return new
+
+    def remove_symbols(self, symbols: list[str]) -> list[str]:
+        with self._lock:
+            gone = [s for s in self.symbols if s in symbols]
+            self.symbols = [s for s in self.symbols if s not in symbols]
+        self._send_subscription("unsubscribe", gone)
+        return gone
+
+    def _on_control(self, msg: dict):
+        symbols = [s.strip().upper() for s in msg.get("symbols", []) if s and "/" in s]
+        if msg.get("cmd") == "add":
+            changed = self.add_symbols(symbols)
+        elif msg.get("cmd") == "remove":
+            changed = self.remove_symbols(symbols)
+        else:
+            print(f"[ERROR] unknown feed control message: {msg}")
+            return
+        print(f"[INFO] feed {msg['cmd']}: {changed or 'no change'}")
+        if changed and self.symbol_file:
+            self._save_symbols()
+
+    def _save_symbols(self):
+        """Rewrite the symbol list so a restart streams the same pairs"""
+        with self._lock:
+            symbols = list(self.symbols)
+        tmp = f"{self.symbol_file}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(symbols, f, indent=2)
+            os.replace(tmp, self.symbol_file)
+        except OSError as e:
+            print(f"[ERROR] could not save {self.symbol_file}: {e}")
+
+    def listen_control(self, client=None):
+        """Apply add/remove messages from the feed:control channel in a background thread"""
+        client = client or _rds()
+
+        def run():
+            while True:
+                try:
+                    subscribe(client, feed_control_channel(), self._on_control)
+                except Exception as e:
+                    print(f"[ERROR] feed control listener: {e}")
+                    time.sleep(1)
+
+        threading.Thread(target=run, name="feed-control", daemon=True).start()
 
     def log(self, event):
         log_dir = "/home/halodi/python_scripts/auto-trader/data/feed_logs"
@@ -58,67 +286,54 @@ class KrakenPriceFeed:
             json.dump(logs, f, indent=2)
 
     
-    def start(self):
-        def on_open(ws):
-            for symbol in self.symbols:
-                ws.send(json.dumps({
-                    "event": "subscribe",
-                    "pair": [symbol],
-                    "subscription": {"name": "trade"}
-                }))
-        def on_message(ws, message):
-            data = json.loads(message)
-            if isinstance(data, list) and data[-2] == "trade":
-                symbol = data[-1].upper()
-                    
-                trades = data[1]
-                if not trades:
-                    return
-                price = float(trades[0][0])
-                self._notify_subscribers(symbol, price)
-                self.publish_tick(symbol, price)
-                self.latest_prices[symbol] = price
-            else:
-                return
+    def _on_message(self, conn: "_Connection", message: str, recv_ts: float):
+        data = json.loads(message)
+        if isinstance(data, list) and data[-2] == "trade":
+            symbol = data[-1].upper()
 
-        def on_error(ws, error):
-            print("Websocket error:", error)
-            # self.log(f"Websocket error: {error}")
+            trades = data[1]
+            if self.redundant:
+                trades = self._dedup(conn, symbol, trades)
+            if not trades:
+                return
+            REGISTRY.inc("feed_messages_total", (symbol,))
+            REGISTRY.inc("feed_trades_total", (symbol,), len(trades))
+            for callback in self.trade_subscribers:
+                callback(symbol, trades)
+            msg = self.publish_batch(symbol, trades, recv_ts)
+            for price in msg.get("prices") or (msg["price"],):
+                self._notify_subscribers(symbol, price)
+            self.latest_prices[symbol] = msg["price"]
 
-        def on_close(ws, code, msg):
-            print("Websocket Closed")
-            # self.log("Websocket closed")
+    def start(self):
+        try:
+            _rds().set(feed_wires_key(), ",".join(self.wires))  # lets controllers spot a TICK_WIRE mismatch
+        except Exception as e:
+            print(f"[ERROR] could not announce tick wires: {e}")
+        for conns in self.connections:
+            for conn in conns:
+                conn.start()
 
-        ws_url = f"wss://ws.kraken.com"
-        def run_ws():
-            while True:
-                ws = websocket.WebSocketApp(
-                    ws_url,
-                    on_open=on_open,
-                    on_message=on_message,
-                    on_error=on_error,
-                    on_close=on_close
-                )
-                ws.run_forever(ping_interval=40, ping_timeout=20)
-                print("[INFO] Websocket disconnected, reconnecting...")
-                # self.log("[INFO] Websocket disconnecter, reconnecting...")
-                time.sleep(5)
-        wst = threading.Thread(target=run_ws, daemon=True)
-        wst.start()
-    
 def expose_feed(symbol, price):
         print(f"{symbol}: {price}")
 
 
 if __name__ == "__main__":
-    with open("data/symbol_list.json") as f:
+    symbol_file = "data/symbol_list.json"
+    with open(symbol_file) as f:
         symbol_list = json.load(f)
-    feed = KrakenPriceFeed(symbol_list)
+    feed = KrakenPriceFeed(symbol_list, symbol_file=symbol_file)
+    recorder = TickRecorder().start()
+    start_publisher(_rds(), "feed", threading.Event())
+    feed.subscribe_trades(recorder.on_trades)
     feed.start()
+    feed.listen_control()
     feed.subscribe(expose_feed)
 
     try:
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
-        print("Stopping feed...")
\ No newline at end of file
+        print("Stopping feed...")
+        feed.bus.close()
+        recorder.close()
\ No newline at end of file
@@ -0,0 +1,152 @@
+from websockets.asyncio.server import serve
+from data.tick_archive import TickArchive
+import numpy as np
+import argparse
+import asyncio
+import json
+import time
+
+HEARTBEAT_EVERY = 1.0
+
+
+class KrakenSim:
+    """Local stand-in for wss://ws.kraken.com speaking the v1 `trade` channel.
+
+    Each symbol gets one producer that pushes trades to every connection
+    subscribed to it. Synthetic symbols random-walk at `tps` trades/sec;
+    archived symbols replay their recorded trades at `speed`x. tps or
+    speed of 0 means as fast as the sockets drain. Trade times are stamped
+    with the wall clock at send, like the exchange does."""
+
+    def __init__(self, symbols: list[str], tps: float = 10.0, speed: float = 1.0, archive: TickArchive | None = None, host: str = "127.0.0.1", port: int = 8765):
+        self.symbols = [s.upper() for s in symbols]
+        self.tps = tps
+        self.speed = speed
+        self.archive = archive
+        self.host = host
+        self.port = port
+        self.channels = {s: i + 100 for i, s in enumerate(self.symbols)}
+        self._subs: dict[str, set] = {s: set() for s in self.symbols}
+        self.sent = 0
+        self.url = f"ws://{host}:{port}"
+
+    async def _handler(self, ws):
+        await ws.send(json.dumps({"connectionID": id(ws), "event": "systemStatus", "status": "online", "version": "1.9.0"}))
+        hb = asyncio.create_task(self._heartbeat(ws))
+        try:
+            async for raw in ws:
+                try:
+                    msg = json.loads(raw)
+                except ValueError:
+                    continue
+                event = msg.get("event")
+                if event == "ping":
+                    await ws.send(json.dumps({"event": "pong", "reqid": msg.get("reqid")}))
+                elif event in ("subscribe", "unsubscribe"):
+                    for pair in msg.get("pair", []):
+                        await self._subscription(ws, event, pair.upper(), msg)
+        finally:
+            hb.cancel()
+            for subs in self._subs.values():
+                subs.discard(ws)
+
+    async def _subscription(self, ws, event: str, pair: str, msg: dict):
+        reply = {"event": "subscriptionStatus", "pair": pair, "subscription": msg.get("subscription", {"name": "trade"})}
+        if "reqid" in msg:
+            reply["reqid"] = msg["reqid"]
+        if pair not in self._subs:
+            reply.update(status="error", errorMessage="Currency pair not supported")
+        elif event == "subscribe":
+            self._subs[pair].add(ws)
+            reply.update(status="subscribed", channelID=self.channels[pair], channelName="trade")
+        else:
+            self._subs[pair].discard(ws)
+            reply.update(status="unsubscribed", channelID=self.channels[pair], channelName="trade")
+        await ws.send(json.dumps(reply))
+
+    async def _heartbeat(self, ws):
+        while True:
+            await asyncio.sleep(HEARTBEAT_EVERY)
+            await ws.send('{"event":"heartbeat"}')
+
+    async def _broadcast(self, symbol: str, price: float, volume: float, side: str):
+        subs = self._subs[symbol]
+        if not subs:
+            return
+        trade = [f"{price:.5f}", f"{volume:.8f}", f"{time.time():.6f}", side, "m", ""]
+        frame = json.dumps([self.channels[symbol], [trade], "trade", symbol])
+        for ws in list(subs):
+            try:
+                await ws.send(frame)
+                self.sent += 1
+            except Exception:
+                subs.discard(ws)
+
+    def _source(self, symbol: str):
+        """Yields (delay_s, price, volume, side) forever"""
+        if self.archive is not None and self.archive.days(symbol):
+            while True:
+                for day in self.archive.days(symbol):
+                    recs = self.archive.load(symbol, day)
+                    gaps = np.diff(recs["ts"], prepend=recs["ts"][:1]) / 1000.0
+                    for gap, rec in zip(gaps.tolist(), recs.tolist()):
+                        yield (gap / self.speed if self.speed else 0.0), rec[1], rec[2], ("b" if rec[3] >= 0 else "s")
+        rng = np.random.default_rng(abs(hash(symbol)) % 2**32)
+        price = 100.0
+        delay = 1.0 / self.tps if self.tps else 0.0
+        while True:
+            steps = rng.normal(0, 0.0005, 1024)
+            vols = rng.exponential(0.5, 1024)
+            sides = rng.random(1024) < 0.5
+            for step, vol, buy in zip(steps.tolist(), vols.tolist(), sides.tolist()):
+                price *= 1 + step
+                yield delay, price, vol, ("b" if buy else "s")
+
+    async def _produce(self, symbol: str):
+        next_at = time.perf_counter()
+        for delay, price, volume, side in self._source(symbol):
+            while not self._subs[symbol]:
+                await asyncio.sleep(0.05)
+                next_at = time.perf_counter()
+            await self._broadcast(symbol, price, volume, side)
+            if delay:
+                # pace against a running schedule so sleep overshoot doesn't accumulate
+                next_at += delay
+                wait = next_at - time.perf_counter()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            else:
+                await asyncio.sleep(0)
+
+    async def serve(self, ready: asyncio.Event | None = None):
+        async with serve(self._handler, self.host, self.port, max_queue=None, compression=None):
+            producers = [asyncio.create_task(self._produce(s)) for s in self.symbols]
+            print(f"[INFO] kraken sim on {self.url} with {len(self.symbols)} symbols")
+            if ready is not None:
+                ready.set()
+            try:
+                await asyncio.Future()
+            finally:
+                for p in producers:
+                    p.cancel()
+
+
+def sim_symbols(count: int) -> list[str]:
+    return [f"SIM{i}/USD" for i in range(count)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Kraken v1 websocket for offline feed testing")
+    parser.add_argument("--symbols", "-s", type=str, default=None, help="Comma separated pairs (replayed from the tick archive when recorded)")
+    parser.add_argument("--count", "-n", type=int, default=5, help="Number of synthetic SIMn/USD pairs when --symbols is not given")
+    parser.add_argument("--tps", type=float, default=10.0, help="Synthetic trades/sec per pair, 0 for as fast as possible")
+    parser.add_argument("--speed", type=float, default=1.0, help="Archive replay speed: 1 real time, 100 for 100x, 0 for as fast as possible")
+    parser.add_argument("--port", "-p", type=int, default=8765)
+    args = parser.parse_args()
+
+    symbols = args.symbols.split(",") if args.symbols else sim_symbols(args.count)
+    sim = KrakenSim(symbols, args.tps, args.speed, TickArchive(), port=args.port)
+    try:
+        asyncio.run(sim.serve())
+    except KeyboardInterrupt:
+        print("Stopping sim...")
@@ -1,8 +1,38 @@
 import json, redis
+import threading
+import time
+from collections import deque
 from typing import Callable
+from utils.metrics import REGISTRY
 
-def get_client(host: str = "localhost", port: int = 6379) -> redis.Redis:
-    return redis.Redis(host=host, port=port, decode_responses=True)
+BATCH_WINDOW = 0.002    # longest a message waits for others to share its pipeline
+BATCH_MAX = 256         # flush early once this many messages are waiting
+BATCH_BACKLOG = 50_000  # publishes kept while Redis is unreachable; oldest dropped past this
+RETRY_MIN = 0.05        # first wait before resending a batch that failed to flush
+RETRY_MAX = 2.0         # the wait doubles per consecutive failure up to this
+
+REGISTRY.describe("bus_batches_total", "counter", "Pipelines flushed by the batch publisher")
+REGISTRY.describe("bus_messages_total", "counter", "Publishes and last-value sets sent through those pipelines")
+REGISTRY.describe("bus_dropped_total", "counter", "Publishes and sets dropped because the backlog was full or Redis rejected them")
+REGISTRY.describe("bus_flush_seconds", "histogram", "Time to execute one pipeline")
+REGISTRY.describe("bus_flush_lag_seconds", "histogram", "Time from a message being queued to its pipeline completing")
+
+_pools: dict[tuple[str, int, bool], redis.ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(host: str = "localhost", port: int = 6379, decode_responses: bool = True) -> redis.ConnectionPool:
+    with _pools_lock:
+        pool = _pools.get((host, port, decode_responses))
+        if pool is None:
+            pool = _pools[(host, port, decode_responses)] = redis.ConnectionPool(host=host, port=port, decode_responses=decode_responses)
+        return pool
+
+
+def get_client(host: str = "localhost", port: int = 6379, decode_responses: bool = True) -> redis.Redis:
+    """Client on the process-wide pool for host:port, so calling this per request or per thread is cheap.
+    Binary tick subscribers need decode_responses=False."""
+    return redis.Redis(connection_pool=get_pool(host, port, decode_responses))
 
 def publish_json(r: redis.Redis, channel: str, obj: dict) -> None:
     r.publish(channel, json.dumps(obj))
@@ -10,20 +40,180 @@ def publish_json(r: redis.Redis, channel: str, obj: dict) -> None:
 def set_json(r: redis.Redis, key: str, obj: dict) -> None:
     r.set(key, json.dumps(obj))
 
-def tick_channel(symbol: str) -> str:
-    return f"ticks:{symbol}"
+def tick_channel(symbol: str, wire: str = "json") -> str:
+    """ticks:{symbol} carries JSON (the UI reads it), ticksb:{symbol} the binary tick_codec form"""
+    return f"ticksb:{symbol}" if wire == "binary" else f"ticks:{symbol}"
+
+def status_key(tid: str) -> str:
+    return f"status:{tid}"
+
+def status_channel(tid: str) -> str:
+    return f"status_changes:{tid}"
 
 def hb_channel():
     return f"heartbeat:traders"
 
+def feed_wires_key() -> str:
+    # comma separated tick_codec wires the running feed publishes
+    return "feed:wires"
+
+def feed_control_channel() -> str:
+    # {"cmd": "add" | "remove", "symbols": [...]} for the running KrakenPriceFeed
+    return "feed:control"
+
 def get_json(r: redis.Redis, key: str):
     raw = r.get(key)
     return json.loads(raw) if raw else None
 
-def subscribe(r: redis.Redis, channel: str, on_message: Callable[[dict], None], timeout: int = 1):
+def subscribe(r: redis.Redis, channel: str, on_message: Callable[[dict], None], timeout: int = 1, decode=json.loads):
     ps = r.pubsub()
     ps.subscribe(channel)
     while True:
         msg = ps.get_message(ignore_subscribe_messages=True, timeout=timeout)
         if msg and msg.get("type") == "message":
-            on_message(json.loads(msg["data"]))
+            on_message(decode(msg["data"]))
+
+
+class BatchPublisher:
+    """Publishes and last-value sets from any thread, sent together in one
+    non-transactional pipeline at most `window` seconds after the first of
+    them was queued, or as soon as `max_batch` are waiting. Sets to the same
+    key within a batch collapse to the latest value.
+
+    A batch that fails on a connection error goes back to the front of the
+    queue (still bounded by the backlog) and is retried with exponential
+    backoff; one Redis rejects outright is dropped and counted."""
+
+    def __init__(self, client: redis.Redis | None = None, window: float = BATCH_WINDOW,
+                 max_batch: int = BATCH_MAX, backlog: int = BATCH_BACKLOG):
+        self.client = client or get_client()
+        self.window = window
+        self.max_batch = max_batch
+        self._cond = threading.Condition()
+        self._publishes = deque(maxlen=backlog)
+        self._sets: dict[str, str] = {}
+        self._first = None
+        self._retry_at = 0.0
+        self._backoff = 0.0
+        self._thread = None
+        self._stop = False
+        self._batches = REGISTRY.counter("bus_batches_total")
+        self._messages = REGISTRY.counter("bus_messages_total")
+        self._dropped = REGISTRY.counter("bus_dropped_total")
+
+    def _queued(self):
+        if self._first is None:
+            self._first = time.time()
+            if self._thread is None or not self._thread.is_alive():
+                self._stop = False
+                self._thread = threading.Thread(target=self._run, name="bus-publisher", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        elif len(self._publishes) + len(self._sets) >= self.max_batch:
+            self._cond.notify()
+
+    def publish(self, channel: str, blob: str):
+        with self._cond:
+            if len(self._publishes) == self._publishes.maxlen:
+                self._dropped.inc()
+            self._publishes.append((channel, blob))
+            self._queued()
+
+    def set(self, key: str, blob: str):
+        with self._cond:
+            self._sets[key] = blob
+            self._queued()
+
+    def _take(self):
+        publishes = [self._publishes.popleft() for _ in range(min(len(self._publishes), self.max_batch))]
+        sets, self._sets = self._sets, {}
+        first = self._first
+        self._first = time.time() if self._publishes else None
+        return publishes, sets, first
+
+    def _requeue(self, publishes, sets, first):
+        """Put a failed batch back ahead of anything queued since, newest kept when over the backlog"""
+        with self._cond:
+            room = self._publishes.maxlen - len(self._publishes)
+            lost = max(len(publishes) - room, 0)
+            if lost:
+                self._dropped.add(lost)
+            self._publishes.extendleft(reversed(publishes[lost:]))
+            for key, blob in sets.items():
+                self._sets.setdefault(key, blob)  # a newer value queued meanwhile wins
+            self._first = first if self._first is None else min(first, self._first)
+            self._backoff = min(max(self._backoff * 2, RETRY_MIN), RETRY_MAX)
+            self._retry_at = time.time() + self._backoff
+
+    def _send(self, publishes, sets, first) -> bool:
+        t0 = time.time()
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for channel, blob in publishes:
+                pipe.publish(channel, blob)
+            for key, blob in sets.items():
+                pipe.set(key, blob)
+            pipe.execute()
+        except (redis.ConnectionError, redis.TimeoutError) as e:
+            print(f"[ERROR] bus flush of {len(publishes)} publishes, {len(sets)} sets failed, retrying: {e}")
+            self._requeue(publishes, sets, first)
+            return False
+        except Exception as e:
+            print(f"[ERROR] bus flush of {len(publishes)} publishes, {len(sets)} sets rejected, dropped: {e}")
+            self._dropped.add(len(publishes) + len(sets))
+            return True
+        done = time.time()
+        self._backoff = 0.0
+        self._batches.inc()
+        self._messages.add(len(publishes) + len(sets))
+        REGISTRY.observe("bus_flush_seconds", (), done - t0)
+        REGISTRY.observe("bus_flush_lag_seconds", (), done - first)
+        return True
+
+    def _run(self):
+        while True:
+            try:
+                with self._cond:
+                    while self._first is None and not self._stop:
+                        self._cond.wait()
+                    if self._first is None:
+                        return
+                    now = time.time()
+                    wait = max(self._first + self.window, self._retry_at) - now
+                    if self._stop or len(self._publishes) + len(self._sets) >= self.max_batch:
+                        wait = self._retry_at - now  # full or closing skips the window, not the backoff
+                    if wait > 0:
+                        self._cond.wait(wait)
+                        continue
+                    batch = self._take()
+                self._send(*batch)
+            except Exception as e:
+                # the thread must outlive any error: _queued only restarts it while nothing is queued
+                print(f"[ERROR] bus publisher error: {e}")
+                time.sleep(RETRY_MIN)
+
+    def flush(self) -> bool:
+        """Send everything queued so far from the calling thread; False, leaving
+        the rest queued, when Redis cannot be reached"""
+        while True:
+            with self._cond:
+                if self._first is None:
+                    return True
+                batch = self._take()
+            if not self._send(*batch):
+                return False
+
+    def close(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if not self.flush():
+            with self._cond:
+                lost = len(self._publishes) + len(self._sets)
+                self._publishes.clear()
+                self._sets.clear()
+                self._first = None
+            self._dropped.add(lost)
+            print(f"[ERROR] bus closed with {lost} messages unsent")
@@ -0,0 +1,219 @@
+from collections import deque
+import numpy as np
+import threading
+import bisect
+import atexit
+import time
+import os
+
+ARCHIVE_ROOT = "tick_data"
+INDEX_EVERY = 1024
+FLUSH_EVERY = 0.5
+
+# fixed-width record, aligned to 32 bytes so columns can be read straight off the map
+RECORD = np.dtype([("ts", "<i8"), ("price", "<f8"), ("volume", "<f8"), ("side", "i1")], align=True)
+INDEX = np.dtype([("ts", "<i8"), ("row", "<i8")])
+
+BUY, SELL = 1, -1
+
+
+def symbol_dir(symbol: str, root: str = ARCHIVE_ROOT) -> str:
+    return os.path.join(root, symbol.upper().replace("/", "_"))
+
+
+def day_of(ts_ms: int) -> str:
+    return time.strftime("%Y%m%d", time.gmtime(ts_ms / 1000))
+
+
+def segment_paths(symbol: str, day: str, root: str = ARCHIVE_ROOT) -> tuple[str, str]:
+    base = os.path.join(symbol_dir(symbol, root), day)
+    return base + ".ticks", base + ".idx"
+
+
+def _build_index(records) -> np.ndarray:
+    rows = np.arange(0, len(records), INDEX_EVERY, dtype="<i8")
+    idx = np.empty(len(rows), dtype=INDEX)
+    idx["ts"] = records["ts"][rows]
+    idx["row"] = rows
+    return idx
+
+
+class _Segment:
+    """Open append handle for one symbol/day"""
+
+    def __init__(self, symbol: str, day: str, root: str):
+        self.data_path, self.idx_path = segment_paths(symbol, day, root)
+        os.makedirs(os.path.dirname(self.data_path), exist_ok=True)
+        size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        self.rows = size // RECORD.itemsize
+        if size % RECORD.itemsize:
+            # a crash mid-write leaves a partial record at the tail
+            with open(self.data_path, "r+b") as f:
+                f.truncate(self.rows * RECORD.itemsize)
+        idx_rows = os.path.getsize(self.idx_path) // INDEX.itemsize if os.path.exists(self.idx_path) else 0
+        if idx_rows != -(-self.rows // INDEX_EVERY):
+            records = np.memmap(self.data_path, dtype=RECORD, mode="r") if self.rows else np.empty(0, dtype=RECORD)
+            _build_index(records).tofile(self.idx_path)
+        self.data = open(self.data_path, "ab")
+        self.idx = open(self.idx_path, "ab")
+
+    def append(self, records: np.ndarray):
+        start = self.rows
+        self.data.write(records.tobytes())
+        # index rows that fall inside this batch
+        first = -(-start // INDEX_EVERY) * INDEX_EVERY
+        rows = np.arange(first, start + len(records), INDEX_EVERY, dtype="<i8")
+        if len(rows):
+            idx = np.empty(len(rows), dtype=INDEX)
+            idx["ts"] = records["ts"][rows - start]
+            idx["row"] = rows
+            self.idx.write(idx.tobytes())
+        self.rows += len(records)
+
+    def flush(self):
+        self.data.flush()
+        self.idx.flush()
+
+    def close(self):
+        self.flush()
+        self.data.close()
+        self.idx.close()
+
+
+class TickRecorder:
+    """Feed subscriber that archives every trade.
+
+    `on_trades` only appends to an in-memory buffer; a background thread
+    drains it every `flush_every` seconds and writes each symbol/day as a
+    single batch, so the feed's hot path never touches the disk."""
+
+    def __init__(self, root: str = ARCHIVE_ROOT, flush_every: float = FLUSH_EVERY):
+        self.root = root
+        self.flush_every = flush_every
+        self._buf = deque()
+        self._segments: dict[tuple[str, str], _Segment] = {}
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.written = 0
+
+    def record(self, symbol: str, ts_ms: int, price: float, volume: float = 0.0, side: int = 0):
+        self._buf.append((symbol, ts_ms, price, volume, side))
+
+    def on_trades(self, symbol: str, trades: list):
+        """Kraken trade rows: [price, volume, time, side, orderType, misc]"""
+        for t in trades:
+            self._buf.append((symbol, int(float(t[2]) * 1000), float(t[0]), float(t[1]), BUY if t[3] == "b" else SELL))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="tick-recorder", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.flush_every):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[ERROR] tick archive flush failed: {e}")
+
+    def flush(self):
+        with self._lock:
+            n = len(self._buf)
+            if not n:
+                return
+            batch = [self._buf.popleft() for _ in range(n)]
+            groups: dict[tuple[str, str], list] = {}
+            for symbol, ts, price, volume, side in batch:
+                groups.setdefault((symbol, day_of(ts)), []).append((ts, price, volume, side))
+            for key, rows in groups.items():
+                seg = self._segments.get(key)
+                if seg is None:
+                    self._close_old(key[1])
+                    seg = self._segments[key] = _Segment(key[0], key[1], self.root)
+                seg.append(np.array(rows, dtype=RECORD))
+                seg.flush()
+            self.written += n
+
+    def _close_old(self, day: str):
+        # segments from an earlier day won't be written again once a newer day shows up
+        for key in [k for k in self._segments if k[1] < day]:
+            self._segments.pop(key).close()
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.flush()
+        with self._lock:
+            for seg in self._segments.values():
+                seg.close()
+            self._segments.clear()
+
+
+class TickArchive:
+    """Read side. Arrays are read-only memmaps over the segment files, so
+    columns like `ticks["price"]` are views into the page cache, not copies."""
+
+    def __init__(self, root: str = ARCHIVE_ROOT):
+        self.root = root
+
+    def symbols(self) -> list[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d.replace("_", "/") for d in os.listdir(self.root))
+
+    def days(self, symbol: str) -> list[str]:
+        path = symbol_dir(symbol, self.root)
+        if not os.path.isdir(path):
+            return []
+        return sorted(f[:-6] for f in os.listdir(path) if f.endswith(".ticks"))
+
+    def load(self, symbol: str, day: str) -> np.ndarray:
+        data_path, _ = segment_paths(symbol, day, self.root)
+        rows = os.path.getsize(data_path) // RECORD.itemsize if os.path.exists(data_path) else 0
+        if not rows:
+            return np.empty(0, dtype=RECORD)
+        return np.memmap(data_path, dtype=RECORD, mode="r", shape=(rows,))
+
+    def _index(self, symbol: str, day: str) -> np.ndarray:
+        _, idx_path = segment_paths(symbol, day, self.root)
+        if not os.path.exists(idx_path) or not os.path.getsize(idx_path):
+            return np.empty(0, dtype=INDEX)
+        return np.fromfile(idx_path, dtype=INDEX)
+
+    def seek(self, symbol: str, day: str, ts_ms: int, records=None) -> int:
+        """First row with ts >= ts_ms. The sparse index narrows it to one block,
+        then a binary search inside the block touches only a few pages."""
+        records = self.load(symbol, day) if records is None else records
+        idx = self._index(symbol, day)
+        if not len(idx):
+            return int(np.searchsorted(records["ts"], ts_ms, side="left"))
+        b = max(int(np.searchsorted(idx["ts"], ts_ms, side="left")) - 1, 0)
+        lo = int(idx["row"][b])
+        hi = int(idx["row"][b + 1]) + 1 if b + 1 < len(idx) else len(records)
+        return lo + int(np.searchsorted(records["ts"][lo:hi], ts_ms, side="left"))
+
+    def iter_range(self, symbol: str, start_ms: int | None = None, end_ms: int | None = None):
+        """Yields one zero-copy slice per day covering [start_ms, end_ms)"""
+        days = self.days(symbol)
+        if start_ms is not None:
+            days = days[bisect.bisect_left(days, day_of(start_ms)):]
+        if end_ms is not None:
+            days = days[:bisect.bisect_right(days, day_of(end_ms))]
+        for day in days:
+            records = self.load(symbol, day)
+            lo = self.seek(symbol, day, start_ms, records) if start_ms is not None else 0
+            hi = self.seek(symbol, day, end_ms, records) if end_ms is not None else len(records)
+            if hi > lo:
+                yield records[lo:hi]
+
+    def range(self, symbol: str, start_ms: int | None = None, end_ms: int | None = None) -> np.ndarray:
+        parts = list(self.iter_range(symbol, start_ms, end_ms))
+        if not parts:
+            return np.empty(0, dtype=RECORD)
+        # a single day stays a view; spanning days needs one copy to be contiguous
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
@@ -0,0 +1,48 @@
+from backtest.engine import load_ticks, run_reference, run_vectorized, write_trade_calls
+from backtest.sim import BacktestRules
+from datetime import datetime as dt, timezone
+import argparse
+import time
+
+
+def to_ms(day: str | None) -> int | None:
+    if day is None:
+        return None
+    return int(dt.fromisoformat(day).replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded ticks through the trading logic")
+    parser.add_argument("--symbol", "-s", type=str, default="SOL/USD", help="Coin to replay from the tick archive")
+    parser.add_argument("--csv", type=str, default=None, help="Replay a ts,price CSV instead of the archive")
+    parser.add_argument("--start", type=str, default=None, help="UTC start date, e.g. 2025-06-01")
+    parser.add_argument("--end", type=str, default=None, help="UTC end date (exclusive)")
+    parser.add_argument("--mode", choices=["vector", "reference", "both"], default="vector", help="both runs the two engines and checks they agree")
+    parser.add_argument("--buy-offset", type=float, default=1.0, help="Buy limit %% below the last price")
+    parser.add_argument("--take-profit", type=float, default=2.0, help="Sell limit %% above entry")
+    parser.add_argument("--stop-loss", type=float, default=1.0, help="Trailing stop %%")
+    parser.add_argument("--funds", type=float, default=None, help="Starting balance to size trades with")
+    parser.add_argument("--out", "-o", type=str, default="backtest_trade_calls.json", help="Where to write the trade_calls.json log")
+    args = parser.parse_args()
+
+    rules = BacktestRules(args.buy_offset, args.take_profit, args.stop_loss)
+    t0 = time.time()
+    ts, price = load_ticks(args.symbol, args.csv, to_ms(args.start), to_ms(args.end))
+    print(f"[INFO] loaded {len(price)} ticks in {time.time() - t0:.2f}s")
+
+    results = {}
+    for mode, run in (("vector", run_vectorized), ("reference", run_reference)):
+        if args.mode not in (mode, "both"):
+            continue
+        t0 = time.time()
+        results[mode] = run(args.symbol, ts, price, rules, args.funds)
+        print(f"[INFO] {mode}: {len(results[mode])} events in {time.time() - t0:.2f}s")
+
+    if len(results) == 2 and results["vector"] != results["reference"]:
+        print("[ERROR] vector and reference runs disagree")
+        raise SystemExit(1)
+
+    entries = next(iter(results.values()))
+    write_trade_calls(entries, args.out)
+    sales = sum(1 for e in entries if e["event"] == "trailing stop sale")
+    print(f"[INFO] {sales} round trips written to {args.out}")
@@ -2,6 +2,9 @@ from data.redis_bus import get_json, get_client, subscribe, tick_channel, publis
 from strategies.base_strategy import TraderStatus
 from storage.trade_logger import log_trade as logger
 from controllers.controller import Controller
+from controllers.async_controller import AsyncController
+from controllers.sharding import ShardedController
+from controllers.cluster import ClusterController
 import threading
 import time
 import argparse
@@ -21,7 +24,7 @@ CMD_CH = "controller:commands"
 RPL_CH = "controller:replies"
 HB_KEY= "heartbeat:traders:last"
 CTRL_ALIVE_KEY = "controller:alive"
-controller = Controller()
+controller = None
 def shutdown(signum, frame):
     controller.controller_stop.set()
 
@@ -30,8 +33,17 @@ if __name__ == "__main__":
     parser.add_argument("--symbols", "-s", type=str, default="ETH/USD", help="Coin you want to track and predict trades on")
     parser.add_argument("--feed", action="store_true", help="Expose the full kraken feed")
     parser.add_argument("--timeout", "-t", type=int, default=60, help="CLI changeable timeout for trader staleness, this will be removed once the UI 1.0 is up")
+    parser.add_argument("--engine", choices=["threads", "asyncio"], default="threads", help="Trader runtime: one thread per trader, or asyncio tasks on a single loop")
+    parser.add_argument("--workers", "-w", type=int, default=0, help="Shard traders across N worker processes (0 runs them in this process)")
+    parser.add_argument("--cluster", action="store_true", help="Join the controller cluster as $CONTROLLER_ID and share traders with the other instances")
     args = parser.parse_args()
     symbols = args.symbols.split(",")
+    if args.cluster:
+        controller = ClusterController()
+    elif args.workers > 0:
+        controller = ShardedController(args.workers)
+    else:
+        controller = AsyncController() if args.engine == "asyncio" else Controller()
 
     signal.signal(signal.SIGTERM, shutdown)
     signal.signal(signal.SIGINT, shutdown)
@@ -0,0 +1,132 @@
+from controllers.controller import Controller
+from controllers.market_state import SymbolMarketState
+from controllers.trade_controller import on_message
+from backtest.sim import BacktestRules, SimStrategy
+from data.kraken_feed import KrakenPriceFeed
+from data.kraken_sim import KrakenSim, sim_symbols
+from data.tick_archive import TickArchive
+from utils.latency import HopLatency
+import numpy as np
+import threading
+import argparse
+import asyncio
+import time
+import sys
+import os
+
+
+class LoadTestController(Controller):
+    """Controller with SimStrategy traders and no REST seeding, recording the
+    latency from the sim's trade timestamp to the moment on_message runs"""
+
+    def __init__(self, rules: BacktestRules = BacktestRules()):
+        super().__init__()
+        self.rules = rules
+        self.latencies = []
+        self.dispatched = 0  # trades, like the sim and feed counts
+        self.frames = 0      # tick messages, one per websocket frame
+        self.handled = 0
+        self.events = 0
+        self.recording = False
+
+    def seed_markets(self, symbols):
+        with self._cache_lock:
+            for s in symbols:
+                self._markets.setdefault(s, SymbolMarketState(s))
+            return {s: self._markets[s] for s in symbols}
+
+    def get_or_create_strat(self, symbol, owner, fund_amnt):
+        self.seed_markets([symbol])
+        with self._cache_lock:
+            return self._strats.setdefault(f"{symbol}|{owner}", SimStrategy(symbol, self.rules, fund_amnt, owner))
+
+    def _prepare_tick(self, symbol, msg):
+        self.frames += 1
+        self.dispatched += len(msg.get("prices") or (msg["price"],))
+        steps, stamps = super()._prepare_tick(symbol, msg)
+        return steps, stamps, msg.get("trade_ts")
+
+    def _log(self, *args, **kw):
+        self.events += 1
+
+    def _on_tick(self, strategy, tick):
+        steps, stamps, sent = tick
+        now = time.time()
+        for price, market in steps:
+            on_message(strategy, price, market, log=self._log)
+        self._record_hops(self._trader_hops(strategy), *stamps, now, time.time())
+        if self.recording:
+            self.handled += len(steps)
+            if sent is not None:
+                self.latencies.append(now - sent)
+
+
+def report(label: str, sent: int, fed: int, ctrl: LoadTestController, elapsed: float, err):
+    lat = np.array(ctrl.latencies) * 1000
+    print(f"{label}", file=err)
+    print(f"  sim sent      {sent / elapsed:10.0f} ticks/s", file=err)
+    print(f"  feed received {fed / elapsed:10.0f} ticks/s", file=err)
+    print(f"  dispatched    {ctrl.dispatched / elapsed:10.0f} ticks/s  ({ctrl.frames / elapsed:.0f} messages/s)", file=err)
+    print(f"  on_message    {ctrl.handled / elapsed:10.0f} calls/s  ({ctrl.events} trade events, {ctrl.dispatcher.dropped} dropped)", file=err)
+    if len(lat):
+        p50, p90, p99, p999 = np.percentile(lat, [50, 90, 99, 99.9])
+        print(f"  latency ms    p50 {p50:.2f}  p90 {p90:.2f}  p99 {p99:.2f}  p99.9 {p999:.2f}  max {lat.max():.2f}", file=err)
+    hops = HopLatency(())
+    for h in list(ctrl.symbol_latency.values()) + list(ctrl.trader_latency.values()):
+        hops.merge(h)
+    for hop, s in hops.summary().items():
+        print(f"  {hop:<13} p50 {s['p50']:.2f}  p99 {s['p99']:.2f}  max {s['max']:.2f}  ({s['count']})", file=err)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end throughput test: sim -> feed -> Redis -> controller -> on_message")
+    parser.add_argument("--symbols", "-s", type=str, default=None, help="Comma separated pairs to replay from the tick archive")
+    parser.add_argument("--count", "-n", type=int, default=5, help="Synthetic pairs when --symbols is not given")
+    parser.add_argument("--traders", "-t", type=int, default=1, help="Traders per pair")
+    parser.add_argument("--tps", type=float, default=100.0, help="Synthetic trades/sec per pair, 0 for as fast as possible")
+    parser.add_argument("--speed", type=float, default=1.0, help="Archive replay speed, 0 for as fast as possible")
+    parser.add_argument("--duration", "-d", type=float, default=10.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--url", type=str, default=None, help="Use an already running sim instead of starting one")
+    parser.add_argument("--port", "-p", type=int, default=8765)
+    parser.add_argument("--verbose", action="store_true", help="Keep the per-tick prints from the trading loop")
+    args = parser.parse_args()
+
+    symbols = [s.upper() for s in args.symbols.split(",")] if args.symbols else sim_symbols(args.count)
+    err = sys.stderr
+    if not args.verbose:
+        # the trading loop prints on every tick; at load-test rates that is the bottleneck
+        sys.stdout = open(os.devnull, "w")
+
+    sim = None
+    url = args.url
+    if url is None:
+        sim = KrakenSim(symbols, args.tps, args.speed, TickArchive(), port=args.port)
+        ready = threading.Event()
+        threading.Thread(target=lambda: asyncio.run(sim.serve(ready)), name="kraken-sim", daemon=True).start()
+        ready.wait(10)
+        url = sim.url
+
+    ctrl = LoadTestController()
+    ctrl._spawn_traders([(s, f"loadtest{k}", None) for s in symbols for k in range(args.traders)])
+
+    fed = [0]
+    def count(symbol, price):
+        fed[0] += 1
+    feed = KrakenPriceFeed(symbols, url=url)
+    feed.subscribe(count)
+    feed.start()
+
+    print(f"[INFO] {len(symbols)} pairs x {args.traders} traders via {url}, warming up {args.warmup}s", file=err)
+    time.sleep(args.warmup)
+    sent0 = sim.sent if sim else 0
+    fed0 = fed[0]
+    ctrl.dispatched = ctrl.frames = 0
+    ctrl.recording = True
+    t0 = time.time()
+    time.sleep(args.duration)
+    ctrl.recording = False
+    elapsed = time.time() - t0
+    report(f"[INFO] {elapsed:.1f}s measured", (sim.sent - sent0) if sim else 0, fed[0] - fed0, ctrl, elapsed, err)
+    ctrl.controller_stop.set()
+    ctrl._stop_all()
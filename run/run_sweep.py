@@ -0,0 +1,53 @@
+from backtest.sweep import grid, sample, sweep, rank
+from run.run_backtest import to_ms
+import argparse
+
+
+def parse_axes(specs: list[str]) -> dict:
+    """stop_loss=0.5,1,2 -> {"stop_loss": [0.5, 1.0, 2.0]}; lo:hi ranges stay as tuples"""
+    axes = {}
+    for spec in specs:
+        name, values = spec.split("=", 1)
+        name = name.replace("-", "_")
+        if ":" in values:
+            lo, hi = values.split(":", 1)
+            axes[name] = (float(lo), float(hi))
+        else:
+            axes[name] = [float(v) for v in values.split(",")]
+    return axes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep strategy parameters over recorded ticks")
+    parser.add_argument("--symbols", "-s", type=str, default="SOL/USD", help="Comma separated coins from the tick archive")
+    parser.add_argument("--csv", type=str, default=None, help="Sweep over a ts,price CSV instead of the archive")
+    parser.add_argument("--range", "-r", action="append", default=None, help="UTC date range start:end, repeatable (default: all data)")
+    parser.add_argument("--param", "-p", action="append", default=[], help="buy_offset|take_profit|stop_loss=v1,v2,... for a grid; with --random, =lo:hi draws from a range and a list picks from it")
+    parser.add_argument("--random", type=int, default=0, help="Sample N random parameter sets from the lo:hi ranges instead of a grid")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", "-w", type=int, default=None, help="Worker processes (default: every core)")
+    parser.add_argument("--out", "-o", type=str, default="sweep_results.jsonl", help="Results file; an existing one is resumed")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    axes = parse_axes(args.param)
+    if args.random:
+        rule_sets = sample(args.random, args.seed, **axes)
+    else:
+        try:
+            rule_sets = grid(**axes)
+        except ValueError as e:
+            parser.error(str(e))
+
+    datasets = []
+    for symbol in args.symbols.split(","):
+        for r in args.range or [":"]:
+            start, end = r.split(":", 1)
+            start, end = start or None, end or None
+            datasets.append((symbol, start, end, to_ms(start), to_ms(end), args.csv))
+
+    rows = sweep(datasets, rule_sets, args.out, args.workers)
+    print(f"\nTop {args.top} of {len(rows)}:")
+    for r in rank(rows)[:args.top]:
+        print(f"  {r['symbol']} {r['start'] or '-'}..{r['end'] or '-'} buy {r['buy_offset']} tp {r['take_profit']} sl {r['stop_loss']} | "
+              f"trades {r['trades']} PnL {r['total_pnl']:.2f} win {r['win_rate']*100:.1f}% mdd {r['max_drawdown']:.2f}")
@@ -1,138 +1,194 @@
+from storage.position_persister import PERSISTER
+from storage.position_wal import PositionWal
+from storage.position_state import PositionState, FIELDS
 import time
 import json
+import os
 
 class Position_manager:
+    journaled = True  # transitions go to the write-ahead log under wal/
+    fence = None      # set by a cluster controller: returns False once another instance may own this trader
+
     def __init__(self, symbol, owner):
         self.symbol = symbol.replace('/USD', '')
         self.filepath = f"trade_data/{owner}/{self.symbol}/position_info.json"
-        self.positions = {}
+        self.positions = PositionState()
+        self._filled = False  # a fill since the last save, written through instead of behind
+        self.wal = None
+        self.recovered = False  # the current state came from the write-ahead log
         # self.load_from_file()
 
+    def _fenced(self) -> bool:
+        if self.fence is None or self.fence():
+            return False
+        print(f"[ERROR] {self.filepath}: ownership lost, not writing")
+        return True
+
+    def _journal(self, op, *fields, sync=False):
+        if not self.journaled or self._fenced():
+            return
+        if self.wal is None:
+            self._open_wal(PositionWal(self._wal_dir()))
+            return  # the opening snapshot already holds this change
+        if self.wal.append(op, {k: getattr(self.positions, k) for k in fields}, sync):
+            self.wal.snapshot(self.positions.to_dict())
+
+    def recover(self) -> bool:
+        """Replace the state with the one in the write-ahead log, if there is one.
+        Either way the log is compacted to a snapshot of the resulting state.
+        Returns whether the current state came from the log, whichever call
+        opened it."""
+        if self.wal is not None:
+            return self.recovered
+        wal = PositionWal(self._wal_dir())
+        state = wal.recover()
+        if state is not None:
+            self.positions = PositionState.from_dict(state)
+        self._open_wal(wal)
+        self.recovered = state is not None
+        return self.recovered
+
+    def close(self):
+        """Sync and release the log; the next transition reopens it"""
+        if self.wal is not None:
+            self.wal.close()
+            self.wal = None
+
+    def _wal_dir(self):
+        return os.path.join(os.path.dirname(self.filepath), "wal")
+
+    def _open_wal(self, wal):
+        if wal.seq == 0:
+            wal.recover()  # continue the sequence of an existing log
+        self.wal = wal
+        wal.snapshot(self.positions.to_dict())
+
     def initialize_symbol(self):
-            self.positions = {
-                "position_open": False,
-                "entry_price": None,
-                "sell_price": None,
-                "last_sale_price": None,
-                "buy_limit_set": False,
-                "sell_limit_set": False,
-                "last_trade_time": 0,
-                "trailing_stop": None,
-                "brekeven_override": False,
-                "profit_loss_protection": False,
-                "buy_prediction_timestamp": None,
-                "buy_prediction_resets": 0,
-                "qty_held": None,
-                "balance": None,
-                "funds_config": None
-            }
+            self.positions = PositionState()
+            self.recovered = False
+            if self.wal is not None:
+                self._journal("initialize", *FIELDS)
 
     def open_position(self, entry_price, trailing_stop):
-        self.positions["position_open"] = True
-        self.positions["entry_price"] = entry_price
-        self.positions["buy_limit_set"] = False
-        self.positions["trailing_stop"] = trailing_stop
+        self.positions.position_open = True
+        self.positions.entry_price = entry_price
+        self.positions.buy_limit_set = False
+        self.positions.trailing_stop = trailing_stop
+        self._filled = True
+        self._journal("open_position", "position_open", "entry_price", "buy_limit_set", "trailing_stop", sync=True)
 
     def close_position(self, sell_price):
-        self.positions["position_open"] = False
-        self.positions["sell_price"] = None
-        self.positions["sell_limit_set"] = False
-        self.positions["last_sale_price"] = sell_price
-        self.positions["trailing_stop"] = None
+        self.positions.position_open = False
+        self.positions.sell_price = None
+        self.positions.sell_limit_set = False
+        self.positions.last_sale_price = sell_price
+        self.positions.trailing_stop = None
+        self._filled = True
+        self._journal("close_position", "position_open", "sell_price", "sell_limit_set", "last_sale_price", "trailing_stop", sync=True)
     
     def set_buy_limit(self, entry_price):
-        self.positions["entry_price"] = entry_price
-        self.positions["buy_limit_set"] = True
-        self.positions["buy_prediction_timestamp"] = time.time()
+        self.positions.entry_price = entry_price
+        self.positions.buy_limit_set = True
+        self.positions.buy_prediction_timestamp = time.time()
+        self._journal("set_buy_limit", "entry_price", "buy_limit_set", "buy_prediction_timestamp")
     
     def set_sell_limit(self, sell_price):
-        self.positions["sell_price"] = sell_price
-        self.positions["sell_limit_set"] = True
+        self.positions.sell_price = sell_price
+        self.positions.sell_limit_set = True
+        self._journal("set_sell_limit", "sell_price", "sell_limit_set")
+
+    def set_trailing_stop(self, stop):
+        self.positions.trailing_stop = stop
+        self._journal("trailing_stop", "trailing_stop")
     
     def reset_limits(self):
-        self.positions["buy_limit_set"] = False
-        self.positions["entry_price"] = None
-        self.positions["buy_prediction_timestamp"] = None
-        self.positions["buy_prediction_resets"] += 1
+        self.positions.buy_limit_set = False
+        self.positions.entry_price = None
+        self.positions.buy_prediction_timestamp = None
+        self.positions.buy_prediction_resets += 1
+        self._journal("reset_limits", "buy_limit_set", "entry_price", "buy_prediction_timestamp", "buy_prediction_resets")
     
     def get_position_state(self):
         return self.positions
     
     def calculate_buy_qty(self):
-        self.positions["qty_held"] = self.positions["balance"] / self.positions["entry_price"]
-        return self.positions["qty_held"]
+        self.positions.qty_held = self.positions.balance / self.positions.entry_price
+        self._journal("buy_qty", "qty_held", sync=True)
+        return self.positions.qty_held
     
     def calculate_sell_total(self, sell_price):
-        self.positions["balance"] = self.positions["qty_held"] * sell_price
-        return self.positions["balance"]
+        self.positions.balance = self.positions.qty_held * sell_price
+        self._journal("sell_total", "balance", sync=True)
+        return self.positions.balance
 
     def is_position_open(self):
-        return self.positions["position_open"]
+        return self.positions.position_open
 
     def has_buy_limit(self):
-        return self.positions["buy_limit_set"]
+        return self.positions.buy_limit_set
     
     def has_sell_limit(self):
-        return self.positions["sell_limit_set"]
+        return self.positions.sell_limit_set
     
     def update_trade_time(self, timestamp):
-        self.positions["last_trade_time"] = timestamp
+        self.positions.last_trade_time = timestamp
+        self._journal("trade_time", "last_trade_time")
     
     def prediction_age(self):
-        ts = self.positions.get("buy_prediction_timestamp")
+        ts = self.positions.buy_prediction_timestamp
         if ts:
             return time.time() - ts
         return None
     
     def save_to_file(self):
-        with open(self.filepath, 'w') as f:
-            json.dump(self.positions, f, indent=2)
+        # predictions and limit changes are written behind; fills are on disk before this returns
+        if self._fenced():
+            return
+        if self._filled:
+            self.flush()
+        else:
+            PERSISTER.mark(self.filepath, self.symbol, self.positions.to_dict())
+
+    def flush(self):
+        if self._fenced():
+            return
+        self._filled = False
+        PERSISTER.flush(self.filepath, self.symbol, self.positions.to_dict())
+        if self.wal is not None:
+            self.wal.sync()
     
     def smart_save(self):
         state = self.positions
 
-        if state["position_open"]:
+        if state.position_open:
             print(f"Saving active position for {self.symbol}")
             self.save_to_file()
         
-        elif state["buy_limit_set"] and not state["position_open"]:
+        elif state.buy_limit_set and not state.position_open:
             print(f"Saving buy limit for {self.symbol}")
             self.save_to_file()
         
-        elif not state["position_open"] and not state["buy_limit_set"]:
+        elif not state.position_open and not state.buy_limit_set:
             print(f"No prediction or position held for {self.symbol}. Resetting state...")
-            self.positions["entry_price"] = None
-            self.positions["sell_limit_set"] = False
-            self.positions["sell_price"] = None
-            self.positions["buy_limit_set"] = False
-            self.positions["buy_prediction_timestamp"] = None
+            self.positions.entry_price = None
+            self.positions.sell_limit_set = False
+            self.positions.sell_price = None
+            self.positions.buy_limit_set = False
+            self.positions.buy_prediction_timestamp = None
+            self._journal("clear_limits", "entry_price", "sell_limit_set", "sell_price", "buy_limit_set", "buy_prediction_timestamp")
             self.save_to_file()
 
     
     def load_from_file(self):
-        default_state = {
-            "position_open": False,
-            "entry_price": None,
-            "sell_price": None,
-            "last_sale_price": None,
-            "buy_limit_set": False,
-            "sell_limit_set": False,
-            "last_trade_time": 0,
-            "trailing_stop": None,
-            "brekeven_override": False,
-            "profit_loss_protection": False,
-            "buy_prediction_timestamp": None,
-            "buy_prediction_resets": 0,
-            "qty_held": None,
-            "balance": None,
-            "funds_config": None
-            }
-        try:
-            with open(self.filepath, 'r') as f:
-                self.positions = json.load(f)
-        except FileNotFoundError:
-            self.initialize_symbol()
-            print("No position file found, initializing...")
-        
-        for key, value in default_state.items():
-            self.positions.setdefault(key, value)
+        recovered = self.journaled and self.recover()
+        if recovered:
+            print(f"Recovered position for {self.symbol} from its write-ahead log")
+        else:
+            try:
+                with open(self.filepath, 'r') as f:
+                    self.positions = PositionState.from_dict(json.load(f))
+            except FileNotFoundError:
+                self.initialize_symbol()
+                print("No position file found, initializing...")
+        if self.wal is not None and not recovered:
+            self.wal.snapshot(self.positions.to_dict())  # the file's state becomes the log's base
@@ -0,0 +1,123 @@
+from utils.metrics import REGISTRY
+import itertools
+import threading
+import atexit
+import json
+import time
+import os
+
+FLUSH_DELAY = 0.5  # longest a marked position waits before it is written
+
+REGISTRY.describe("position_save_seconds", "histogram", "Time to write a position file", ("symbol",))
+REGISTRY.describe("position_flush_lag_seconds", "histogram", "Time from a position change to its write landing", ("symbol",))
+
+
+def write_atomic(path: str, state: dict):
+    """Write to a temp file and rename over `path`, so readers and crashes only
+    ever see the old file or the new one"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class PositionPersister:
+    """Write-behind for position files.
+
+    `mark` takes a state dict the caller will not touch again and returns; a writer thread coalesces every mark
+    for the same file into one write at most `delay` seconds after the first.
+    `flush` writes synchronously (fills, shutdown). Every snapshot carries a
+    sequence number so a slow background write never lands over a newer one."""
+
+    def __init__(self, delay: float = FLUSH_DELAY):
+        self.delay = delay
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._dirty: dict[str, tuple[int, dict, str, float]] = {}  # path -> (seq, state, symbol, first marked)
+        self._written: dict[str, int] = {}
+        self._seq = itertools.count(1)
+        self._thread = None
+        self._closed = False
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._closed = False
+            self._thread = threading.Thread(target=self._run, name="position-persister", daemon=True)
+            self._thread.start()
+
+    def mark(self, path: str, symbol: str, state: dict):
+        snap = (next(self._seq), state, symbol)
+        with self._cond:
+            prev = self._dirty.get(path)
+            self._dirty[path] = (*snap, prev[3] if prev else time.time())
+            if prev is None:
+                self._ensure_thread()
+                self._cond.notify()
+
+    def flush(self, path: str, symbol: str, state: dict):
+        seq = next(self._seq)
+        with self._cond:
+            prev = self._dirty.pop(path, None)
+        self._write(path, seq, state, symbol, prev[3] if prev else time.time())
+
+    def flush_all(self):
+        with self._cond:
+            batch, self._dirty = self._dirty, {}
+        for path, (seq, state, symbol, since) in batch.items():
+            self._write(path, seq, state, symbol, since)
+
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    def oldest(self) -> float:
+        """Seconds the longest-waiting unwritten change has been pending"""
+        with self._cond:
+            since = min((d[3] for d in self._dirty.values()), default=None)
+        return 0.0 if since is None else time.time() - since
+
+    def _write(self, path, seq, state, symbol, since):
+        with self._write_lock:
+            if self._written.get(path, 0) > seq:
+                return
+            t0 = time.perf_counter()
+            try:
+                write_atomic(path, state)
+            except OSError as e:
+                print(f"[ERROR] failed to save position {path}: {e}")
+                return
+            self._written[path] = seq
+        REGISTRY.observe("position_save_seconds", (symbol,), time.perf_counter() - t0)
+        REGISTRY.observe("position_flush_lag_seconds", (symbol,), time.time() - since)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._dirty and not self._closed:
+                    self._cond.wait()
+                if not self._dirty:
+                    return
+                due = min(d[3] for d in self._dirty.values()) + self.delay
+                wait = due - time.time()
+                if wait > 0 and not self._closed:
+                    self._cond.wait(wait)
+                    continue
+                batch, self._dirty = self._dirty, {}
+            for path, (seq, state, symbol, since) in batch.items():
+                self._write(path, seq, state, symbol, since)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.flush_all()
+
+
+PERSISTER = PositionPersister()
+atexit.register(PERSISTER.close)
+
+REGISTRY.gauge("position_pending", "Position files waiting for a write", PERSISTER.pending)
+REGISTRY.gauge("position_oldest_pending_seconds", "Age of the oldest unwritten position change", PERSISTER.oldest)
@@ -0,0 +1,91 @@
+from dataclasses import dataclass, fields
+import struct
+
+SCHEMA_VERSION = 1
+
+_BOOLS = ("position_open", "buy_limit_set", "sell_limit_set", "brekeven_override", "profit_loss_protection")
+_FLOATS = ("entry_price", "sell_price", "last_sale_price", "last_trade_time", "trailing_stop",
+           "buy_prediction_timestamp", "qty_held", "balance", "funds_config")
+_PACKED = struct.Struct("<BBHq9d")  # version, bool bits, None bits, buy_prediction_resets, floats
+
+
+def _from_v0(d: dict) -> dict:
+    # position_info.json before versioning: same fields, any of them possibly missing
+    return d
+
+
+_MIGRATIONS = {0: _from_v0}
+
+
+@dataclass(slots=True)
+class PositionState:
+    """One trader's position. Attribute access on the hot path; `state["key"]`
+    still works for code written against the old positions dict."""
+    position_open: bool = False
+    entry_price: float | None = None
+    sell_price: float | None = None
+    last_sale_price: float | None = None
+    buy_limit_set: bool = False
+    sell_limit_set: bool = False
+    last_trade_time: float = 0
+    trailing_stop: float | None = None
+    brekeven_override: bool = False
+    profit_loss_protection: bool = False
+    buy_prediction_timestamp: float | None = None
+    buy_prediction_resets: int = 0
+    qty_held: float | None = None
+    balance: float | None = None
+    funds_config: float | None = None
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key not in FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in FIELDS else default
+
+    def keys(self):
+        return FIELDS
+
+    def to_dict(self) -> dict:
+        d = {name: getattr(self, name) for name in FIELDS}
+        d["schema"] = SCHEMA_VERSION
+        return d
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "PositionState":
+        """Accepts any schema version, including unversioned files; missing fields take their defaults"""
+        version = d.get("schema", 0)
+        while version < SCHEMA_VERSION:
+            d = _MIGRATIONS[version](d)
+            version += 1
+        return cls(**{name: d[name] for name in FIELDS if name in d})
+
+    def to_bytes(self) -> bytes:
+        bools = sum(1 << i for i, name in enumerate(_BOOLS) if getattr(self, name))
+        values = [getattr(self, name) for name in _FLOATS]
+        nones = sum(1 << i for i, v in enumerate(values) if v is None)
+        return _PACKED.pack(SCHEMA_VERSION, bools, nones, self.buy_prediction_resets,
+                            *(0.0 if v is None else v for v in values))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "PositionState":
+        version, bools, nones, resets, *values = _PACKED.unpack(data)
+        if version != SCHEMA_VERSION:
+            raise ValueError(f"unsupported position record version {version}")
+        state = cls(buy_prediction_resets=resets)
+        for i, name in enumerate(_BOOLS):
+            setattr(state, name, bool(bools >> i & 1))
+        for i, name in enumerate(_FLOATS):
+            setattr(state, name, None if nones >> i & 1 else values[i])
+        return state
+
+
+FIELDS = tuple(f.name for f in fields(PositionState))
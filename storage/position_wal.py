@@ -0,0 +1,96 @@
+from storage.position_persister import write_atomic
+import json
+import time
+import os
+
+SNAPSHOT_EVERY = 256  # log entries between snapshots, which bounds replay on recovery
+FSYNC_INTERVAL = 1.0
+SNAPSHOT_FILE = "snapshot.json"
+
+
+def _log_name(seq: int) -> str:
+    return f"{seq:012d}.log"
+
+
+class PositionWal:
+    """Write-ahead log of position transitions for one trader.
+
+    Each entry is the fields a transition set, so replay is exact and does not
+    re-run any logic. `snapshot` writes the full state atomically and starts a
+    new log after it, deleting the old ones; recovery is the last snapshot plus
+    at most `snapshot_every` entries."""
+
+    def __init__(self, path: str, snapshot_every: int = SNAPSHOT_EVERY, fsync_interval: float = FSYNC_INTERVAL):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.fsync_interval = fsync_interval
+        self.seq = 0
+        self._since_snapshot = 0
+        self._fh = None
+        self._log = None
+        self._last_sync = time.time()
+        os.makedirs(path, exist_ok=True)
+
+    def _logs(self) -> list[str]:
+        return sorted(n for n in os.listdir(self.path) if n.endswith(".log"))
+
+    def recover(self) -> dict | None:
+        """State after the last logged transition, or None when nothing was ever logged"""
+        snap = None
+        try:
+            with open(os.path.join(self.path, SNAPSHOT_FILE), "r") as f:
+                snap = json.load(f)
+        except FileNotFoundError:
+            pass
+        logs = self._logs()
+        if snap is None and not logs:
+            return None
+        state = dict(snap["positions"]) if snap else {}
+        seq = snap["seq"] if snap else 0
+        for name in logs:
+            with open(os.path.join(self.path, name), "rb") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # torn tail from a crash mid-append
+                    if entry["seq"] <= seq:
+                        continue
+                    state.update(entry["set"])
+                    seq = entry["seq"]
+        self.seq = seq
+        return state
+
+    def append(self, op: str, fields: dict, sync: bool = False) -> bool:
+        """Log a transition; returns True when a snapshot is due"""
+        self.seq += 1
+        line = json.dumps({"seq": self.seq, "ts": time.time(), "op": op, "set": fields}, separators=(",", ":")) + "\n"
+        self._fh.write(line)
+        self._fh.flush()
+        if sync or time.time() - self._last_sync >= self.fsync_interval:
+            self.sync()
+        self._since_snapshot += 1
+        return self._since_snapshot >= self.snapshot_every
+
+    def snapshot(self, state: dict):
+        write_atomic(os.path.join(self.path, SNAPSHOT_FILE), {"seq": self.seq, "ts": time.time(), "positions": state})
+        if self._fh:
+            self._fh.close()
+        self._log = _log_name(self.seq)
+        self._fh = open(os.path.join(self.path, self._log), "w")  # anything already here is at or before the snapshot
+        for name in self._logs():
+            if name != self._log:
+                os.remove(os.path.join(self.path, name))
+        self._since_snapshot = 0
+
+    def sync(self):
+        if self._fh:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+        self._last_sync = time.time()
+
+    def close(self):
+        if self._fh:
+            self.sync()
+            self._fh.close()
+            self._fh = None
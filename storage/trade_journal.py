@@ -0,0 +1,257 @@
+import os
+import re
+import sys
+import json
+import time
+import atexit
+import threading
+
+SEGMENT_MAX_BYTES = 8 * 1024 * 1024
+SEGMENT_MAX_AGE = 7 * 86400
+FSYNC_EVERY = 32
+FSYNC_INTERVAL = 1.0
+
+_OWNER = re.compile(r"[A-Za-z0-9_+-][A-Za-z0-9._@+-]{0,127}")
+_SYMBOL = re.compile(r"[A-Za-z0-9]{1,16}/[A-Za-z0-9]{1,16}")
+
+
+def valid_tid(owner, symbol) -> bool:
+    """Whether owner and symbol look like the parts of a trader id ("SOL/USD", an email)"""
+    return (isinstance(owner, str) and isinstance(symbol, str) and ".." not in owner
+            and _OWNER.fullmatch(owner) is not None and _SYMBOL.fullmatch(symbol) is not None)
+
+
+def _component(part) -> str:
+    """A path segment that cannot leave its parent: separators and NULs become "_",
+    and empty or all-dot names get a "_" prefix"""
+    part = str(part).replace("\0", "_").replace("/", "_").replace("\\", "_")
+    return part if part.strip(".") else f"_{part}"
+
+
+def journal_dir(owner, symbol) -> str:
+    # never raises: this runs from log_trade right after a fill, and trade_data/ may hold
+    # owners valid_tid would refuse (spaces, non-ASCII). Requests are checked with valid_tid
+    # at the API; here anything that could escape trade_data/ is only neutralised
+    clean_symbol = str(symbol).replace('/USD', '')
+    return "/".join(["trade_data", _component(owner), *map(_component, clean_symbol.split("/")), "journal"])
+
+
+def _segment_name(seg_id: int, started: int) -> str:
+    return f"{seg_id:06d}-{started}.jsonl"
+
+
+def list_segments(path: str) -> list[tuple[int, int, str]]:
+    """(segment id, start time, file path) for every segment, oldest first"""
+    try:
+        names = os.listdir(path)
+    except FileNotFoundError:
+        return []
+    segs = []
+    for name in names:
+        if not name.endswith(".jsonl"):
+            continue
+        seg_id, _, started = name[:-6].partition("-")
+        try:
+            segs.append((int(seg_id), int(started), os.path.join(path, name)))
+        except ValueError:
+            continue
+    segs.sort()
+    return segs
+
+
+class TradeJournal:
+    """Append-only, line-delimited trade log split into rotating segments.
+
+    Each append is a single write to the tail segment, so the cost does not
+    depend on how much history is already on disk. Lines are handed to the OS
+    on every append and fsync'd in batches (every `fsync_every` entries or
+    `fsync_interval` seconds, whichever comes first)."""
+
+    def __init__(self, path, max_bytes=SEGMENT_MAX_BYTES, max_age=SEGMENT_MAX_AGE,
+                 fsync_every=FSYNC_EVERY, fsync_interval=FSYNC_INTERVAL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._fh = None
+        self._seg_id = 0
+        self._seg_start = 0
+        self._size = 0
+        self._pending = 0
+        self._last_sync = time.time()
+        os.makedirs(path, exist_ok=True)
+        self._open_tail()
+
+    def _open_tail(self):
+        segs = list_segments(self.path)
+        if segs:
+            self._seg_id, self._seg_start, seg_path = segs[-1]
+            self._fh = open(seg_path, "ab")
+            self._size = self._fh.tell()
+        else:
+            self._new_segment(1)
+
+    def _new_segment(self, seg_id):
+        self._seg_id = seg_id
+        self._seg_start = int(time.time())
+        self._fh = open(os.path.join(self.path, _segment_name(seg_id, self._seg_start)), "ab")
+        self._size = 0
+
+    def _rotate(self):
+        self._sync()
+        self._fh.close()
+        self._new_segment(self._seg_id + 1)
+
+    def _sync(self):
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self._pending = 0
+        self._last_sync = time.time()
+
+    def append(self, entry: dict):
+        line = (json.dumps(entry, separators=(",", ":")) + "\n").encode()
+        with self._lock:
+            now = time.time()
+            if self._size and (self._size + len(line) > self.max_bytes or now - self._seg_start >= self.max_age):
+                self._rotate()
+            self._fh.write(line)
+            self._fh.flush()
+            self._size += len(line)
+            self._pending += 1
+            if self._pending >= self.fsync_every or now - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def flush(self):
+        with self._lock:
+            if self._fh and self._pending:
+                self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._fh:
+                self._sync()
+                self._fh.close()
+                self._fh = None
+
+
+def iter_entries(path: str, since: float | None = None):
+    """Stream entries oldest first; `since` skips whole segments by their start time"""
+    segs = list_segments(path)
+    for i, (_, started, seg_path) in enumerate(segs):
+        if since is not None and i + 1 < len(segs) and segs[i + 1][1] < since:
+            continue
+        with open(seg_path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn tail line from a crash mid-write
+                if since is not None and (entry.get("raw_timestamp") or 0) < since:
+                    continue
+                yield entry
+
+
+def read_from(path: str, cursor: str | None = None, limit: int = 500) -> tuple[list[dict], str | None]:
+    """Read up to `limit` entries after `cursor` ("segment:offset"); returns (entries, next cursor).
+    Raises ValueError for a malformed cursor or a negative limit."""
+    if limit < 0:
+        raise ValueError(f"limit must not be negative: {limit}")
+    seg_id, offset = 0, 0
+    if cursor:
+        try:
+            seg_id, offset = (int(x) for x in cursor.split(":", 1))
+        except ValueError:
+            raise ValueError(f"bad cursor {cursor!r}") from None
+        if seg_id < 0 or offset < 0:
+            raise ValueError(f"bad cursor {cursor!r}")
+    entries = []
+    next_cursor = cursor
+    for sid, _, seg_path in list_segments(path):
+        if sid < seg_id:
+            continue
+        start = offset if sid == seg_id else 0
+        with open(seg_path, "rb") as f:
+            f.seek(start)
+            pos = start
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partial line still being written
+                pos += len(line)
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    pass
+                next_cursor = f"{sid}:{pos}"
+                if len(entries) >= limit:
+                    return entries, next_cursor
+    return entries, next_cursor
+
+
+_journals: dict[str, TradeJournal] = {}
+_journals_lock = threading.Lock()
+
+
+def get_journal(owner, symbol) -> TradeJournal:
+    path = journal_dir(owner, symbol)
+    with _journals_lock:
+        journal = _journals.get(path)
+        if journal is None:
+            journal = TradeJournal(path)
+            _journals[path] = journal
+        return journal
+
+
+def close_all():
+    with _journals_lock:
+        journals = list(_journals.values())
+        _journals.clear()
+    for journal in journals:
+        journal.close()
+
+
+atexit.register(close_all)
+
+
+def migrate_json(json_file: str) -> int:
+    """Move a legacy trade_calls.json array into the journal next to it. When the
+    journal already has segments (the new logger ran first), the legacy history
+    is written ahead of them and the existing segments are renumbered after it."""
+    path = os.path.join(os.path.dirname(json_file), "journal")
+    with open(json_file, 'r') as f:
+        trade_calls = json.load(f)
+    trade_calls.sort(key=lambda e: e.get("raw_timestamp") or 0)
+    existing = list_segments(path)
+    target = path + ".legacy" if existing else path
+    journal = TradeJournal(target, fsync_every=len(trade_calls) + 1, fsync_interval=float("inf"))
+    for entry in trade_calls:
+        journal.append(entry)
+    journal.close()
+    if existing:
+        legacy = list_segments(target)
+        shift = len(legacy)
+        for seg_id, started, seg_path in reversed(existing):
+            os.replace(seg_path, os.path.join(path, _segment_name(seg_id + shift, started)))
+        for seg_id, started, seg_path in legacy:
+            os.replace(seg_path, os.path.join(path, _segment_name(seg_id, started)))
+        os.rmdir(target)
+        print(f"[JOURNAL] {path} already had {len(existing)} segments, legacy history placed ahead of them")
+    os.replace(json_file, json_file + ".migrated")
+    print(f"[JOURNAL] migrated {len(trade_calls)} entries from {json_file}")
+    return len(trade_calls)
+
+
+def migrate_all(root: str = "trade_data") -> int:
+    total = 0
+    for dirpath, _, files in os.walk(root):
+        if "trade_calls.json" in files:
+            total += migrate_json(os.path.join(dirpath, "trade_calls.json"))
+    return total
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print("usage: python -m storage.trade_journal migrate [trade_data]")
+        sys.exit(2)
+    migrate_all(sys.argv[2] if len(sys.argv) > 2 else "trade_data")
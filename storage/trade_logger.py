@@ -1,23 +1,13 @@
 import time
-import json
-import os
 from datetime import datetime as dt
-import sys
+from storage.trade_journal import get_journal
 
-def log_trade(symbol, price, event, owner, amount=None, note=None):
+def make_entry(symbol, price, event, amount=None, note=None, rawtimestamp=None):
     clean_symbol = symbol.replace('/USD', '')
-    os.makedirs(f"trade_data/{owner}/{clean_symbol}", exist_ok=True)
-    log_file  = f"trade_data/{owner}/{clean_symbol}/trade_calls.json"
-    timestamp = dt.now().isoformat()
-    rawtimestamp = time.time()
-    try:    
-        with open(log_file, 'r') as f:
-            trade_calls = json.load(f)
-    except FileNotFoundError:
-        trade_calls = []
-    
+    if rawtimestamp is None:
+        rawtimestamp = time.time()
     entry = {
-        "timestamp": timestamp,
+        "timestamp": dt.fromtimestamp(rawtimestamp).isoformat(),
         "raw_timestamp": rawtimestamp,
         "symbol": clean_symbol,
         "price": price,
@@ -30,8 +20,7 @@ def log_trade(symbol, price, event, owner, amount=None, note=None):
             entry["balance"] = amount
     if note is not None:
         entry["note"] = note
-    trade_calls.append(entry)
-    
-    with open(log_file, 'w') as f:
-        json.dump(trade_calls, f, indent=2)
+    return entry
 
+def log_trade(symbol, price, event, owner, amount=None, note=None):
+    get_journal(owner, symbol).append(make_entry(symbol, price, event, amount, note))
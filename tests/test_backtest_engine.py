@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from backtest.engine import run_reference, run_vectorized
+from backtest.sim import BacktestRules, PREDICTION_TTL
+
+
+def random_series(rng, n):
+    # mostly tick-sized gaps with the odd day-long one, so prediction resets happen too
+    gaps = np.where(rng.random(n) < 0.02, rng.uniform(PREDICTION_TTL / 2, PREDICTION_TTL * 2, n), rng.uniform(1, 600, n))
+    ts = 1.7e9 + np.cumsum(gaps)
+    price = 100 * np.exp(np.cumsum(rng.normal(0, 0.006, n)))
+    return ts, np.round(price, 2)
+
+
+@pytest.mark.parametrize("funds", [None, 1000.0])
+def test_vectorized_matches_reference_on_random_series(funds):
+    rng = np.random.default_rng(13)
+    for _ in range(250):
+        ts, price = random_series(rng, int(rng.integers(2, 400)))
+        rules = BacktestRules(*np.round(rng.uniform(0.2, 3.0, 3), 2))
+        assert run_vectorized("BTC/USD", ts, price, rules, funds) == run_reference("BTC/USD", ts, price, rules, funds)
+
+
+def test_buy_then_trailing_stop_sale():
+    ts = np.arange(6, dtype=float) + 1.7e9
+    price = np.array([100.0, 99.0, 98.9, 101.0, 103.0, 101.0])
+    out = run_vectorized("BTC/USD", ts, price)
+    assert [e["event"] for e in out] == ["buy_prediction", "buy_executed", "sell_prediction", "trailing stop sale"]
+    assert out[3]["price"] == pytest.approx(103.0 * 0.99)
+    assert out == run_reference("BTC/USD", ts, price)
+
+
+def test_stale_prediction_resets():
+    ts = np.array([0.0, 1.0, 2.0, PREDICTION_TTL + 2.0, PREDICTION_TTL + 3.0]) + 1.7e9
+    price = np.full(5, 100.0)
+    out = run_vectorized("BTC/USD", ts, price)
+    assert [e["event"] for e in out][:2] == ["buy_prediction", "prediction reset"]
+    assert out == run_reference("BTC/USD", ts, price)
+
+
+def test_empty_and_single_tick():
+    for n in (0, 1):
+        ts, price = np.arange(n, dtype=float), np.full(n, 100.0)
+        assert run_vectorized("BTC/USD", ts, price) == run_reference("BTC/USD", ts, price) == []
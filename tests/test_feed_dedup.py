@@ -0,0 +1,32 @@
+from data.kraken_feed import KrakenPriceFeed
+
+
+def row(ts, price="10.0", volume="1.0", side="b"):
+    return [price, volume, f"{ts:.6f}", side, "m", ""]
+
+
+def make_feed():
+    feed = KrakenPriceFeed(["SOL/USD"], redundant=True)
+    primary, backup = feed.connections[0]
+    return feed, primary, backup
+
+
+def test_identical_rows_in_one_frame_are_all_delivered_once():
+    feed, a, b = make_feed()
+    frame = [row(1.0), row(1.0)]
+    assert feed._dedup(a, "SOL/USD", frame) == frame
+    assert feed._dedup(b, "SOL/USD", frame) == []
+
+
+def test_other_connection_adds_only_the_extra_copies():
+    feed, a, b = make_feed()
+    assert len(feed._dedup(a, "SOL/USD", [row(1.0)])) == 1
+    assert len(feed._dedup(b, "SOL/USD", [row(1.0), row(1.0), row(1.0)])) == 2
+    assert feed._dedup(a, "SOL/USD", [row(1.0), row(1.0)]) == []
+
+
+def test_older_trades_are_repeats_and_newer_time_resets():
+    feed, a, b = make_feed()
+    feed._dedup(a, "SOL/USD", [row(1.0), row(2.0, price="11.0")])
+    assert feed._dedup(b, "SOL/USD", [row(1.0), row(2.0, price="11.0"), row(2.0, price="12.0")]) == [row(2.0, price="12.0")]
+    assert feed._dedup(a, "SOL/USD", [row(3.0), row(3.0)]) == [row(3.0), row(3.0)]
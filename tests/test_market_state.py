@@ -0,0 +1,60 @@
+import threading
+from types import SimpleNamespace
+
+from backtest.sim import BacktestRules, SimStrategy
+from controllers import controller as controller_mod
+from controllers.controller import Controller
+from controllers.market_state import SymbolMarketState
+from controllers.trade_controller import on_message
+
+
+class FakeUtility:
+    seeds = {}
+
+    def get_24h_high_low_many(self, symbols):
+        return {s: self.seeds[s] for s in symbols if s in self.seeds}
+
+
+def make_ctrl(monkeypatch):
+    monkeypatch.setattr(controller_mod, "Utility", FakeUtility)
+    FakeUtility.seeds = {}
+    return SimpleNamespace(_cache_lock=threading.Lock(), _markets={}, symbol_latency={})
+
+
+def feed(ctrl, strat, price):
+    steps, _ = Controller._prepare_tick(ctrl, strat.symbol, {"symbol": strat.symbol, "price": price})
+    for p, snap in steps:
+        on_message(strat, p, snap, log=lambda *a, **k: None)
+
+
+def test_seed_keeps_ticks_and_trend():
+    market = SymbolMarketState("SOL/USD")
+    market.update(100.0)
+    market.update(104.0)
+    market.seed(120.0, 90.0)
+    assert market.seeded
+    assert (market.high_24h, market.low_24h) == (120.0, 90.0)
+    assert market.last_price is not None
+
+
+def test_open_position_survives_a_late_seed(monkeypatch):
+    ctrl = make_ctrl(monkeypatch)
+    market = Controller.seed_markets(ctrl, ["SOL/USD"])["SOL/USD"]
+    assert not market.seeded  # the REST seed failed
+
+    strat = SimStrategy("SOL/USD", BacktestRules())
+    feed(ctrl, strat, 100.0)
+    feed(ctrl, strat, 101.0)
+    strat.entry_price = 100.0
+    strat.trailing_stop = 99.0
+    strat.pm.open_position(100.0, 99.0)
+
+    market.seed_tried = 0  # retry due
+    FakeUtility.seeds = {"SOL/USD": (120.0, 90.0)}
+    assert Controller.seed_markets(ctrl, ["SOL/USD"])["SOL/USD"] is market
+    assert market.seeded and market.high_24h == 120.0
+
+    feed(ctrl, strat, 102.0)
+    assert strat.pm.is_position_open()
+    assert strat.trailing_stop is not None and strat.trailing_stop >= 99.0
+    assert strat.high_24h == 120.0
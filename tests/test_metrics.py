@@ -0,0 +1,45 @@
+import threading
+
+from utils.metrics import Metrics, render_prometheus
+
+
+def run_threads(fn, n=4):
+    threads = [threading.Thread(target=fn) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def test_counter_sums_threads_and_keeps_exited_ones():
+    m = Metrics()
+
+    def work():
+        for _ in range(1000):
+            m.inc("ticks_total")
+        m.inc("ticks_total", (), 500)
+
+    run_threads(work)
+    c = m.counter("ticks_total")
+    assert c.value == 4 * 1500
+    assert not c._cells  # exited threads were folded in
+    c.add(3)
+    assert c.value == 6003
+
+
+def test_histogram_shards_of_exited_threads_are_merged_and_dropped():
+    m = Metrics()
+    run_threads(lambda: m.observe("decide_seconds", (), 0.002))
+    assert m.histograms()[("decide_seconds", ())].count == 4
+    assert not m._shards
+    m.observe("decide_seconds", (), 0.002)
+    assert m.histograms()[("decide_seconds", ())].count == 5
+
+
+def test_prometheus_escapes_label_values_and_help():
+    m = Metrics()
+    m.describe("trades_total", "counter", "line one\nline two", ("symbol",))
+    m.inc("trades_total", ('a"b\\c\nd',))
+    text = render_prometheus({"ctrl": m.snapshot()})
+    assert '# HELP trades_total line one\\nline two' in text
+    assert 'trades_total{instance="ctrl",symbol="a\\"b\\\\c\\nd"} 1' in text
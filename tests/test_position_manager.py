@@ -0,0 +1,80 @@
+import os
+
+from storage.position_manager import Position_manager
+
+
+def fresh(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return Position_manager("BTC/USD", "alice")
+
+
+def test_recover_replays_transitions(tmp_path, monkeypatch):
+    pm = fresh(tmp_path, monkeypatch)
+    pm.recover()
+    pm.set_buy_limit(100.0)
+    pm.open_position(100.0, 99.0)
+    pm.set_trailing_stop(101.5)
+    pm.close()
+
+    pm = Position_manager("BTC/USD", "alice")
+    assert pm.recover()
+    assert pm.positions.position_open
+    assert pm.positions.entry_price == 100.0
+    assert pm.positions.trailing_stop == 101.5
+    assert pm.recover()  # a second caller still learns the state came from the log
+    pm.close()
+
+
+def test_recover_without_log(tmp_path, monkeypatch):
+    pm = fresh(tmp_path, monkeypatch)
+    assert not pm.recover()
+    assert not pm.recover()
+    pm.close()
+
+
+def test_torn_tail_is_ignored(tmp_path, monkeypatch):
+    pm = fresh(tmp_path, monkeypatch)
+    pm.recover()
+    pm.set_buy_limit(100.0)
+    pm.set_sell_limit(102.0)
+    log = os.path.join(pm.wal.path, pm.wal._log)
+    pm.close()
+    with open(log, "a") as f:
+        f.write('{"seq": 99, "set": {"sell_pri')
+
+    pm = Position_manager("BTC/USD", "alice")
+    assert pm.recover()
+    assert pm.positions.sell_price == 102.0
+    assert pm.wal.seq == 2
+    pm.close()
+
+
+def test_close_releases_the_log_and_reopens_on_write(tmp_path, monkeypatch):
+    pm = fresh(tmp_path, monkeypatch)
+    pm.recover()
+    pm.set_buy_limit(100.0)
+    pm.close()
+    assert pm.wal is None
+    pm.close()  # idempotent
+
+    pm.reset_limits()
+    assert pm.wal is not None
+    pm.close()
+    pm = Position_manager("BTC/USD", "alice")
+    assert pm.recover()
+    assert pm.positions.entry_price is None
+    assert pm.positions.buy_prediction_resets == 1
+    pm.close()
+
+
+def test_initialize_clears_recovered(tmp_path, monkeypatch):
+    pm = fresh(tmp_path, monkeypatch)
+    pm.recover()
+    pm.set_buy_limit(100.0)
+    pm.close()
+
+    pm = Position_manager("BTC/USD", "alice")
+    assert pm.recover()
+    pm.initialize_symbol()
+    assert not pm.recover()
+    pm.close()
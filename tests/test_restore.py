@@ -0,0 +1,66 @@
+import json
+from types import SimpleNamespace
+
+from controllers.controller import Controller
+
+
+class RestoreCtrl(Controller):
+    """Controller whose traders only wait for their stop flag"""
+
+    def __init__(self, broken=(), during_load=None):
+        super().__init__()
+        self.broken = set(broken)
+        self.during_load = during_load
+
+    def get_or_create_strat(self, symbol, owner, fund_amnt=None):
+        if symbol in self.broken:
+            raise RuntimeError("load failed")
+        hook, self.during_load = self.during_load, None
+        if hook:
+            hook()
+        with self._cache_lock:
+            return self._strats.setdefault(f"{symbol}|{owner}", SimpleNamespace(pm=SimpleNamespace(close=lambda: None)))
+
+    def seed_markets(self, symbols):
+        return {}
+
+    def run_strategy(self, symbol, owner, stop_evt, fund_amnt):
+        stop_evt.wait()
+
+    def _restore_progress(self, **kw):
+        self.restore_state.update(kw)
+
+
+def saved(tmp_path, ctrl):
+    ctrl.shutdown()
+    return json.loads((tmp_path / "data" / "active_traders.json").read_text())
+
+
+def test_trader_started_by_hand_during_restore_stays_stopped(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    ctrl = RestoreCtrl()
+    ctrl.during_load = lambda: ctrl.start_trader("alice", "SOL/USD", None, None)
+
+    ctrl._restore(["SOL/USD|alice", "ETH/USD|alice"])
+    assert sorted(ctrl._active_tids()) == ["ETH/USD|alice", "SOL/USD|alice"]
+    assert not ctrl._restore_pending
+
+    assert ctrl.stop_trader("alice", "SOL/USD")
+    assert saved(tmp_path, ctrl) == ["ETH/USD|alice"]
+    ctrl._stop_all()
+
+
+def test_failed_load_is_kept_until_stopped(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    ctrl = RestoreCtrl(broken={"BAD/USD"})
+
+    ctrl._restore(["SOL/USD|alice", "BAD/USD|bob"])
+    assert not ctrl._restore_pending
+    assert saved(tmp_path, ctrl) == ["SOL/USD|alice", "BAD/USD|bob"]
+
+    assert ctrl.stop_trader("bob", "BAD/USD")
+    assert not ctrl.stop_trader("bob", "BAD/USD")
+    assert saved(tmp_path, ctrl) == ["SOL/USD|alice"]
+    ctrl._stop_all()
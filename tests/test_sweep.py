@@ -0,0 +1,44 @@
+import json
+
+from backtest.sim import BacktestRules
+from backtest.sweep import job_key, load_results, sweep
+
+
+def write_ticks(path, drift):
+    with open(path, "w") as f:
+        f.write("ts,price\n")
+        for i in range(400):
+            f.write(f"{1700000000000 + i * 1000},{100 + drift * i + (i % 7) * 0.3}\n")
+
+
+def test_resume_reruns_jobs_whose_ticks_changed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    csv, out = str(tmp_path / "ticks.csv"), str(tmp_path / "results.jsonl")
+    datasets = [("SOL/USD", None, None, None, None, csv)]
+    rules = [BacktestRules(stop_loss=s) for s in (0.5, 1.0)]
+
+    write_ticks(csv, 0.05)
+    first = sweep(datasets, rules, out, workers=1)
+    assert len(first) == 2
+    assert sweep(datasets, rules, out, workers=1) == first  # nothing to run
+
+    write_ticks(csv, -0.05)
+    second = sweep(datasets, rules, out, workers=1)
+    assert len(second) == 2
+    assert {r["key"] for r in second}.isdisjoint(r["key"] for r in first)
+    assert load_results(out) == second
+
+
+def test_other_datasets_and_old_rows(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    csv, out = str(tmp_path / "ticks.csv"), str(tmp_path / "results.jsonl")
+    write_ticks(csv, 0.05)
+    rules = BacktestRules()
+    other = {"key": job_key("ETH/USD", None, None, rules, "eth.csv", "abc"), "trades": 0}
+    old = {"key": json.dumps(["SOL/USD", None, None, json.loads(job_key("SOL/USD", None, None, rules))[3], csv]), "trades": 0}
+    with open(out, "w") as f:
+        f.write(json.dumps(other) + "\n" + json.dumps(old) + "\n")
+
+    rows = sweep([("SOL/USD", None, None, None, None, csv)], [rules], out, workers=1)
+    assert rows[0] == other  # not swept this time, kept as is
+    assert len(rows) == 2 and rows[1]["key"] != old["key"]  # written before keys carried the source
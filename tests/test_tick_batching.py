@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+import pytest
+
+from controllers.controller import Controller
+from controllers.market_state import SymbolMarketState
+from data.kraken_feed import batch_tick
+
+
+def rows(*trades):
+    return [[f"{p}", f"{v}", f"{1700000000 + i}.5", s, "m", ""] for i, (p, v, s) in enumerate(trades)]
+
+
+def test_batch_tick_frame_summary():
+    msg = batch_tick("SOL/USD", rows((10.0, 1.0, "b"), (12.0, 3.0, "s"), (11.0, 0.0, "b")))
+    assert msg["prices"] == [10.0, 12.0, 11.0]
+    assert msg["price"] == 11.0
+    assert msg["high"] == 12.0
+    assert msg["low"] == 10.0
+    assert msg["vwap"] == pytest.approx((10.0 * 1 + 12.0 * 3) / 4)
+    assert msg["volume"] == 4.0
+    assert msg["count"] == 3
+    assert msg["side"] == "b"
+    assert (msg["first_ts"], msg["trade_ts"]) == (1700000000.5, 1700000002.5)
+
+
+def test_batch_tick_single_trade_and_zero_volume():
+    msg = batch_tick("SOL/USD", rows((10.0, 0.0, "s")))
+    assert "prices" not in msg and "first_ts" not in msg
+    assert msg["vwap"] == 10.0
+    assert msg["high"] == msg["low"] == msg["price"] == 10.0
+
+
+def test_prepare_tick_one_step_per_trade_with_snapshot_before_it():
+    market = SymbolMarketState("SOL/USD", 11.0, 9.0)
+    ctrl = SimpleNamespace(symbol_latency={}, _markets={"SOL/USD": market})
+    msg = batch_tick("SOL/USD", rows((10.0, 1.0, "b"), (13.0, 1.0, "b"), (8.0, 1.0, "s")))
+
+    steps, _ = Controller._prepare_tick(ctrl, "SOL/USD", msg)
+
+    assert [p for p, _ in steps] == [10.0, 13.0, 8.0]
+    snaps = [s for _, s in steps]
+    assert snaps[0].last_price is None
+    assert (snaps[0].high_24h, snaps[0].low_24h) == (11.0, 9.0)
+    assert (snaps[1].high_24h, snaps[1].low_24h) == (11.0, 9.0)  # before 13.0 was applied
+    assert (snaps[2].high_24h, snaps[2].low_24h) == (13.0, 9.0)  # before 8.0 was applied
+    assert (market.high_24h, market.low_24h) == (13.0, 8.0)
+
+
+def test_prepare_tick_without_market_state():
+    ctrl = SimpleNamespace(symbol_latency={}, _markets={})
+    steps, _ = Controller._prepare_tick(ctrl, "SOL/USD", {"symbol": "SOL/USD", "price": 5.0})
+    assert steps == [(5.0, None)]
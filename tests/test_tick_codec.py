@@ -0,0 +1,64 @@
+import json
+import struct
+
+import pytest
+
+from data import tick_codec
+from data.kraken_feed import batch_tick
+
+
+def frame(n, side="b"):
+    trades = [[f"{100 + i * 0.5}", "0.25", f"{1700000000 + i}.125", side, "l", ""] for i in range(n)]
+    msg = batch_tick("XBT/USD", trades)
+    msg.update(recv_ts=1700000100.5, pub_ts=1700000100.75)
+    return msg
+
+
+@pytest.mark.parametrize("n", [1, 2, 20])
+def test_round_trip_matches_json(n):
+    msg = frame(n)
+    assert tick_codec.decode(tick_codec.encode(msg)) == json.loads(json.dumps(msg))
+
+
+def test_round_trip_without_optional_fields():
+    msg = {"ts": 1700000000000, "symbol": "SOL/USD", "price": 20.5}
+    assert tick_codec.decode(tick_codec.encode(msg)) == {
+        "ts": 1700000000000, "symbol": "SOL/USD", "price": 20.5, "high": 20.5, "low": 20.5,
+        "vwap": 20.5, "volume": 0.0, "count": 1,
+    }
+
+
+def test_frames_over_65535_trades():
+    msg = frame(70_000, side="s")
+    out = tick_codec.decode(tick_codec.encode(msg))
+    assert out["count"] == 70_000
+    assert out["prices"] == msg["prices"]
+    assert out["side"] == "s"
+
+
+def test_unknown_side_is_rejected():
+    with pytest.raises(ValueError):
+        tick_codec.encode(frame(1, side="x"))
+
+
+def test_reads_v1_frames():
+    sym = b"XBT/USD"
+    v1 = struct.Struct("<BBBHq9d").pack(1, 0, len(sym), 1, 1700000000000, 1.0, float("nan"), float("nan"), float("nan"),
+                                         10.0, 10.0, 10.0, 10.0, 0.5) + sym
+    out = tick_codec.decode(v1)
+    assert out["symbol"] == "XBT/USD"
+    assert (out["price"], out["side"], out["trade_ts"]) == (10.0, "b", 1.0)
+    assert "recv_ts" not in out
+
+
+def test_unsupported_version():
+    blob = bytearray(tick_codec.encode(frame(1)))
+    blob[0] = 9
+    with pytest.raises(ValueError):
+        tick_codec.decode(bytes(blob))
+
+
+def test_wire_hint():
+    assert tick_codec.wire_hint(None, "binary") is None
+    assert tick_codec.wire_hint("json,binary", "binary") is None
+    assert "TICK_WIRE is binary" in tick_codec.wire_hint(b"json", "binary")
@@ -0,0 +1,113 @@
+import time
+
+from controllers.tick_dispatcher import TickDispatcher
+from data.redis_bus import feed_wires_key, tick_channel
+
+
+class RecordingPubSub:
+    def __init__(self):
+        self.calls = []
+
+    def subscribe(self, *channels):
+        self.calls.append(("subscribe", sorted(channels)))
+
+    def unsubscribe(self, *channels):
+        self.calls.append(("unsubscribe", sorted(channels)))
+
+
+def make_dispatcher(**kw) -> TickDispatcher:
+    d = TickDispatcher(client=object(), **kw)
+    d.start = lambda: None  # drive dispatch() directly, no reader thread
+    return d
+
+
+def test_one_prepare_per_tick_fanned_out_to_every_trader():
+    prepared = []
+
+    def prepare(symbol, tick):
+        prepared.append(tick["price"])
+        return ("prepared", tick["price"])
+
+    d = make_dispatcher(prepare=prepare)
+    a = d.register("SOL/USD", "SOL/USD|a")
+    b = d.register("SOL/USD", "SOL/USD|b")
+    other = d.register("XBT/USD", "XBT/USD|a")
+
+    d.dispatch({"symbol": "SOL/USD", "price": 1.0})
+    d.dispatch({"symbol": "SOL/USD", "price": 2.0})
+
+    assert prepared == [1.0, 2.0]
+    for q in (a, b):
+        assert [q.get_nowait(), q.get_nowait()] == [("prepared", 1.0), ("prepared", 2.0)]
+    assert other.empty()
+    assert "SOL/USD" in d.last_tick
+
+
+def test_ticks_for_symbols_without_traders_are_ignored():
+    d = make_dispatcher()
+    d.dispatch({"symbol": "SOL/USD", "price": 1.0})
+    assert d.last_tick == {}
+
+
+def test_full_queue_drops_oldest_tick():
+    d = make_dispatcher(queue_size=2)
+    slow = d.register("SOL/USD", "SOL/USD|slow")
+    fast = d.register("SOL/USD", "SOL/USD|fast")
+    for price in (1.0, 2.0):
+        d.dispatch({"symbol": "SOL/USD", "price": price})
+    fast.get_nowait(), fast.get_nowait()
+
+    d.dispatch({"symbol": "SOL/USD", "price": 3.0})
+
+    assert [slow.get_nowait()["price"], slow.get_nowait()["price"]] == [2.0, 3.0]
+    assert fast.get_nowait()["price"] == 3.0
+    assert d.dropped == 1
+
+
+def test_unregister_last_trader_drops_symbol():
+    d = make_dispatcher()
+    d.register("SOL/USD", "SOL/USD|a")
+    d.register("SOL/USD", "SOL/USD|b")
+    d.unregister("SOL/USD", "SOL/USD|a")
+    assert d.symbols() == ["SOL/USD"]
+    d.unregister("SOL/USD", "SOL/USD|b")
+    assert d.symbols() == []
+
+
+def test_one_subscription_per_symbol_and_stale_resubscribe():
+    d = make_dispatcher(stale_after=5)
+    ps = RecordingPubSub()
+    d.register("SOL/USD", "SOL/USD|a")
+    d.register("SOL/USD", "SOL/USD|b")
+
+    subscribed = d._sync_subscriptions(ps, set())
+    assert ps.calls == [("subscribe", [tick_channel("SOL/USD")])]
+    subscribed = d._sync_subscriptions(ps, subscribed)
+    assert len(ps.calls) == 1
+
+    d.last_tick["SOL/USD"] = time.time() - 10
+    subscribed = d._sync_subscriptions(ps, subscribed)
+    assert ps.calls[1:] == [("unsubscribe", [tick_channel("SOL/USD")]), ("subscribe", [tick_channel("SOL/USD")])]
+    assert d.resubscribes == 1
+
+    d.unregister("SOL/USD", "SOL/USD|a")
+    d.unregister("SOL/USD", "SOL/USD|b")
+    assert d._sync_subscriptions(ps, subscribed) == set()
+    assert ps.calls[-1] == ("unsubscribe", [tick_channel("SOL/USD")])
+
+
+def test_stale_resubscribe_hints_at_wire_mismatch_once(capsys):
+    class FeedWires:
+        def get(self, key):
+            return b"json" if key == feed_wires_key() else None
+
+    d = TickDispatcher(client=FeedWires(), stale_after=5, wire="binary")
+    d.start = lambda: None
+    d.register("SOL/USD", "SOL/USD|a")
+    ps = RecordingPubSub()
+    subscribed = d._sync_subscriptions(ps, set())
+    for _ in range(2):
+        d.last_tick["SOL/USD"] = time.time() - 10
+        subscribed = d._sync_subscriptions(ps, subscribed)
+    out = capsys.readouterr().out
+    assert out.count("TICK_WIRE is binary") == 1
@@ -0,0 +1,107 @@
+import json
+import os
+
+import pytest
+
+from storage.trade_journal import TradeJournal, close_all, journal_dir, list_segments, migrate_json, read_from, valid_tid
+from storage.trade_logger import log_trade
+
+
+def test_append_and_read_in_order_across_segments(tmp_path):
+    path = str(tmp_path / "journal")
+    journal = TradeJournal(path, max_bytes=200)
+    for i in range(20):
+        journal.append({"i": i, "raw_timestamp": i})
+    journal.close()
+    assert len(list_segments(path)) > 1
+
+    entries, cursor = read_from(path, None, 7)
+    assert [e["i"] for e in entries] == list(range(7))
+    rest, cursor = read_from(path, cursor, 100)
+    assert [e["i"] for e in rest] == list(range(7, 20))
+    assert read_from(path, cursor, 100) == ([], cursor)
+
+
+def test_reopen_appends_to_tail(tmp_path):
+    path = str(tmp_path / "journal")
+    for i in range(3):
+        journal = TradeJournal(path)
+        journal.append({"i": i})
+        journal.close()
+    assert [e["i"] for e in read_from(path)[0]] == [0, 1, 2]
+
+
+def test_partial_tail_line_is_not_returned(tmp_path):
+    path = str(tmp_path / "journal")
+    journal = TradeJournal(path)
+    journal.append({"i": 0})
+    journal.close()
+    with open(list_segments(path)[-1][2], "ab") as f:
+        f.write(b'{"i": 1')
+    entries, cursor = read_from(path)
+    assert entries == [{"i": 0}]
+    with open(list_segments(path)[-1][2], "ab") as f:
+        f.write(b'}\n')
+    assert read_from(path, cursor)[0] == [{"i": 1}]
+
+
+@pytest.mark.parametrize("cursor", ["x", "1", "1:a", "-1:0", "1:-5"])
+def test_bad_cursor_raises_value_error(tmp_path, cursor):
+    with pytest.raises(ValueError):
+        read_from(str(tmp_path), cursor)
+
+
+def test_negative_limit_raises_value_error(tmp_path):
+    with pytest.raises(ValueError):
+        read_from(str(tmp_path), None, -1)
+
+
+@pytest.mark.parametrize("owner,symbol", [
+    ("../../etc", "SOL/USD"),
+    ("a/b", "SOL/USD"),
+    ("..", "SOL/USD"),
+    ("jacob", "../USD"),
+    ("jacob", "SOL/USD/x"),
+    ("", "SOL/USD"),
+    (None, "SOL/USD"),
+])
+def test_journal_dir_contains_path_traversal(owner, symbol):
+    assert not valid_tid(owner, symbol)  # the API refuses these
+    path = os.path.normpath(journal_dir(owner, symbol))
+    assert path.startswith("trade_data" + os.sep) and path.endswith(os.sep + "journal")
+    assert ".." not in path.split(os.sep)
+
+
+def test_journal_dir_accepts_trader_ids():
+    assert journal_dir("jacob@example.com", "SOL/USD") == "trade_data/jacob@example.com/SOL/journal"
+
+
+def test_log_trade_for_owner_outside_the_api_pattern(tmp_path, monkeypatch):
+    # owners created before valid_tid existed keep their directory and can still trade
+    monkeypatch.chdir(tmp_path)
+    for owner in ("jane doe", "jörg"):
+        assert not valid_tid(owner, "SOL/USD")
+        log_trade("SOL/USD", 20.0, "buy_executed", owner, 1.5)
+        close_all()
+        entries, _ = read_from(os.path.join("trade_data", owner, "SOL", "journal"))
+        assert [(e["event"], e["qty_held"]) for e in entries] == [("buy_executed", 1.5)]
+
+
+def test_migrate_places_legacy_history_before_existing_segments(tmp_path):
+    coin_dir = tmp_path / "jacob" / "SOL"
+    path = str(coin_dir / "journal")
+    journal = TradeJournal(path)
+    journal.append({"i": 2, "raw_timestamp": 30})
+    journal.close()
+    legacy = coin_dir / "trade_calls.json"
+    legacy.write_text(json.dumps([{"i": 1, "raw_timestamp": 20}, {"i": 0, "raw_timestamp": 10}]))
+
+    assert migrate_json(str(legacy)) == 2
+    assert [e["i"] for e in read_from(path, None, 100)[0]] == [0, 1, 2]
+    assert not os.path.exists(path + ".legacy")
+    assert os.path.exists(str(legacy) + ".migrated")
+
+    journal = TradeJournal(path)
+    journal.append({"i": 3})
+    journal.close()
+    assert [e["i"] for e in read_from(path, None, 100)[0]] == [0, 1, 2, 3]
@@ -1,9 +1,16 @@
 #!/usr/bin/env python3
 import json, sys, math, datetime as dt
 from pathlib import Path
+from storage.trade_journal import iter_entries
 
 def load_events(path):
-    data = json.loads(Path(path).read_text())
+    p = Path(path)
+    if p.is_dir():
+        # trade_data/{owner}/{symbol} or its journal/ directory
+        journal = p / "journal" if (p / "journal").is_dir() else p
+        data = list(iter_entries(str(journal)))
+    else:
+        data = json.loads(p.read_text())
     # ensure chronological
     data.sort(key=lambda e: e.get("raw_timestamp") or 0)
     return data
@@ -12,8 +19,7 @@ def to_dt(ts_str):
     # your file has ISO strings like "2025-08-15T08:06:42.156224"
     return dt.datetime.fromisoformat(ts_str)
 
-def analyze(path):
-    evs = load_events(path)
+def closed_trades(evs):
     open_buy = None
     closed = []  # list of dicts with buy/sell + pnl
 
@@ -38,12 +44,13 @@ def analyze(path):
                 "pnl": pnl, "ret": ret, "hold_s": hold_s
             })
             open_buy = None  # position closed
+    return closed
 
+def compute_metrics(closed):
+    """Summary stats over closed trades, None if there are none"""
     if not closed:
-        print("No closed trades found.")
-        return
+        return None
 
-    # summary stats
     n = len(closed)
     wins   = [c for c in closed if c["pnl"] > 0]
     losses = [c for c in closed if c["pnl"] < 0]
@@ -61,14 +68,27 @@ def analyze(path):
         peak = max(peak, eq)
         mdd = min(mdd, eq - peak)
 
+    return {
+        "trades": n, "win_rate": wr, "total_pnl": total,
+        "avg_win": avg_win, "avg_loss": avg_loss,
+        "avg_ret": avg_ret, "avg_hold_s": avg_hold, "max_drawdown": mdd,
+    }
+
+def analyze(path):
+    closed = closed_trades(load_events(path))
+    m = compute_metrics(closed)
+    if m is None:
+        print("No closed trades found.")
+        return
+
     def pct(x): return f"{x*100:.2f}%"
     def money(x): return f"{x:.2f}"
 
     print(f"File: {path}")
-    print(f"Trades: {n} | Win rate: {pct(wr)}")
-    print(f"Total PnL (per-unit): {money(total)} | Avg win: {money(avg_win)} | Avg loss: {money(avg_loss)}")
-    print(f"Avg return/trade: {pct(avg_ret)} | Avg hold: {avg_hold/60:.1f} min")
-    print(f"Max drawdown (per-unit): {money(mdd)}")
+    print(f"Trades: {m['trades']} | Win rate: {pct(m['win_rate'])}")
+    print(f"Total PnL (per-unit): {money(m['total_pnl'])} | Avg win: {money(m['avg_win'])} | Avg loss: {money(m['avg_loss'])}")
+    print(f"Avg return/trade: {pct(m['avg_ret'])} | Avg hold: {m['avg_hold_s']/60:.1f} min")
+    print(f"Max drawdown (per-unit): {money(m['max_drawdown'])}")
 
     # show last few trades
     print("\nRecent trades:")
@@ -78,6 +98,6 @@ def analyze(path):
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("usage: python utils/analyze_sol.py trade_data/SOL/trade_calls.json")
+        print("usage: python -m utils.analyzer trade_data/{owner}/SOL  (or a legacy trade_calls.json)")
         sys.exit(2)
     analyze(sys.argv[1])
\ No newline at end of file
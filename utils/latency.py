@@ -0,0 +1,115 @@
+SUB_BUCKETS = 16  # per power of two, so bucket edges are within ~6% of any value
+MAX_US = 60_000_000
+
+HOPS = ("feed", "bus", "queue", "decide", "log", "total")
+# feed:   websocket receive -> Redis publish (feed process)
+# bus:    Redis publish -> controller dispatch
+# queue:  dispatch -> trader dequeue
+# decide: dequeue -> on_message returned
+# log:    websocket receive -> trade log written (only ticks that log)
+# total:  websocket receive -> on_message returned
+
+
+def _index(us: int) -> int:
+    if us < SUB_BUCKETS:
+        return us
+    shift = us.bit_length() - 5
+    return (shift + 1) * SUB_BUCKETS + (us >> shift) - SUB_BUCKETS
+
+
+def _lower(idx: int) -> int:
+    if idx < SUB_BUCKETS:
+        return idx
+    shift = idx // SUB_BUCKETS - 1
+    return (SUB_BUCKETS + idx % SUB_BUCKETS) << shift
+
+
+N_BUCKETS = _index(MAX_US) + 1
+
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of microseconds.
+
+    `record` is a couple of integer ops and a list increment with no lock,
+    so each histogram should have a single writer thread; readers merge."""
+
+    __slots__ = ("counts", "count", "max_us", "sum_us")
+
+    def __init__(self):
+        self.counts = [0] * N_BUCKETS
+        self.count = 0
+        self.max_us = 0
+        self.sum_us = 0
+
+    def record(self, seconds: float):
+        us = int(seconds * 1_000_000)
+        if us < 0:
+            us = 0  # clock skew between the feed and controller hosts
+        elif us > MAX_US:
+            us = MAX_US
+        self.counts[_index(us)] += 1
+        self.count += 1
+        self.sum_us += us
+        if us > self.max_us:
+            self.max_us = us
+
+    def merge(self, other: "LatencyHistogram"):
+        for i, c in enumerate(other.counts):
+            if c:
+                self.counts[i] += c
+        self.count += other.count
+        self.sum_us += other.sum_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, q: float) -> float:
+        """Upper edge of the bucket holding the q-th percentile, in ms"""
+        if not self.count:
+            return 0.0
+        target = max(1, int(round(self.count * q / 100)))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                upper = _lower(i + 1) - 1 if i + 1 < N_BUCKETS else MAX_US
+                return min(upper, self.max_us) / 1000
+        return self.max_us / 1000
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p999": self.percentile(99.9),
+            "max": self.max_us / 1000,
+        }
+
+    def cumulative(self, bounds) -> list[int]:
+        """Counts at or below each bound (seconds, ascending), to bucket precision"""
+        out, seen, i = [], 0, 0
+        for bound in bounds:
+            limit = int(bound * 1_000_000)
+            while i < N_BUCKETS and _lower(i + 1) - 1 <= limit:
+                seen += self.counts[i]
+                i += 1
+            out.append(seen)
+        return out
+
+
+class HopLatency:
+    """One histogram per hop"""
+
+    __slots__ = ("hops",)
+
+    def __init__(self, hops=HOPS):
+        self.hops = {h: LatencyHistogram() for h in hops}
+
+    def record(self, hop: str, seconds: float):
+        self.hops[hop].record(seconds)
+
+    def merge(self, other: "HopLatency"):
+        for hop, h in other.hops.items():
+            self.hops.setdefault(hop, LatencyHistogram()).merge(h)
+
+    def summary(self) -> dict:
+        return {hop: h.summary() for hop, h in self.hops.items() if h.count}
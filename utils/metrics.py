@@ -0,0 +1,246 @@
+from utils.latency import LatencyHistogram
+import threading
+import resource
+import json
+import time
+import os
+
+METRICS_EVERY = 5.0
+METRICS_TTL = 30
+BOUNDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def metrics_key(name: str) -> str:
+    return f"metrics:{name}"
+
+
+def _reap(entries: list) -> list:
+    """Drop (thread, item) entries whose thread has exited and return their
+    items; the caller holds the lock guarding `entries`"""
+    dead = [e for e in entries if not e[0].is_alive()]
+    for e in dead:
+        entries.remove(e)
+    return [item for _, item in dead]
+
+
+class Counter:
+    """Each thread bumps its own one-slot cell, so writers never share state
+    and need no lock; `value` sums the cells. Cells of exited threads are
+    folded into `_base` on read."""
+
+    __slots__ = ("_local", "_cells", "_base", "_lock")
+
+    def __init__(self):
+        self._local = threading.local()
+        self._cells: list[tuple[threading.Thread, list]] = []
+        self._base = 0
+        self._lock = threading.Lock()
+
+    def _cell(self) -> list:
+        cell = self._local.cell = [0]
+        with self._lock:
+            self._cells.append((threading.current_thread(), cell))
+        return cell
+
+    def inc(self):
+        try:
+            self._local.cell[0] += 1
+        except AttributeError:
+            self._cell()[0] += 1
+
+    def add(self, n: int):
+        try:
+            self._local.cell[0] += n
+        except AttributeError:
+            self._cell()[0] += n
+
+    @property
+    def value(self) -> int:
+        with self._lock:
+            self._base += sum(cell[0] for cell in _reap(self._cells))
+            return self._base + sum(cell[0] for _, cell in self._cells)
+
+
+class Metrics:
+    """Process-wide counters and histograms.
+
+    Counters are lock-free handles; hot paths should keep the handle from
+    `counter()` rather than look it up per event. Histograms are recorded
+    into per-thread shards and merged on read; shards of exited threads are
+    merged into `_retired` then dropped. Labels are passed as a tuple of
+    values in the order given to `describe`."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: list[tuple[threading.Thread, dict]] = []
+        self._retired: dict = {}
+        self._counters: dict[tuple, Counter] = {}
+        self._lock = threading.Lock()
+        self._gauges: dict = {}
+        self.meta: dict[str, tuple[str, str, tuple]] = {}
+        self.started = time.time()
+
+    def describe(self, name: str, kind: str, help: str, labels: tuple = ()):
+        self.meta[name] = (kind, help, labels)
+
+    def counter(self, name: str, labels: tuple = ()) -> Counter:
+        key = (name, labels)
+        c = self._counters.get(key)
+        if c is None:
+            with self._lock:
+                c = self._counters.setdefault(key, Counter())
+        return c
+
+    def inc(self, name: str, labels: tuple = (), n: int = 1):
+        c = self.counter(name, labels)
+        if n == 1:
+            c.inc()
+        else:
+            c.add(n)
+
+    def _hists(self) -> dict:
+        try:
+            return self._local.hists
+        except AttributeError:
+            hists = self._local.hists = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), hists))
+            return hists
+
+    def observe(self, name: str, labels: tuple, seconds: float):
+        hists = self._hists()
+        h = hists.get((name, labels))
+        if h is None:
+            h = hists[(name, labels)] = LatencyHistogram()
+        h.record(seconds)
+
+    def gauge(self, name: str, help: str, fn, labels: tuple = ()):
+        """fn() returns a number, or {label values: number} for labelled gauges"""
+        self.describe(name, "gauge", help, labels)
+        self._gauges[name] = fn
+
+    def counters(self) -> dict:
+        with self._lock:
+            counters = list(self._counters.items())
+        return {key: c.value for key, c in counters}
+
+    def histograms(self) -> dict:
+        merged = {}
+        with self._lock:
+            for shard in _reap(self._shards):
+                for key, h in shard.items():
+                    self._retired.setdefault(key, LatencyHistogram()).merge(h)
+            for key, h in self._retired.items():
+                merged.setdefault(key, LatencyHistogram()).merge(h)
+            shards = [hists for _, hists in self._shards]
+        for shard in shards:
+            for key, h in shard.copy().items():
+                merged.setdefault(key, LatencyHistogram()).merge(h)
+        return merged
+
+    def snapshot(self, extra_hists: dict | None = None) -> dict:
+        gauges = []
+        for name, fn in list(self._gauges.items()):
+            try:
+                v = fn()
+            except Exception:
+                continue
+            if isinstance(v, dict):
+                gauges += [[name, list(k), val] for k, val in v.items()]
+            else:
+                gauges.append([name, [], v])
+        hists = self.histograms()
+        hists.update(extra_hists or {})
+        return {
+            "ts": time.time(),
+            "uptime": time.time() - self.started,
+            "meta": {k: list(v) for k, v in self.meta.items()},
+            "counters": [[name, list(labels), v] for (name, labels), v in self.counters().items()],
+            "gauges": gauges,
+            "histograms": [[name, list(labels), {"le": list(BOUNDS), "buckets": h.cumulative(BOUNDS), "sum": h.sum_us / 1_000_000, "count": h.count}]
+                           for (name, labels), h in hists.items()],
+        }
+
+
+REGISTRY = Metrics()
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+REGISTRY.gauge("process_rss_bytes", "Resident memory of this process", rss_bytes)
+REGISTRY.gauge("process_threads", "Live threads in this process", threading.active_count)
+
+
+def with_rates(snap: dict, prev: dict | None) -> dict:
+    """Per-second rate of every counter since the previous snapshot"""
+    rates = []
+    if prev is not None:
+        dt = snap["ts"] - prev["ts"]
+        before = {(n, tuple(l)): v for n, l, v in prev["counters"]}
+        if dt > 0:
+            rates = [[n, l, (v - before.get((n, tuple(l)), 0)) / dt] for n, l, v in snap["counters"]]
+    snap["rates"] = rates
+    return snap
+
+
+def start_publisher(client, name: str, stop_evt: threading.Event, snapshot=None, every: float = METRICS_EVERY):
+    """Writes this process's snapshot to metrics:{name} so the API can serve it"""
+    snapshot = snapshot or REGISTRY.snapshot
+
+    def run():
+        prev = None
+        while not stop_evt.wait(every):
+            try:
+                snap = with_rates(snapshot(), prev)
+                client.set(metrics_key(name), json.dumps(snap), ex=METRICS_TTL)
+                prev = snap
+            except Exception as e:
+                print(f"[ERROR] metrics publish failed: {e}")
+
+    th = threading.Thread(target=run, name="metrics-publisher", daemon=True)
+    th.start()
+    return th
+
+
+def _escape(v, quotes: bool = True) -> str:
+    """Exposition-format escaping: backslash and newline, plus double quotes inside label values"""
+    v = str(v).replace("\\", "\\\\").replace("\n", "\\n")
+    return v.replace('"', '\\"') if quotes else v
+
+
+def _labels(names, values, instance: str) -> str:
+    pairs = [f'instance="{_escape(instance)}"'] + [f'{k}="{_escape(v)}"' for k, v in zip(names, values)]
+    return "{" + ",".join(pairs) + "}"
+
+
+def render_prometheus(snapshots: dict[str, dict]) -> str:
+    """Prometheus text exposition for {instance: snapshot}"""
+    meta, series = {}, {}
+    for instance, snap in snapshots.items():
+        for name, (kind, help, labels) in snap.get("meta", {}).items():
+            meta.setdefault(name, (kind, help, labels))
+        for name, labels, v in snap.get("counters", []) + snap.get("gauges", []):
+            names = meta.get(name, (None, None, []))[2]
+            series.setdefault(name, []).append(f"{name}{_labels(names, labels, instance)} {v}")
+        for name, labels, h in snap.get("histograms", []):
+            names = meta.get(name, (None, None, []))[2]
+            lines = series.setdefault(name, [])
+            base = _labels(names, labels, instance)[:-1]
+            for le, cum in zip(h["le"], h["buckets"]):
+                lines.append(f'{name}_bucket{base},le="{le}"}} {cum}')
+            lines.append(f'{name}_bucket{base},le="+Inf"}} {h["count"]}')
+            lines.append(f"{name}_sum{base}}} {h['sum']}")
+            lines.append(f"{name}_count{base}}} {h['count']}")
+    out = []
+    for name, lines in series.items():
+        kind, help, _ = meta.get(name, ("untyped", "", []))
+        out.append(f"# HELP {name} {_escape(help, quotes=False)}")
+        out.append(f"# TYPE {name} {kind}")
+        out += lines
+    return "\n".join(out) + "\n"
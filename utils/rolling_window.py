@@ -0,0 +1,73 @@
+from collections import deque
+import time
+
+WINDOW = 86400
+BUCKET = 60
+
+
+class RollingHighLow:
+    """Rolling max/min over a time window, kept in minute buckets.
+
+    Two monotonic deques of (bucket, price): prices only ever leave from the
+    tail when beaten or from the head when their bucket ages out, so updates
+    are O(1) amortized and each deque holds at most one entry per bucket."""
+
+    def __init__(self, window: int = WINDOW, bucket: int = BUCKET):
+        self.window = window
+        self.bucket = bucket
+        self.buckets = window // bucket
+        self._max = deque()
+        self._min = deque()
+        self._last_bucket = 0
+        self._newest = None
+
+    def _bucket(self, ts) -> int:
+        b = int((time.time() if ts is None else ts) // self.bucket)
+        # late ticks are folded into the current bucket so the deques stay ordered
+        if b < self._last_bucket:
+            b = self._last_bucket
+        self._last_bucket = b
+        return b
+
+    def _expire(self, b: int):
+        cutoff = b - self.buckets
+        while self._max and self._max[0][0] <= cutoff:
+            self._max.popleft()
+        while self._min and self._min[0][0] <= cutoff:
+            self._min.popleft()
+
+    def update(self, price: float, ts: float | None = None):
+        b = self._newest = self._bucket(ts)
+        mx, mn = self._max, self._min
+        while mx and mx[-1][1] <= price:
+            mx.pop()
+        if not mx or mx[-1][0] != b:
+            mx.append((b, price))
+        while mn and mn[-1][1] >= price:
+            mn.pop()
+        if not mn or mn[-1][0] != b:
+            mn.append((b, price))
+        self._expire(b)
+
+    def seed(self, high: float | None, low: float | None, ts: float | None = None):
+        if high is not None:
+            self.update(high, ts)
+        if low is not None:
+            self.update(low, ts)
+
+    def expire(self, ts: float | None = None):
+        """Drop buckets older than the window as of `ts` (default now) without adding a price"""
+        self._expire(self._bucket(ts))
+
+    @property
+    def newest(self) -> float | None:
+        """Start of the newest bucket that received a price, None before the first"""
+        return None if self._newest is None else self._newest * self.bucket
+
+    @property
+    def high(self) -> float | None:
+        return self._max[0][1] if self._max else None
+
+    @property
+    def low(self) -> float | None:
+        return self._min[0][1] if self._min else None
@@ -20,9 +20,9 @@ class Utility:
 
             time.sleep(2)
 
-    def get_24h_high_low(self, symbol):
+    def get_24h_high_low(self, symbol, max_retries=5):
         url = f"https://api.kraken.com/0/public/Ticker?pair={symbol}"
-        data = self.safe_requests(url)
+        data = self.safe_requests(url, max_retries)
         if not data or "result" not in data:
             return None, None
         
@@ -31,5 +31,41 @@ class Utility:
         low_24h = float(result["l"][1])
         return high_24h, low_24h
     
+    def get_24h_high_low_many(self, symbols) -> dict:
+        """One Ticker call for every symbol; keys are the ws names the feed uses (e.g. 'SOL/USD')"""
+        if not symbols:
+            return {}
+        pairs = ",".join(symbols)
+        data = self.safe_requests(f"https://api.kraken.com/0/public/Ticker?pair={pairs}")
+        if not data or "result" not in data:
+            # one unknown pair fails the whole batch; ask for each symbol on its own
+            return self._24h_high_low_each(symbols)
+        names = {}
+        meta = self.safe_requests(f"https://api.kraken.com/0/public/AssetPairs?pair={pairs}")
+        if meta and "result" in meta:
+            names = {key: pair.get("wsname") for key, pair in meta["result"].items()}
+
+        out = {}
+        for key, result in data["result"].items():
+            wsname = names.get(key)
+            if wsname is None and len(symbols) == 1:
+                wsname = symbols[0]
+            if wsname is None:
+                continue
+            out[wsname] = (float(result["h"][1]), float(result["l"][1]))
+        missing = [s for s in symbols if s not in out]
+        if missing:
+            # AssetPairs lookup failed or skipped some pairs, so their Ticker keys could not be mapped
+            out.update(self._24h_high_low_each(missing))
+        return out
+
+    def _24h_high_low_each(self, symbols) -> dict:
+        out = {}
+        for symbol in symbols:
+            high_24h, low_24h = self.get_24h_high_low(symbol, max_retries=1)
+            if high_24h is not None:
+                out[symbol] = (high_24h, low_24h)
+        return out
+
     def monotonic_ms() -> int:
         return int(time.monotonic() * 1000)
\ No newline at end of file
@@ -2,6 +2,7 @@
 const API = "/api";
 let owner = localStorage.getItem("owner") || "";
 let watchTimer = null;
+let watchStream = null;
 let watching = "";
 let watchChart = null;
 let otpExpected = null;
@@ -175,6 +176,7 @@ function logout() {
 		clearInterval(watchTimer);
 		watchTimer = null;
 	}
+	closeStream();
 	watching = "";
 	setOwnerBadge();
 	showView("login");
@@ -443,6 +445,21 @@ async function statusWatching(sym) {
 		owner,
 		symbol: sym,
 	});
+	if (watchStream) {
+		// the stream feeds the chart; this call only fills the fields
+		renderStatus(sym, status);
+		return;
+	}
+	const price = Number(status.last_price);
+	if (Number.isFinite(price)) {
+		const ts = new Date().toLocaleTimeString([], { hour12: false });
+		appendPoint(sym, ts, price);
+	}
+	renderStatus(sym, status);
+}
+
+function renderStatus(sym, status) {
+	if (sym !== watching) return;
 	// Chart Fields, data the graph pulls to generate
 	$("watchSymbolLabel").textContent = status.symbol || sym;
 	$("watchStage").textContent = status.stage || "-";
@@ -452,11 +469,6 @@ async function statusWatching(sym) {
 	$("watchBalance").textContent = status.balance ?? "-";
 	$("watchQty").textContent = status.quantity ?? "-";
 
-	const price = Number(status.last_price);
-	if (Number.isFinite(price)) {
-		const ts = new Date().toLocaleTimeString([], { hour12: false });
-		appendPoint(sym, ts, price);
-	}
 	const ch = ensureWatchChart();
 	if (!ch) return;
 
@@ -496,14 +508,58 @@ function appendPoint(sym, ts, price) {
 	}
 }
 
-function setRefresh() {
+function onStreamTick(sym, tick) {
+	const price = Number(tick.price);
+	if (!Number.isFinite(price)) return;
+	const ts = new Date(tick.ts || Date.now()).toLocaleTimeString([], { hour12: false });
+	appendPoint(sym, ts, price);
+	if (sym !== watching) return;
+	$("watchPrice").textContent = price;
+	const ch = ensureWatchChart();
+	if (!ch) return;
+	const s = getSeries(sym);
+	ch.data.labels = s.labels;
+	ch.data.datasets[0].data = s.data;
+	ch.update("none");
+}
+
+function closeStream() {
+	if (watchStream) {
+		watchStream.close();
+		watchStream = null;
+	}
+}
+
+function openStream(sym) {
+	closeStream();
+	if (!window.EventSource || !owner || !sym) return false;
+	const qs = `owner=${encodeURIComponent(owner)}&symbol=${encodeURIComponent(sym)}`;
+	const es = new EventSource(`${API}/stream?${qs}`);
+	es.addEventListener("tick", (e) => onStreamTick(sym, JSON.parse(e.data)));
+	es.addEventListener("status", (e) => renderStatus(sym, JSON.parse(e.data)));
+	es.onerror = () => {
+		// EventSource retries on its own; only give up on the stream if it was closed for good
+		if (es.readyState === EventSource.CLOSED && watchStream === es) {
+			watchStream = null;
+			log("stream closed, falling back to polling");
+			setRefresh(false);
+		}
+	};
+	watchStream = es;
+	return true;
+}
+
+function setRefresh(stream = true) {
 	const ms = 1000;
 	if (watchTimer) {
 		clearInterval(watchTimer);
 		watchTimer = null;
 	}
-	if (ms > 0 && watching) {
-		statusWatching(watching);
+	closeStream();
+	if (!watching) return;
+	statusWatching(watching);
+	if (stream && openStream(watching)) return;
+	if (ms > 0) {
 		watchTimer = setInterval(() => statusWatching(watching), ms);
 	}
 }